@@ -0,0 +1,8 @@
+"""Benchmarks of the bytecode library.
+
+The bench_*.py scripts focus on a single operation and can be run directly.
+The round-trip suite covering every conversion stage is run with:
+
+    python -m benchmarks
+
+"""
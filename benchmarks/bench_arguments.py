@@ -0,0 +1,92 @@
+"""Benchmark the resolution of instruction arguments.
+
+For each module, all code objects are converted from concrete to abstract
+bytecode (resolving constants, names, variables, comparisons... from the
+integer arguments) and back to concrete bytecode (building the integer
+arguments from the abstract ones). The exception stack depths are kept from
+the original code objects, so that the conversion to concrete bytecode does not
+need to compute them.
+
+Run with: python benchmarks/bench_arguments.py
+
+"""
+
+import os
+import time
+import types
+
+from bytecode import ConcreteBytecode
+
+MODULES = ("argparse", "ast", "inspect", "typing")
+
+
+def iter_code_objects(code):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from iter_code_objects(const)
+
+
+def load_concrete_bytecodes(module):
+    path = os.path.join(os.path.dirname(os.__file__), module + ".py")
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    return [
+        ConcreteBytecode.from_code(code)
+        for code in iter_code_objects(compile(source, path, "exec"))
+    ]
+
+
+def bench(func, repeat=10):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_to_bytecode(concretes):
+    def func():
+        for concrete in concretes:
+            concrete.to_bytecode(conserve_exception_block_stackdepth=True)
+
+    return bench(func)
+
+
+def bench_to_concrete(bytecodes):
+    def func():
+        for bytecode in bytecodes:
+            bytecode.to_concrete_bytecode(compute_exception_stack_depths=False)
+
+    return bench(func)
+
+
+def main():
+    print(
+        "%10s %10s %16s %16s %14s"
+        % ("module", "instrs", "to_bytecode (s)", "to_concrete (s)", "instrs/s")
+    )
+    for module in MODULES:
+        concretes = load_concrete_bytecodes(module)
+        bytecodes = [
+            concrete.to_bytecode(conserve_exception_block_stackdepth=True)
+            for concrete in concretes
+        ]
+        n_instrs = sum(len(concrete) for concrete in concretes)
+        t_bytecode = bench_to_bytecode(concretes)
+        t_concrete = bench_to_concrete(bytecodes)
+        print(
+            "%10s %10d %16.4f %16.4f %14.0f"
+            % (
+                module,
+                n_instrs,
+                t_bytecode,
+                t_concrete,
+                2 * n_instrs / (t_bytecode + t_concrete),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
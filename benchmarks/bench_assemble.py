@@ -0,0 +1,80 @@
+"""Benchmark the assembly of concrete bytecode into raw bytecode.
+
+For each module, all code objects are converted to concrete bytecode and the
+instructions are assembled. Besides the duration, the peak memory traced by
+tracemalloc during the assembly is reported, which reflects the temporary
+objects allocated per instruction.
+
+Run with: python benchmarks/bench_assemble.py
+
+"""
+
+import os
+import time
+import tracemalloc
+import types
+
+from bytecode import ConcreteBytecode
+
+MODULES = ("argparse", "ast", "inspect", "typing")
+
+
+def iter_code_objects(code):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from iter_code_objects(const)
+
+
+def load_concrete_bytecodes(module):
+    path = os.path.join(os.path.dirname(os.__file__), module + ".py")
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    codes = iter_code_objects(compile(source, path, "exec"))
+    return [ConcreteBytecode.from_code(code, extended_arg=True) for code in codes]
+
+
+def assemble(bytecodes):
+    for bytecode in bytecodes:
+        bytecode._assemble_code()
+
+
+def bench_assemble(bytecodes, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        assemble(bytecodes)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def trace_assemble(bytecodes):
+    # Assemble the biggest function alone so that the peak reflects the
+    # temporary allocations of a single assembly.
+    bytecode = max(bytecodes, key=len)
+    tracemalloc.start()
+    try:
+        bytecode._assemble_code()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    print(
+        "%10s %10s %12s %12s %14s"
+        % ("module", "instrs", "assemble (s)", "ns/instr", "peak (KiB)")
+    )
+    for module in MODULES:
+        bytecodes = load_concrete_bytecodes(module)
+        n_instrs = sum(len(bytecode) for bytecode in bytecodes)
+        duration = bench_assemble(bytecodes)
+        peak = trace_assemble(bytecodes)
+        print(
+            "%10s %10d %12.4f %12.1f %14.1f"
+            % (module, n_instrs, duration, 1e9 * duration / n_instrs, peak / 1024)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark the transformation of many modules in worker processes.
+
+All the modules of the standard library found at the top level of its
+directory are compiled and each code object (including nested code objects)
+is round-tripped through a control flow graph by a BulkTransformer, with an
+increasing number of worker processes. The wall clock time, the speedup
+compared to a single worker and the mean throughput of the workers are
+reported.
+
+Run with: python benchmarks/bench_bulk.py [max_workers]
+
+"""
+
+import os
+import sys
+import time
+import warnings
+
+from bytecode import BulkTransformer, Bytecode, ControlFlowGraph
+
+
+def roundtrip(code):
+    return ControlFlowGraph.from_bytecode(Bytecode.from_code(code)).to_code()
+
+
+def load_code_objects():
+    directory = os.path.dirname(os.__file__)
+    codes = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".py"):
+            continue
+        path = os.path.join(directory, filename)
+        with open(path, "rb") as f:
+            source = f.read()
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                codes.append(compile(source, path, "exec"))
+        except SyntaxError:
+            continue
+    return codes
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    codes = load_code_objects()
+    print("%d modules, %d CPUs" % (len(codes), os.cpu_count() or 1))
+    print(
+        "%8s %12s %10s %14s %16s"
+        % ("workers", "code objects", "time (s)", "speedup", "codes/s/worker")
+    )
+    reference = None
+    workers = 1
+    while True:
+        transformer = BulkTransformer(roundtrip, max_workers=workers)
+        start = time.perf_counter()
+        transformer.transform(codes)
+        duration = time.perf_counter() - start
+        if reference is None:
+            reference = duration
+        stats = transformer.workers.values()
+        n_codes = sum(s.code_objects for s in stats)
+        print(
+            "%8d %12d %10.2f %14.2f %16.0f"
+            % (
+                workers,
+                n_codes,
+                duration,
+                reference / duration,
+                sum(s.throughput for s in stats) / len(stats),
+            )
+        )
+        if workers >= max_workers:
+            break
+        workers = min(2 * workers, max_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark the handling of inline cache entries.
+
+For each module, all code objects are converted to abstract bytecode and then
+back to concrete bytecode, which emits the CACHE entries required by each
+instruction and uses the number of cache entries of each jump while resolving
+jumps. The number of cache entries looked up per jump by
+ConcreteInstr.use_cache_opcodes is timed separately.
+
+The inline cache entries only exist on Python 3.11+, on older versions the
+numbers are expected to be zero.
+
+Run with: python benchmarks/bench_caches.py
+
+"""
+
+import os
+import sys
+import time
+import types
+
+from bytecode import Bytecode
+
+MODULES = ("argparse", "ast", "inspect", "typing")
+
+
+def iter_code_objects(code):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from iter_code_objects(const)
+
+
+def load_bytecodes(module):
+    path = os.path.join(os.path.dirname(os.__file__), module + ".py")
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    return [
+        Bytecode.from_code(code)
+        for code in iter_code_objects(compile(source, path, "exec"))
+    ]
+
+
+def bench(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_to_concrete(bytecodes):
+    def func():
+        for bytecode in bytecodes:
+            bytecode.to_concrete_bytecode()
+
+    return bench(func)
+
+
+def bench_use_cache_opcodes(instructions):
+    def func():
+        for instr in instructions:
+            instr.use_cache_opcodes()
+
+    return bench(func)
+
+
+def main():
+    print("Python %s.%s" % sys.version_info[:2])
+    print(
+        "%10s %10s %10s %14s %14s"
+        % ("module", "instrs", "caches", "to_concrete (s)", "lookups (s)")
+    )
+    for module in MODULES:
+        bytecodes = load_bytecodes(module)
+        concretes = [bytecode.to_concrete_bytecode() for bytecode in bytecodes]
+        instructions = [instr for concrete in concretes for instr in concrete]
+        n_caches = sum(instr.name == "CACHE" for instr in instructions)
+        duration = bench_to_concrete(bytecodes)
+        lookups = bench_use_cache_opcodes(instructions)
+        print(
+            "%10s %10d %10d %14.4f %14.4f"
+            % (module, len(instructions), n_caches, duration, lookups)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark the handling of large constants.
+
+Constants are compared and deduplicated through their marshalled form (see
+const_key), which is expensive for large literal tables. Some modules of the
+standard library with large literal tables and a synthetic module defining many
+functions which share some large tuple, frozenset and bytes constants are
+converted from abstract to concrete bytecode, and the bytecodes are compared
+to the bytecodes decoded again from the same code objects.
+
+Run with: python benchmarks/bench_consts.py
+
+"""
+
+import os
+import time
+import types
+
+from bytecode import Bytecode, ConcreteBytecode
+
+MODULES = ("encodings.cp1252", "encodings.mac_roman", "_pydecimal", "typing")
+
+
+def make_literal_tables(n_functions=50, size=2_000):
+    lines = []
+    for i in range(n_functions):
+        lines.extend(
+            [
+                f"def lookup_{i}(key):",
+                f"    if key in {tuple(f'name_{j}' for j in range(size))!r}:",
+                f"        return {tuple(range(size))!r}",
+                f"    if key in {frozenset(range(size))!r}:",
+                f"        return {bytes(range(256)) * (size // 256)!r}",
+                f"    return {tuple(range(size))!r}",
+            ]
+        )
+    return "\n".join(lines)
+
+
+def iter_code_objects(code):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from iter_code_objects(const)
+
+
+def load_source(module):
+    path = os.path.join(os.path.dirname(os.__file__), *module.split(".")) + ".py"
+    with open(path, encoding="utf-8") as f:
+        return path, f.read()
+
+
+def bench(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_module(name, filename, source):
+    codes = list(iter_code_objects(compile(source, filename, "exec")))
+    concretes = [ConcreteBytecode.from_code(code) for code in codes]
+    bytecodes = [Bytecode.from_code(code) for code in codes]
+
+    def to_concrete():
+        for bytecode in bytecodes:
+            bytecode.to_concrete_bytecode()
+
+    others = [
+        (ConcreteBytecode.from_code(code), Bytecode.from_code(code)) for code in codes
+    ]
+
+    def compare():
+        for concrete, bytecode, (other_concrete, other_bytecode) in zip(
+            concretes, bytecodes, others
+        ):
+            assert concrete == other_concrete
+            assert bytecode == other_bytecode
+
+    n_consts = sum(len(code.co_consts) for code in codes)
+    print(
+        "%20s %10d %16.4f %14.4f" % (name, n_consts, bench(to_concrete), bench(compare))
+    )
+
+
+def main():
+    print(
+        "%20s %10s %16s %14s" % ("module", "consts", "to_concrete (s)", "compare (s)")
+    )
+    for module in MODULES:
+        path, source = load_source(module)
+        bench_module(module, path, source)
+    bench_module("<literal tables>", "<literal tables>", make_literal_tables())
+
+
+if __name__ == "__main__":
+    main()
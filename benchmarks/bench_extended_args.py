@@ -0,0 +1,49 @@
+"""Benchmark folding EXTENDED_ARG in large functions.
+
+Each generated function loads thousands of distinct constants so that most
+LOAD_CONST instructions require an EXTENDED_ARG prefix. The time per
+instruction should stay flat as the function grows.
+
+Run with: python benchmarks/bench_extended_args.py
+
+"""
+
+import time
+
+from bytecode import ConcreteBytecode
+
+
+def make_code(n_statements):
+    source = "def f():\n" + "".join(
+        "    x = %d\n" % (i + 1000) for i in range(n_statements)
+    )
+    namespace = {}
+    exec(compile(source, "<bench>", "exec"), namespace)
+    return namespace["f"].__code__
+
+
+def bench_fold(instructions, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        copy = list(instructions)
+        start = time.perf_counter()
+        ConcreteBytecode._remove_extended_args(copy)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print("%10s %10s %12s %12s" % ("instrs", "ext. args", "fold (s)", "ns/instr"))
+    for n in (6_250, 12_500, 25_000, 50_000):
+        code = make_code(n)
+        instructions = list(ConcreteBytecode.from_code(code, extended_arg=True))
+        n_ext = sum(i.name == "EXTENDED_ARG" for i in instructions)
+        duration = bench_fold(instructions)
+        print(
+            "%10d %10d %12.4f %12.1f"
+            % (len(instructions), n_ext, duration, 1e9 * duration / len(instructions))
+        )
+
+
+if __name__ == "__main__":
+    main()
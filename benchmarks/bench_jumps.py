@@ -0,0 +1,74 @@
+"""Benchmark the resolution of jumps when converting to concrete bytecode.
+
+The generated bytecode contains thousands of short loops and a cascade of long
+jumps whose targets sit right around the boundary requiring an EXTENDED_ARG:
+each relaxation pass extends one more jump, which in turn pushes the target of
+the previous one out of reach.
+
+Run with: python benchmarks/bench_jumps.py
+
+"""
+
+import time
+
+from bytecode import Bytecode, Instr, Label
+from bytecode.concrete import OFFSET_AS_INSTRUCTION
+from bytecode.utils import PY311
+
+
+def make_bytecode(n_loops):
+    # Number of instructions addressable by a jump without EXTENDED_ARG
+    span = 256 if OFFSET_AS_INSTRUCTION else 128
+
+    # Cascade of long jumps: the last one is just out of reach and each of the
+    # previous ones is one instruction closer to the limit, so that every
+    # relaxation pass extends exactly one more jump.
+    n_long = span // 2
+    labels = [Label() for _ in range(n_long)]
+    code = Bytecode([Instr("JUMP_FORWARD", label) for label in labels])
+    code.extend(Instr("NOP") for _ in range(span + n_long))
+    for index, label in reversed(list(enumerate(labels))):
+        code.insert(span + 2 - n_long + 2 * index, label)
+
+    # Short loops
+    backward = "JUMP_BACKWARD" if PY311 else "JUMP_ABSOLUTE"
+    for _ in range(n_loops):
+        start = Label()
+        end = Label()
+        code.extend(
+            [
+                start,
+                Instr("NOP"),
+                Instr("JUMP_FORWARD", end),
+                Instr(backward, start),
+                end,
+            ]
+        )
+
+    code.insert(0, Instr("LOAD_CONST", None))
+    code.append(Instr("RETURN_VALUE"))
+    return code
+
+
+def bench_to_concrete(bytecode, passes=None, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        bytecode.to_concrete_bytecode(
+            compute_jumps_passes=passes, compute_exception_stack_depths=False
+        )
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print("%10s %10s %12s" % ("jumps", "instrs", "convert (s)"))
+    for n in (2_500, 5_000, 10_000):
+        bytecode = make_bytecode(n)
+        duration = bench_to_concrete(bytecode)
+        n_jumps = sum(isinstance(i, Instr) and i.has_jump() for i in bytecode)
+        print("%10d %10d %12.4f" % (n_jumps, len(bytecode), duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark the memory used by instruction locations.
+
+For each module, all code objects are converted to concrete bytecode. The
+number of instructions is compared to the number of distinct InstrLocation
+objects they refer to, which gives the memory saved by sharing locations.
+The memory traced by tracemalloc while the bytecodes are alive is reported as
+well.
+
+Run with: python benchmarks/bench_locations.py
+
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+from bytecode import ConcreteBytecode
+from bytecode.instr import InstrLocation
+
+MODULES = ("argparse", "ast", "inspect", "typing")
+
+
+def iter_code_objects(code):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from iter_code_objects(const)
+
+
+def load_code_objects(module):
+    path = os.path.join(os.path.dirname(os.__file__), module + ".py")
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    return list(iter_code_objects(compile(source, path, "exec")))
+
+
+def trace_from_code(codes):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        bytecodes = [ConcreteBytecode.from_code(code) for code in codes]
+        duration = time.perf_counter() - start
+        return bytecodes, duration, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    location_size = sys.getsizeof(InstrLocation(1, 1, 0, 0))
+    print(
+        "%10s %10s %10s %12s %14s %14s"
+        % (
+            "module",
+            "instrs",
+            "locations",
+            "from_code (s)",
+            "saved (KiB)",
+            "alive (KiB)",
+        )
+    )
+    for module in MODULES:
+        bytecodes, duration, alive = trace_from_code(load_code_objects(module))
+        locations = [instr.location for bytecode in bytecodes for instr in bytecode]
+        n_distinct = len({id(location) for location in locations})
+        saved = (len(locations) - n_distinct) * location_size
+        print(
+            "%10s %10d %10d %12.4f %14.1f %14.1f"
+            % (
+                module,
+                len(locations),
+                n_distinct,
+                duration,
+                saved / 1024,
+                alive / 1024,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
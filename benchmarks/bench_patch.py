@@ -0,0 +1,132 @@
+"""Benchmark the patching of concrete bytecode.
+
+A constant of functions of increasing size is replaced by a probe loading
+another constant, which requires to update the jumps and the exception table:
+
+- abstract: by converting the concrete bytecode to abstract bytecode, editing
+  it and converting it back to concrete bytecode,
+- patch: with ConcreteBytecode.patch.
+
+The time spent editing the concrete bytecode and the total time spent creating
+the new code object from the original one are reported.
+
+Run with: python benchmarks/bench_patch.py
+
+"""
+
+import time
+import types
+
+from bytecode import ConcreteBytecode, ConcreteInstr, Instr
+
+SIZES = (10, 100, 1_000)
+
+
+def make_code(n_blocks):
+    lines = ["def func(a):", "    x = 0"]
+    for i in range(n_blocks):
+        lines.extend(
+            [
+                "    try:",
+                f"        x += a * {i}",
+                "    except Exception:",
+                f"        x -= {i}",
+            ]
+        )
+    lines.append("    return x")
+    namespace = {}
+    exec(compile("\n".join(lines), "<patch>", "exec"), namespace)
+    return namespace["func"].__code__
+
+
+def find_const(concrete, value):
+    const_index = concrete.consts.index(value)
+    return next(
+        i
+        for i, instr in enumerate(concrete)
+        if instr.name == "LOAD_CONST" and instr.arg == const_index
+    )
+
+
+def edit_abstract(concrete, value, new_value):
+    bytecode = concrete.to_bytecode(conserve_exception_block_stackdepth=True)
+    index = next(
+        i
+        for i, instr in enumerate(bytecode)
+        if isinstance(instr, Instr)
+        and instr.name == "LOAD_CONST"
+        and instr.arg == value
+    )
+    bytecode[index : index + 1] = [
+        Instr("NOP"),
+        Instr("LOAD_CONST", None),
+        Instr("POP_TOP"),
+        Instr("LOAD_CONST", new_value),
+    ]
+    return bytecode.to_concrete_bytecode(compute_exception_stack_depths=False)
+
+
+def edit_patch(concrete, value, new_value):
+    index = find_const(concrete, value)
+    consts = concrete.consts
+    consts.extend([None, new_value])
+    concrete.patch(
+        index,
+        [
+            ConcreteInstr("NOP"),
+            ConcreteInstr("LOAD_CONST", len(consts) - 2),
+            ConcreteInstr("POP_TOP"),
+            ConcreteInstr("LOAD_CONST", len(consts) - 1),
+        ],
+    )
+    return concrete
+
+
+def bench(edit, code, value, repeat=10):
+    best_edit = best_total = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        concrete = ConcreteBytecode.from_code(code)
+        edit_start = time.perf_counter()
+        concrete = edit(concrete, value, -1)
+        edit_time = time.perf_counter() - edit_start
+        new_code = concrete.to_code(code.co_stacksize, mode="fast")
+        best_total = min(best_total, time.perf_counter() - start)
+        best_edit = min(best_edit, edit_time)
+    return best_edit, best_total, new_code
+
+
+def main():
+    print(
+        "%8s %8s %10s %12s %10s %12s"
+        % ("blocks", "instrs", "method", "edit (us)", "speedup", "total (us)")
+    )
+    for n_blocks in SIZES:
+        code = make_code(n_blocks)
+        n_instrs = len(ConcreteBytecode.from_code(code))
+        # Patch the constant of the block in the middle of the function
+        value = n_blocks // 2
+        reference = None
+        results = set()
+        for name, edit in (("abstract", edit_abstract), ("patch", edit_patch)):
+            edit_time, total_time, new_code = bench(edit, code, value)
+            if reference is None:
+                reference = edit_time
+            results.add(types.FunctionType(new_code, {})(1))
+            print(
+                "%8d %8d %10s %12.1f %10.2f %12.1f"
+                % (
+                    n_blocks,
+                    n_instrs,
+                    name,
+                    edit_time * 1e6,
+                    reference / edit_time,
+                    total_time * 1e6,
+                )
+            )
+        if len(results) != 1:
+            raise AssertionError("patched functions differ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Benchmark the insertion of line probes in large functions.
+
+A probe calling a function with the line number is inserted before the first
+instruction of each line of synthetic functions made of try blocks:
+
+- naive: with one list.insert call per instruction of each probe,
+- batch: with a single Bytecode.insert_instructions call.
+
+The time spent inserting the probes and the time spent inserting them and
+converting the bytecode to a code object are reported.
+
+Run with: python benchmarks/bench_probes.py
+
+"""
+
+import sys
+import time
+
+from bytecode import Bytecode, Instr
+
+SIZES = (100, 500, 2_000)
+
+
+def probe(lineno):
+    pass
+
+
+def make_code(n_lines):
+    lines = ["def func(a):", "    x = 0"]
+    for i in range(0, n_lines, 4):
+        lines.extend(
+            [
+                "    try:",
+                f"        x += a * {i}",
+                "    except Exception:",
+                f"        x -= {i}",
+            ]
+        )
+    lines.append("    return x")
+    namespace = {}
+    exec(compile("\n".join(lines), "<probes>", "exec"), namespace)
+    return namespace["func"].__code__
+
+
+def make_probe(lineno):
+    instructions = [
+        Instr("LOAD_CONST", probe),
+        Instr("LOAD_CONST", lineno),
+    ]
+    if sys.version_info >= (3, 11):
+        instructions.insert(0, Instr("PUSH_NULL"))
+    if sys.version_info >= (3, 12):
+        instructions.append(Instr("CALL", 1))
+    elif sys.version_info >= (3, 11):
+        instructions.extend([Instr("PRECALL", 1), Instr("CALL", 1)])
+    else:
+        instructions.append(Instr("CALL_FUNCTION", 1))
+    instructions.append(Instr("POP_TOP"))
+    return instructions
+
+
+def get_line_starts(bytecode):
+    starts = []
+    previous_lineno = None
+    for index, instr in enumerate(bytecode):
+        if isinstance(instr, Instr) and instr.lineno != previous_lineno:
+            previous_lineno = instr.lineno
+            starts.append((index, instr.lineno))
+    return starts
+
+
+def insert_naive(bytecode):
+    for index, lineno in reversed(get_line_starts(bytecode)):
+        for instr in reversed(make_probe(lineno)):
+            bytecode.insert(index, instr)
+
+
+def insert_batch(bytecode):
+    lines = {lineno for _, lineno in get_line_starts(bytecode)}
+    bytecode.insert_instructions(
+        {lineno: make_probe(lineno) for lineno in lines}, by_line=True
+    )
+
+
+def bench(code, insert, to_code, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        bytecode = Bytecode.from_code(code)
+        start = time.perf_counter()
+        insert(bytecode)
+        if to_code:
+            bytecode.to_code()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(
+        "%8s %8s %8s %12s %12s %20s"
+        % ("lines", "instrs", "method", "insert (ms)", "speedup", "insert+to_code (ms)")
+    )
+    for n_lines in SIZES:
+        code = make_code(n_lines)
+        n_instrs = len(Bytecode.from_code(code))
+        reference = None
+        for name, insert in (("naive", insert_naive), ("batch", insert_batch)):
+            duration = bench(code, insert, False)
+            if reference is None:
+                reference = duration
+            print(
+                "%8d %8d %8s %12.2f %12.2f %20.2f"
+                % (
+                    n_lines,
+                    n_instrs,
+                    name,
+                    duration * 1e3,
+                    reference / duration,
+                    bench(code, insert, True) * 1e3,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark full round-trips of standard library code objects.
+
+Each code object is converted to abstract bytecode, to a control flow graph and
+back to a code object, exercising the instruction predicates (jumps, final
+instructions, arguments) at every stage. The same conversions without
+modifications, for which the original code object is returned, are timed too.
+
+Run with: python benchmarks/bench_roundtrip.py
+
+"""
+
+import os
+import time
+import types
+
+from bytecode import Bytecode, ControlFlowGraph
+
+MODULES = ("argparse", "ast", "inspect", "json/decoder", "typing")
+
+
+def iter_code_objects(code):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from iter_code_objects(const)
+
+
+def load_code_objects(module):
+    path = os.path.join(os.path.dirname(os.__file__), module + ".py")
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    return list(iter_code_objects(compile(source, path, "exec")))
+
+
+def roundtrip(codes):
+    for code in codes:
+        # A copy is not tied to the original code object and is assembled again
+        bytecode = Bytecode.from_code(code).copy()
+        cfg = ControlFlowGraph.from_bytecode(bytecode)
+        cfg.to_code()
+
+
+def passthrough(codes):
+    for code in codes:
+        bytecode = Bytecode.from_code(code)
+        cfg = ControlFlowGraph.from_bytecode(bytecode)
+        assert cfg.to_code() is code
+
+
+def bench(func, codes, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(codes)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(
+        "%15s %10s %14s %16s" % ("module", "codes", "roundtrip (s)", "unmodified (s)")
+    )
+    for module in MODULES:
+        codes = load_code_objects(module)
+        print(
+            "%15s %10d %14.4f %16.4f"
+            % (module, len(codes), bench(roundtrip, codes), bench(passthrough, codes))
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark the serialization of abstract bytecode and control flow graphs.
+
+The code objects of some modules of the standard library are converted to
+bytecode and control flow graphs which are serialized and loaded again:
+
+- with to_bytes and from_bytes,
+- with pickle,
+- by marshalling the assembled code object, and converting the code object
+  loaded by marshal back to bytecode or to a control flow graph.
+
+The total size of the serialized data and the time spent serializing and
+loading all the code objects of each module are reported.
+
+Run with: python benchmarks/bench_serialize.py
+
+"""
+
+import marshal
+import os
+import pickle
+import time
+import types
+
+from bytecode import Bytecode, ControlFlowGraph
+
+MODULES = ("os", "typing", "_pydecimal")
+
+
+def iter_code_objects(code):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from iter_code_objects(const)
+
+
+def load_code(module):
+    path = os.path.join(os.path.dirname(os.__file__), *module.split(".")) + ".py"
+    with open(path, encoding="utf-8") as f:
+        return compile(f.read(), path, "exec")
+
+
+def bench(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def dump_bytes(objs):
+    return [obj.to_bytes() for obj in objs]
+
+
+def dump_pickle(objs):
+    return [pickle.dumps(obj, pickle.HIGHEST_PROTOCOL) for obj in objs]
+
+
+def dump_code(objs):
+    return [marshal.dumps(obj.to_code()) for obj in objs]
+
+
+def load_bytecode_code(data):
+    return Bytecode.from_code(marshal.loads(data))
+
+
+def load_cfg_code(data):
+    return ControlFlowGraph.from_bytecode(Bytecode.from_code(marshal.loads(data)))
+
+
+def bench_method(name, kind, method, objs, dump, load):
+    dump_time, dumped = bench(lambda: dump(objs))
+    load_time, _ = bench(lambda: [load(data) for data in dumped])
+    print(
+        "%12s %5s %10s %10.1f %10.2f %10.2f"
+        % (
+            name,
+            kind,
+            method,
+            sum(map(len, dumped)) / 1024,
+            dump_time * 1e3,
+            load_time * 1e3,
+        )
+    )
+
+
+def bench_module(name):
+    codes = list(iter_code_objects(load_code(name)))
+    # Objects which were not created by from_code, so that to_code assembles
+    # them instead of reusing the code objects they were created from.
+    bytecodes = [
+        Bytecode.from_bytes(Bytecode.from_code(code).to_bytes()) for code in codes
+    ]
+    cfgs = [ControlFlowGraph.from_bytecode(bytecode) for bytecode in bytecodes]
+    for kind, objs, from_bytes, load_code_object in (
+        ("bc", bytecodes, Bytecode.from_bytes, load_bytecode_code),
+        ("cfg", cfgs, ControlFlowGraph.from_bytes, load_cfg_code),
+    ):
+        bench_method(name, kind, "to_bytes", objs, dump_bytes, from_bytes)
+        bench_method(name, kind, "pickle", objs, dump_pickle, pickle.loads)
+        bench_method(name, kind, "marshal", objs, dump_code, load_code_object)
+
+
+def main():
+    print(
+        "%12s %5s %10s %10s %10s %10s"
+        % ("module", "kind", "method", "size (KiB)", "dump (ms)", "load (ms)")
+    )
+    for module in MODULES:
+        bench_module(module)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Benchmark the computation of the stack size of control flow graphs.
+
+The generated functions nest try/except blocks whose bodies contain many
+conditional expressions, so that the control flow graph contains many small
+blocks inside exception handling regions.
+
+Run with: python benchmarks/bench_stacksize.py
+
+"""
+
+import time
+
+from bytecode import Bytecode, ControlFlowGraph
+
+
+def make_cfg(depth, width):
+    lines = ["def f(x):"]
+    indent = "    "
+    for _ in range(depth):
+        lines.append(indent + "try:")
+        indent += "    "
+        lines.extend(indent + "x = g(x, %d) if x else h(x)" % i for i in range(width))
+    for _ in range(depth):
+        indent = indent[:-4]
+        lines.append(indent + "except ValueError as e:")
+        lines.append(indent + "    x = k(e, x)")
+
+    namespace = {}
+    exec(compile("\n".join(lines), "<bench>", "exec"), namespace)
+    return ControlFlowGraph.from_bytecode(Bytecode.from_code(namespace["f"].__code__))
+
+
+def bench_stacksize(cfg, use_worklist, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cfg.compute_stacksize(use_worklist=use_worklist)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print("%10s %10s %14s %14s" % ("depth", "blocks", "generators (s)", "worklist (s)"))
+    for depth, width in ((5, 50), (10, 100), (19, 200)):
+        cfg = make_cfg(depth, width)
+        print(
+            "%10d %10d %14.4f %14.4f"
+            % (
+                depth,
+                len(cfg),
+                bench_stacksize(cfg, False),
+                bench_stacksize(cfg, True),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
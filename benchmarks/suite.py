@@ -0,0 +1,249 @@
+"""Round-trip benchmark suite with per-stage timings.
+
+Code objects from a fixed corpus (standard library modules and synthetic large
+functions) are converted through every representation offered by bytecode and
+back to code objects. Each stage is timed separately over the whole corpus and
+its throughput (in code units, i.e. 2 bytes of co_code, per second) and the
+peak memory traced while running it are reported.
+
+Results can be written as JSON to be compared between releases:
+
+    python -m benchmarks --json before.json
+    python -m benchmarks --json after.json --compare before.json
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import types
+
+import bytecode
+from bytecode import ConcreteBytecode, ControlFlowGraph
+
+from . import bench_extended_args, bench_jumps, bench_names, bench_stacksize
+
+STDLIB_MODULES = (
+    "argparse",
+    "ast",
+    "collections/__init__",
+    "dataclasses",
+    "difflib",
+    "enum",
+    "inspect",
+    "json/decoder",
+    "pickle",
+    "tokenize",
+    "typing",
+)
+
+TESTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests")
+
+
+def iter_code_objects(code):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from iter_code_objects(const)
+
+
+def compile_file(path):
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    return compile(source, path, "exec")
+
+
+def load_stdlib_corpus():
+    stdlib = os.path.dirname(os.__file__)
+    sources = {}
+    for module in STDLIB_MODULES:
+        path = os.path.join(stdlib, module + ".py")
+        if os.path.exists(path):
+            sources[module] = compile_file(path)
+    return sources
+
+
+def load_synthetic_corpus():
+    return {
+        "long_lines_example": compile_file(
+            os.path.join(TESTS_DIR, "long_lines_example.py")
+        ),
+        "extended_args": bench_extended_args.make_code(12_500),
+        "jump_cascade": bench_jumps.make_bytecode(1_000).to_code(),
+        "many_names": bench_names.make_bytecode(2_500).to_code(),
+        "nested_try": bench_stacksize.make_cfg(10, 50).to_code(),
+    }
+
+
+# Each stage takes the list of results of a previous stage (or the code objects
+# of the corpus) and converts them.
+STAGES = (
+    (
+        "ConcreteBytecode.from_code",
+        "code",
+        lambda code: ConcreteBytecode.from_code(code),
+    ),
+    (
+        "ConcreteBytecode.to_bytecode",
+        "ConcreteBytecode.from_code",
+        lambda concrete: concrete.to_bytecode(),
+    ),
+    (
+        "ControlFlowGraph.from_bytecode",
+        "ConcreteBytecode.to_bytecode",
+        ControlFlowGraph.from_bytecode,
+    ),
+    (
+        "ControlFlowGraph.compute_stacksize",
+        "ControlFlowGraph.from_bytecode",
+        lambda cfg: cfg.compute_stacksize(),
+    ),
+    (
+        "ControlFlowGraph.to_bytecode",
+        "ControlFlowGraph.from_bytecode",
+        lambda cfg: cfg.to_bytecode(),
+    ),
+    (
+        "Bytecode.to_concrete_bytecode",
+        "ControlFlowGraph.to_bytecode",
+        # Exception stack depths were computed with the stack size
+        lambda bc: bc.to_concrete_bytecode(compute_exception_stack_depths=False),
+    ),
+)
+
+TO_CODE_STAGE = "ConcreteBytecode.to_code"
+
+
+def run_stages(codes, trace_memory=False):
+    """Run all the stages once and return their duration and peak memory."""
+    results = {"code": codes}
+    durations = {}
+    peaks = {}
+
+    def run(name, func, *inputs):
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        results[name] = [func(*args) for args in zip(*inputs)]
+        durations[name] = time.perf_counter() - start
+        if trace_memory:
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    for name, source, func in STAGES:
+        run(name, func, results[source])
+
+    # The stack size was computed at an earlier stage
+    run(
+        TO_CODE_STAGE,
+        lambda concrete, stacksize: concrete.to_code(
+            stacksize, compute_exception_stack_depths=False
+        ),
+        results["Bytecode.to_concrete_bytecode"],
+        results["ControlFlowGraph.compute_stacksize"],
+    )
+
+    return durations, peaks
+
+
+def bench_corpus(sources, repeat):
+    codes = [code for top in sources.values() for code in iter_code_objects(top)]
+    n_units = sum(len(code.co_code) // 2 for code in codes)
+
+    best = {}
+    for _ in range(repeat):
+        durations, _ = run_stages(codes)
+        for name, duration in durations.items():
+            best[name] = min(duration, best.get(name, duration))
+    _, peaks = run_stages(codes, trace_memory=True)
+
+    return {
+        "sources": sorted(sources),
+        "code_objects": len(codes),
+        "code_units": n_units,
+        "stages": {
+            name: {
+                "seconds": duration,
+                "code_units_per_second": n_units / duration if duration else None,
+                "peak_memory_kib": peaks[name] / 1024,
+            }
+            for name, duration in best.items()
+        },
+    }
+
+
+def run_suite(repeat):
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "bytecode": bytecode.__version__,
+        "repeat": repeat,
+        "corpora": {
+            "stdlib": bench_corpus(load_stdlib_corpus(), repeat),
+            "synthetic": bench_corpus(load_synthetic_corpus(), repeat),
+        },
+    }
+
+
+def print_results(results, reference=None):
+    for corpus, data in results["corpora"].items():
+        print(
+            "%s: %d code objects, %d code units"
+            % (corpus, data["code_objects"], data["code_units"])
+        )
+        header = "%36s %12s %14s %12s" % ("stage", "time (s)", "units/s", "peak (KiB)")
+        if reference is not None:
+            header += " %10s" % "vs ref"
+        print(header)
+        for stage, stats in data["stages"].items():
+            line = "%36s %12.4f %14.0f %12.1f" % (
+                stage,
+                stats["seconds"],
+                stats["code_units_per_second"] or 0,
+                stats["peak_memory_kib"],
+            )
+            if reference is not None:
+                try:
+                    ref = reference["corpora"][corpus]["stages"][stage]["seconds"]
+                except KeyError:
+                    line += " %10s" % "-"
+                else:
+                    line += " %9.2fx" % (ref / stats["seconds"])
+            print(line)
+        print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="number of timed runs of each stage"
+    )
+    parser.add_argument("--json", help="write the results as JSON to this file")
+    parser.add_argument(
+        "--compare", help="JSON results of a previous run to compare against"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.repeat)
+
+    reference = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            reference = json.load(f)
+    print_results(results, reference)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
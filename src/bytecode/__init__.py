@@ -1,15 +1,20 @@
 __all__ = [
     "BinaryOp",
+    "BulkTransformer",
     "Bytecode",
+    "CachingTransformer",
+    "CompactConcreteBytecode",
     "Compare",
     "CompilerFlags",
     "ConcreteBytecode",
     "ConcreteInstr",
     "ControlFlowGraph",
+    "ControlFlowGraphView",
     "Instr",
     "Label",
     "SetLineno",
     "__version__",
+    "transform_code_tree",
 ]
 
 from io import StringIO
@@ -21,10 +26,19 @@ from bytecode.bytecode import (
     Bytecode,
     _BaseBytecodeList,
     _InstrList,
+    get_code_reuse_count,
+    reset_code_reuse_count,
 )
+from bytecode.cache import CachingTransformer
 
 # import needed to use it in bytecode.py
-from bytecode.cfg import BasicBlock, ControlFlowGraph
+from bytecode.cfg import (
+    BasicBlock,
+    BasicBlockView,
+    ControlFlowGraph,
+    ControlFlowGraphView,
+)
+from bytecode.compact import CompactConcreteBytecode, ConcreteInstrView
 
 # import needed to use it in bytecode.py
 from bytecode.concrete import (
@@ -48,7 +62,9 @@ from bytecode.instr import (
     SetLineno,
     TryBegin,
     TryEnd,
+    opcode_pre_and_post_stack_effect,
 )
+from bytecode.transform import BulkTransformer, WorkerStats, transform_code_tree
 from bytecode.version import __version__
 
 
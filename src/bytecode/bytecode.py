@@ -1,4 +1,5 @@
 # alias to keep the 'bytecode' variable free
+import operator
 import sys
 import types
 from abc import abstractmethod
@@ -6,8 +7,11 @@ from typing import (
     Any,
     Dict,
     Generic,
+    Iterable,
     Iterator,
     List,
+    Literal,
+    Mapping,
     Optional,
     Sequence,
     SupportsIndex,
@@ -28,8 +32,24 @@ from bytecode.instr import (
     TryBegin,
     TryEnd,
 )
+from bytecode.serialize import dump_bytecode, load_bytecode
 from bytecode.utils import PY311
 
+# Number of to_code calls which returned the code object a bytecode was created
+# from since it was not modified.
+_code_reuse_count = 0
+
+
+def get_code_reuse_count() -> int:
+    """Number of to_code calls which returned the original code object."""
+    return _code_reuse_count
+
+
+def reset_code_reuse_count() -> None:
+    """Reset the counter returned by get_code_reuse_count."""
+    global _code_reuse_count
+    _code_reuse_count = 0
+
 
 class BaseBytecode:
     def __init__(self) -> None:
@@ -94,6 +114,13 @@ class BaseBytecode:
 
         return True
 
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        # The code object the bytecode was created from cannot be pickled
+        state.pop("_source_code", None)
+        state.pop("_source_state", None)
+        return state
+
     @property
     def flags(self) -> CompilerFlags:
         return self._flags
@@ -112,6 +139,115 @@ class BaseBytecode:
     def compute_stacksize(self, *, check_pre_and_post: bool = True) -> int:
         raise NotImplementedError
 
+    @staticmethod
+    def _check_to_code_mode(mode: str) -> None:
+        if mode not in ("safe", "fast"):
+            raise ValueError(f"mode must be 'safe' or 'fast', got {mode!r}")
+
+    # --- Tracking of the code object the bytecode was created from
+
+    # Code object from which the bytecode was created and snapshot of the
+    # bytecode at that time, used to detect modifications.
+    _source_code: Optional[types.CodeType] = None
+    _source_state: Any = None
+
+    def _iter_items(self) -> Iterable[Any]:
+        """Iterate over the objects whose identity is part of the snapshot."""
+        raise NotImplementedError
+
+    def _get_attrs_state(self) -> List[Any]:
+        """State of the attributes compared by value against the snapshot."""
+        return [
+            self.argcount,
+            self.posonlyargcount,
+            self.kwonlyargcount,
+            self._flags,
+            self.first_lineno,
+            self.name,
+            self.qualname,
+            self.filename,
+            self.docstring,
+            list(self.cellvars),
+            list(self.freevars),
+        ]
+
+    @staticmethod
+    def _get_items_state(items: List[Any]) -> Optional[List[Any]]:
+        """State of the pseudo instructions, None if an instruction was modified.
+
+        Exception stack depths are not part of the state since they are computed
+        by compute_stacksize.
+
+        """
+        state: List[Any] = []
+        for item in items:
+            if isinstance(item, BaseInstr):
+                if item._modified:
+                    return None
+            elif isinstance(item, TryBegin):
+                # Targets are part of the items so their id cannot be reused
+                state.append((id(item.target), item.push_lasti))
+            elif isinstance(item, TryEnd):
+                state.append(id(item.entry))
+        return state
+
+    def _set_source_code(self, code: types.CodeType) -> None:
+        """Remember the code object matching the current state of the bytecode."""
+        items = list(self._iter_items())
+        for item in items:
+            if isinstance(item, BaseInstr):
+                item._modified = False
+        self._source_code = code
+        self._source_state = (
+            self._get_attrs_state(),
+            items,
+            self._get_items_state(items),
+        )
+
+    def _get_source_code(self) -> Optional[types.CodeType]:
+        """Return the code object the bytecode was created from if unmodified."""
+        code = self._source_code
+        if code is None:
+            return None
+
+        attrs_state, items, items_state = self._source_state
+        if self._get_attrs_state() != attrs_state:
+            return None
+        current_items = list(self._iter_items())
+        if len(current_items) != len(items) or not all(
+            map(operator.is_, current_items, items)
+        ):
+            return None
+        if self._get_items_state(items) != items_state:
+            return None
+
+        return code
+
+    def _transfer_source_code(self, bytecode: "BaseBytecode") -> None:
+        """Mark a bytecode converted from this one as matching the same code."""
+        code = self._get_source_code()
+        if code is not None:
+            bytecode._set_source_code(code)
+
+    def _reuse_source_code(
+        self, stacksize: Optional[int], compute_exception_stack_depths: bool
+    ) -> Optional[types.CodeType]:
+        """Code object to return from to_code if the bytecode was not modified.
+
+        Exception stack depths provided by the user are not tracked, so the
+        code object is only reused if they are recomputed.
+
+        """
+        if self._source_code is None or not compute_exception_stack_depths:
+            return None
+        code = self._get_source_code()
+        if code is None or stacksize not in (None, code.co_stacksize):
+            return None
+
+        global _code_reuse_count
+        _code_reuse_count += 1
+        return code
+
 
 T = TypeVar("T", bound="_BaseBytecodeList")
 U = TypeVar("U")
@@ -173,6 +309,10 @@ class _BaseBytecodeList(BaseBytecode, list, Generic[U]):
     def _check_instr(self, instr):
         raise NotImplementedError()
 
+    def _iter_items(self) -> Iterable[Any]:
+        # Avoid the validation performed by __iter__
+        return list.__iter__(self)
+
 
 V = TypeVar("V")
 
@@ -272,6 +412,11 @@ class Bytecode(
         if isinstance(bytecode, Bytecode):
             self.argnames = bytecode.argnames
 
+    def _get_attrs_state(self) -> List[Any]:
+        state = super()._get_attrs_state()
+        state.append(list(self.argnames))
+        return state
+
     @staticmethod
     def from_code(
         code: types.CodeType,
@@ -284,9 +429,100 @@ class Bytecode(
             conserve_exception_block_stackdepth=conserve_exception_block_stackdepth,
         )
 
+    @staticmethod
+    def from_bytes(data: bytes) -> "Bytecode":
+        """Load a bytecode serialized by :meth:`to_bytes`."""
+        return load_bytecode(data)
+
+    def to_bytes(self) -> bytes:
+        """Serialize the bytecode to a compact binary format.
+
+        Labels and exception handling pseudo instructions keep referring to
+        the same objects once loaded with :meth:`from_bytes`. Constants are
+        marshalled and the data can only be loaded by the same Python version.
+
+        """
+        return dump_bytecode(self)
+
+    def insert_instructions(
+        self,
+        insertions: Mapping[int, Iterable[Instr]],
+        *,
+        by_line: bool = False,
+    ) -> None:
+        """Insert sequences of instructions at many positions in a single pass.
+
+        *insertions* maps the index of an item of the bytecode (or a line number
+        if *by_line* is true) to the instructions to insert. The instructions
+        are inserted right before the instruction found at or after the index,
+        after the labels and pseudo instructions preceding it, so that they are
+        reached by the same jumps and covered by the same exception handlers.
+        Instructions inserted at ``len(bytecode)`` are appended.
+
+        If *by_line* is true, the instructions are inserted before each
+        instruction starting a sequence of instructions of the line. Lines
+        without instructions are ignored.
+
+        Inserted instructions without a location are copied and get the
+        location of the instruction they are inserted before.
+
+        """
+        items = list(list.__iter__(self))
+        if not by_line:
+            for index in insertions:
+                if not 0 <= index <= len(items):
+                    raise IndexError("insertion index %r out of range" % index)
+
+        new_items: List[Union[Instr, Label, TryBegin, TryEnd, SetLineno]] = []
+        pending: List[Instr] = []
+        set_lineno: Optional[int] = None
+        current_lineno: Optional[int] = self.first_lineno
+        previous_lineno: Optional[int] = None
+        for index, item in enumerate(items):
+            if not by_line:
+                inserted = insertions.get(index)
+                if inserted is not None:
+                    pending.extend(inserted)
+            elif isinstance(item, SetLineno):
+                set_lineno = item.lineno
+            elif isinstance(item, Instr):
+                # Line of the instruction once legalized
+                lineno: Optional[int]
+                if set_lineno is not None:
+                    lineno = set_lineno
+                elif item.lineno is UNSET:
+                    lineno = current_lineno
+                else:
+                    lineno = current_lineno = item.lineno  # type: ignore
+                if lineno != previous_lineno and lineno is not None:
+                    inserted = insertions.get(lineno)
+                    if inserted is not None:
+                        pending.extend(inserted)
+                previous_lineno = lineno
+
+            if pending and isinstance(item, Instr):
+                location = item._location
+                for instr in pending:
+                    self._check_instr(instr)
+                    if location is not None and instr._location is None:
+                        instr = instr.copy()
+                        instr._location = location
+                    new_items.append(instr)
+                pending = []
+            new_items.append(item)
+
+        if not by_line:
+            inserted = insertions.get(len(items))
+            if inserted is not None:
+                pending.extend(inserted)
+        for instr in pending:
+            self._check_instr(instr)
+        new_items.extend(pending)
+        self[:] = new_items
+
     def compute_stacksize(self, *, check_pre_and_post: bool = True) -> int:
-        cfg = _bytecode.ControlFlowGraph.from_bytecode(self)
-        return cfg.compute_stacksize(check_pre_and_post=check_pre_and_post)
+        view = _bytecode.ControlFlowGraphView(self)
+        return view.compute_stacksize(check_pre_and_post=check_pre_and_post)
 
     def to_code(
         self,
@@ -295,10 +531,32 @@ class Bytecode(
         *,
         check_pre_and_post: bool = True,
         compute_exception_stack_depths: bool = True,
+        mode: Literal["safe", "fast"] = "safe",
     ) -> types.CodeType:
+        self._check_to_code_mode(mode)
+        code = self._reuse_source_code(stacksize, compute_exception_stack_depths)
+        if code is not None:
+            return code
+
+        if mode == "fast" and (
+            not (PY311 and compute_exception_stack_depths)
+            or all(
+                instr.stack_depth is not UNSET
+                for instr in self
+                if isinstance(instr, TryBegin)
+            )
+        ):
+            # The exception stack depths are already known so only the stack
+            # size is computed, and the graph is not converted back to bytecode.
+            if stacksize is None:
+                stacksize = self.compute_stacksize(
+                    check_pre_and_post=check_pre_and_post
+                )
+            compute_exception_stack_depths = False
+
         # Prevent reconverting the concrete bytecode to bytecode and cfg to do the
         # calculation if we need to do it.
-        if stacksize is None or (PY311 and compute_exception_stack_depths):
+        elif stacksize is None or (PY311 and compute_exception_stack_depths):
             cfg = _bytecode.ControlFlowGraph.from_bytecode(self)
             stacksize = cfg.compute_stacksize(
                 check_pre_and_post=check_pre_and_post,
@@ -321,7 +579,9 @@ class Bytecode(
         compute_exception_stack_depths: bool = True,
     ) -> "_bytecode.ConcreteBytecode":
         converter = _bytecode._ConvertBytecodeToConcrete(self)
-        return converter.to_concrete_bytecode(
+        concrete = converter.to_concrete_bytecode(
             compute_jumps_passes=compute_jumps_passes,
             compute_exception_stack_depths=compute_exception_stack_depths,
         )
+        self._transfer_source_code(concrete)
+        return concrete
@@ -0,0 +1,121 @@
+import hashlib
+import marshal
+import mmap
+import os
+import sys
+from importlib.util import MAGIC_NUMBER
+from types import CodeType, FunctionType
+from typing import Any, Callable, Optional, Union
+
+from bytecode.version import __version__
+
+# Code transformer, called with a code object (and possibly some additional
+# arguments such as the module being imported) and returning a code object.
+_Transformer = Callable[..., CodeType]
+
+
+class CachingTransformer:
+    """Code transformer caching the code objects it produces on disk.
+
+    The code objects returned by *transformer* are marshalled in *directory*,
+    so that the transformation of a module is paid once rather than on every
+    process start when used in an import hook. Additional arguments are passed
+    to *transformer* but are not part of the key: its result must only depend
+    on the code object.
+
+    """
+
+    def __init__(
+        self,
+        transformer: _Transformer,
+        directory: Union[str, "os.PathLike[str]"],
+        *,
+        name: Optional[str] = None,
+        version: str = "",
+    ) -> None:
+        self.transformer = transformer
+        self.directory = os.fspath(directory)
+        if name is None:
+            name = self._get_default_name(transformer)
+        self.name: str = name
+        self.version: str = version
+        #: Number of code objects loaded from the cache
+        self.hits = 0
+        #: Number of code objects transformed (and stored in the cache)
+        self.misses = 0
+
+    @staticmethod
+    def _get_default_name(transformer: _Transformer) -> str:
+        # Only a function defined at the top level of a module (or in a class)
+        # is identified by its qualified name: partials, lambdas, closures,
+        # bound methods and other callable objects carry state which would be
+        # ignored, so that different transformers would share entries.
+        qualname = getattr(transformer, "__qualname__", None)
+        if (
+            not isinstance(transformer, FunctionType)
+            or qualname is None
+            or "<" in qualname
+        ):
+            raise ValueError(
+                "a name is required for the transformer %r which has no "
+                "unique qualified name" % (transformer,)
+            )
+        return "%s.%s" % (transformer.__module__, qualname)
+
+    def __call__(self, code: CodeType, *args: Any) -> CodeType:
+        path = self.get_path(code)
+        cached = self._load(path)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        new_code = self.transformer(code, *args)
+        self._store(path, new_code)
+        return new_code
+
+    def get_path(self, code: CodeType) -> str:
+        """Get the path of the cache entry of a code object."""
+        digest = hashlib.sha256(
+            repr(
+                (
+                    MAGIC_NUMBER,
+                    sys.flags.optimize,
+                    __version__,
+                    self.name,
+                    self.version,
+                    code.co_filename,
+                )
+            ).encode()
+        )
+        # The key is the code object itself rather than the source of its
+        # module: the source may have changed since the code was compiled.
+        digest.update(marshal.dumps(code))
+        return os.path.join(self.directory, digest.hexdigest() + ".code")
+
+    @staticmethod
+    def _load(path: str) -> Optional[CodeType]:
+        try:
+            with open(path, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as data:
+                code = marshal.loads(data)
+        # A missing, empty or corrupted entry is a cache miss
+        except (OSError, ValueError, EOFError, TypeError):
+            return None
+        return code if isinstance(code, CodeType) else None
+
+    def _store(self, path: str, code: CodeType) -> None:
+        # Write the entry atomically so that concurrent processes never load a
+        # partial entry. The cache is best effort: errors are ignored.
+        tmp_path = "%s.%s.tmp" % (path, os.getpid())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(marshal.dumps(code))
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
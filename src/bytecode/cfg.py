@@ -1,15 +1,20 @@
+import itertools
 import sys
 import types
 from collections import defaultdict
 from dataclasses import dataclass
 from typing import (
     Any,
+    Callable,
     Dict,
     Generator,
+    Generic,
     Iterable,
     Iterator,
     List,
+    Literal,
     Optional,
+    Sequence,
     Set,
     SupportsIndex,
     Tuple,
@@ -23,11 +28,15 @@ import bytecode as _bytecode
 from bytecode.concrete import ConcreteInstr
 from bytecode.flags import CompilerFlags
 from bytecode.instr import UNSET, Instr, Label, SetLineno, TryBegin, TryEnd
+from bytecode.serialize import dump_cfg, load_cfg
 from bytecode.utils import PY310, PY311, PY313
 
 T = TypeVar("T", bound="BasicBlock")
 U = TypeVar("U", bound="ControlFlowGraph")
 
+# Blocks on which the stack usage can be computed
+_Block = Union["BasicBlock", "BasicBlockView"]
+
 
 class BasicBlock(_bytecode._InstrList[Union[Instr, SetLineno, TryBegin, TryEnd]]):
     def __init__(
@@ -196,6 +205,11 @@ class _StackSizeComputationStorage:
     #: we start with this size.
     exception_block_maxsize: Dict[int, int]
 
+    #: Map the target of a jump or of a TryBegin to the block it refers to. For a
+    #: ControlFlowGraph the target is the block itself while a ControlFlowGraphView
+    #: resolves the labels of the underlying Bytecode.
+    get_block: Callable[[Any], Any]
+
 
 class _StackSizeComputer:
     """Helper computing the stack usage for a single block."""
@@ -204,7 +218,7 @@ class _StackSizeComputer:
     common: _StackSizeComputationStorage
 
     #: Block this helper is running the computation for.
-    block: BasicBlock
+    block: "_Block"
 
     #: Current stack usage.
     size: int
@@ -228,7 +242,7 @@ class _StackSizeComputer:
     def __init__(
         self,
         common: _StackSizeComputationStorage,
-        block: BasicBlock,
+        block: "_Block",
         size: int,
         maxsize: int,
         minsize: int,
@@ -311,9 +325,8 @@ class _StackSizeComputer:
                     continue
 
                 # Compute the stack usage of the exception handler
-                assert isinstance(instr.entry.target, BasicBlock)
                 yield from self._compute_exception_handler_stack_usage(
-                    instr.entry.target,
+                    self.common.get_block(instr.entry.target),
                     instr.entry.push_lasti,
                 )
                 self._current_try_begin = None
@@ -334,10 +347,9 @@ class _StackSizeComputer:
                 # Yield the parameters required to compute the stacksize required
                 # by the block to which the jump points to and resume when we now
                 # the maxsize.
-                assert isinstance(instr.arg, BasicBlock)
                 maxsize = yield _StackSizeComputer(
                     self.common,
-                    instr.arg,
+                    self.common.get_block(instr.arg),
                     taken_size,
                     maxsize,
                     minsize,
@@ -365,9 +377,8 @@ class _StackSizeComputer:
                     if (
                         te := self.block.get_trailing_try_end(i)
                     ) and te.entry is self._current_try_begin:
-                        assert isinstance(te.entry.target, BasicBlock)
                         yield from self._compute_exception_handler_stack_usage(
-                            te.entry.target,
+                            self.common.get_block(te.entry.target),
                             te.entry.push_lasti,
                         )
 
@@ -388,9 +399,8 @@ class _StackSizeComputer:
                 # Check for TryEnd after the final instruction which is possible
                 # TryEnd being only pseudo instructions.
                 if te := self.block.get_trailing_try_end(i):
-                    assert isinstance(te.entry.target, BasicBlock)
                     yield from self._compute_exception_handler_stack_usage(
-                        te.entry.target,
+                        self.common.get_block(te.entry.target),
                         te.entry.push_lasti,
                     )
 
@@ -426,7 +436,7 @@ class _StackSizeComputer:
         self.maxsize = maxsize
 
     def _compute_exception_handler_stack_usage(
-        self, block: BasicBlock, push_lasti: bool
+        self, block: "_Block", push_lasti: bool
     ) -> Generator[Union["_StackSizeComputer", int], int, None]:
         b_id = id(block)
         if self.minsize < self.common.exception_block_startsize[b_id]:
@@ -461,6 +471,533 @@ class _StackSizeComputer:
                 return True
 
 
+class _FallbackToComputer(Exception):
+    """Raised when the worklist engine cannot guarantee the generators results."""
+
+
+class _StackDepthWorklist:
+    """Worklist based computation of the stack usage of a control flow graph.
+
+    Each block is analyzed once, from a single entry state, and blocks are
+    processed from a worklist of block indices rather than by spawning a
+    generator per block visit. Exception handlers are processed once the regular
+    flow has been exhausted so that their entry depth is known when they are
+    analyzed.
+
+    This is only valid if every block is reached with a consistent state (same
+    stack size, exception handling status and pending TryBegin), which is the case
+    for the code produced by CPython. Otherwise :class:`_FallbackToComputer` is
+    raised and the generator based computation, which explores all distinct entry
+    states, should be used instead.
+
+    """
+
+    #: Should we check that all stack operation are "safe".
+    check_pre_and_post: bool
+
+    #: Stack size on entry of each block, None for blocks that have not been
+    #: reached. For exception handlers, this is the size before the interpreter
+    #: pushes the exception.
+    entry_sizes: List[Optional[int]]
+
+    #: Exception handling status with which each block is entered.
+    entry_handlers: List[Optional[bool]]
+
+    #: TryBegin pending when entering each block.
+    entry_try_begins: List[Optional[TryBegin]]
+
+    #: Minimal stack usage since the pending TryBegin when entering each block.
+    entry_minsizes: List[int]
+
+    #: Blocks that have already been analyzed.
+    processed: List[bool]
+
+    #: Encountered TryBegin pseudo-instructions.
+    try_begins: List[TryBegin]
+
+    #: Maximal stack usage.
+    maxsize: int
+
+    def __init__(
+        self,
+        cfg: Union["ControlFlowGraph", "ControlFlowGraphView"],
+        check_pre_and_post: bool,
+    ) -> None:
+        nblocks = len(cfg)
+        self.check_pre_and_post = check_pre_and_post
+        self.entry_sizes = [None] * nblocks
+        self.entry_handlers = [None] * nblocks
+        self.entry_try_begins = [None] * nblocks
+        self.entry_minsizes = [0] * nblocks
+        self.processed = [False] * nblocks
+        self.try_begins = []
+        self.maxsize = 0
+        self._blocks = cfg._blocks
+        self._block_index = cfg._block_index
+        self._worklist: List[int] = []
+        self._handlers_worklist: List[int] = []
+
+    def run(self, initial_stack_size: int) -> int:
+        """Compute the stack usage starting from the first block."""
+        self._reach(0, initial_stack_size, 0, None)
+
+        worklist = self._worklist
+        handlers_worklist = self._handlers_worklist
+        while worklist or handlers_worklist:
+            index = worklist.pop() if worklist else handlers_worklist.pop()
+            self.processed[index] = True
+            self._process(index)
+
+        return self.maxsize
+
+    # --- Private API
+
+    _blocks: Sequence["_Block"]
+
+    _block_index: Dict[int, int]
+
+    _worklist: List[int]
+
+    _handlers_worklist: List[int]
+
+    def _get_index(self, block: Union["_Block", Label]) -> int:
+        try:
+            return self._block_index[id(block)]
+        except KeyError:
+            raise _FallbackToComputer() from None
+
+    def _reach(
+        self, index: int, size: int, minsize: int, try_begin: Optional[TryBegin]
+    ) -> None:
+        if self.entry_sizes[index] is None:
+            self.entry_sizes[index] = size
+            self.entry_minsizes[index] = minsize
+            self.entry_try_begins[index] = try_begin
+            self._worklist.append(index)
+        elif (
+            self.entry_sizes[index] != size
+            or self.entry_handlers[index] is not None
+            or self.entry_try_begins[index] is not try_begin
+            or self.entry_minsizes[index] != minsize
+        ):
+            raise _FallbackToComputer()
+
+    def _reach_handler(
+        self, block: Union["_Block", Label], size: int, push_lasti: bool
+    ) -> None:
+        index = self._get_index(block)
+        entry_size = self.entry_sizes[index]
+        if entry_size is None:
+            self.entry_sizes[index] = size
+            self.entry_minsizes[index] = size
+            self.entry_handlers[index] = push_lasti
+            self._handlers_worklist.append(index)
+        elif self.entry_handlers[index] is not push_lasti:
+            raise _FallbackToComputer()
+        elif size < entry_size:
+            # The handler must be analyzed with the smallest size with which
+            # it can be reached.
+            if self.processed[index]:
+                raise _FallbackToComputer()
+            self.entry_sizes[index] = self.entry_minsizes[index] = size
+
+    def _process(self, index: int) -> None:
+        block = self._blocks[index]
+        size = self.entry_sizes[index]
+        assert size is not None
+        minsize = self.entry_minsizes[index]
+        maxsize = self.maxsize
+        current_try_begin = self.entry_try_begins[index]
+        check_pre_and_post = self.check_pre_and_post
+
+        exception_handler = self.entry_handlers[index]
+        if exception_handler is not None:
+            size, maxsize, minsize = _update_size(
+                0, 1 + exception_handler, size, maxsize, minsize
+            )
+
+        for i, instr in enumerate(block):
+            if isinstance(instr, SetLineno):
+                continue
+
+            if isinstance(instr, TryBegin):
+                assert current_try_begin is None
+                self.try_begins.append(instr)
+                current_try_begin = instr
+                minsize = size
+                continue
+
+            elif isinstance(instr, TryEnd):
+                if instr.entry is not current_try_begin:
+                    continue
+                self._reach_handler(instr.entry.target, minsize, instr.entry.push_lasti)
+                current_try_begin = None
+                continue
+
+            if instr.has_jump():
+                effect = (
+                    instr.pre_and_post_stack_effect(jump=True)
+                    if check_pre_and_post
+                    else (instr.stack_effect(jump=True), 0)
+                )
+                taken_size, maxsize, taken_minsize = _update_size(
+                    *effect, size, maxsize, minsize
+                )
+                self._reach(
+                    self._get_index(instr.arg),
+                    taken_size,
+                    taken_minsize,
+                    None
+                    if instr.is_final() and block.get_trailing_try_end(i)
+                    else current_try_begin,
+                )
+
+                if instr.is_uncond_jump():
+                    if (
+                        te := block.get_trailing_try_end(i)
+                    ) and te.entry is current_try_begin:
+                        self._reach_handler(
+                            te.entry.target, minsize, te.entry.push_lasti
+                        )
+                    self.maxsize = maxsize
+                    return
+
+            effect = (
+                instr.pre_and_post_stack_effect(jump=False)
+                if check_pre_and_post
+                else (instr.stack_effect(jump=False), 0)
+            )
+            size, maxsize, minsize = _update_size(*effect, size, maxsize, minsize)
+
+            if instr.is_final():
+                if te := block.get_trailing_try_end(i):
+                    self._reach_handler(te.entry.target, minsize, te.entry.push_lasti)
+                self.maxsize = maxsize
+                return
+
+        self.maxsize = maxsize
+        if block.next_block:
+            self._reach(
+                self._get_index(block.next_block), size, minsize, current_try_begin
+            )
+
+
+def _get_initial_stack_size(flags: CompilerFlags) -> int:
+    # Starting with Python 3.10, generator and coroutines start with one object
+    # on the stack (None, anything is an error).
+    if (
+        not PY313  # under 3.13+ RETURN_GENERATOR make this explicit
+        and PY310
+        and flags
+        & (
+            CompilerFlags.GENERATOR
+            | CompilerFlags.COROUTINE
+            | CompilerFlags.ASYNC_GENERATOR
+        )
+    ):
+        return 1
+    return 0
+
+
+def _run_stack_size_computers(
+    graph: Union["ControlFlowGraph", "ControlFlowGraphView"], check_pre_and_post: bool
+) -> Tuple[int, _StackSizeComputationStorage]:
+    """Compute the stack usage of a graph using one generator per block visit."""
+    # Create the common storage for the calculation
+    common = _StackSizeComputationStorage(
+        check_pre_and_post,
+        seen_blocks=set(),
+        blocks_startsizes={id(b): set() for b in graph},
+        exception_block_startsize=dict.fromkeys([id(b) for b in graph], 32768),
+        exception_block_maxsize=dict.fromkeys([id(b) for b in graph], -32768),
+        try_begins=[],
+        get_block=graph._get_block,
+    )
+
+    initial_stack_size = _get_initial_stack_size(graph.flags)
+
+    # Create a generator/coroutine responsible of dealing with the first block
+    coro = _StackSizeComputer(
+        common, graph[0], initial_stack_size, 0, 0, None, None
+    ).run()
+
+    # Create a list of generator that have not yet been exhausted
+    coroutines: List[Generator[Union[_StackSizeComputer, int], int, None]] = []
+
+    push_coroutine = coroutines.append
+    pop_coroutine = coroutines.pop
+    args = None
+
+    try:
+        while True:
+            # Mypy does not seem to honor the fact that one must send None
+            # to a brand new generator irrespective of its send type.
+            args = coro.send(None)  # type: ignore
+
+            # Consume the stored generators as long as they return a simple
+            # integer that is to be used to resume the last stored generator.
+            while isinstance(args, int):
+                coro = pop_coroutine()
+                args = coro.send(args)
+
+            # Otherwise we enter a new block and we store the generator under
+            # use and create a new one to process the new block
+            push_coroutine(coro)
+            coro = args.run()
+
+    except IndexError:
+        # The exception occurs when all the generators have been exhausted
+        # in which case the last yielded value is the stacksize.
+        assert args is not None and isinstance(args, int)
+
+        # Exception handling block size is reported separately since we need
+        # to report only the stack usage for the smallest start size for the
+        # block
+        return max(args, *common.exception_block_maxsize.values()), common
+
+
+class _BlockBounds:
+    """Instructions of a Bytecode forming a block of its control flow graph.
+
+    The block covers the instructions between the indices ``start`` (included)
+    and ``end`` (excluded), ``_size`` of them not being labels. ``_head`` and
+    ``_tail`` are the pseudo-instructions to add before and after them when a
+    TryBegin/TryEnd pair spans disconnected blocks.
+
+    """
+
+    __slots__ = ("_head", "_size", "_tail", "end", "next_block", "start")
+
+    def __init__(self, start: int) -> None:
+        self.start = start
+        self.end = start
+        # Block reached by falling through the last instruction, or None
+        self.next_block: Optional[_BlockBounds] = None
+        self._head: List[Union[TryBegin, TryEnd]] = []
+        self._tail: List[TryEnd] = []
+        self._size = 0
+
+
+_B = TypeVar("_B", bound=_BlockBounds)
+
+
+@dataclass
+class _BlockSplit(Generic[_B]):
+    """Blocks of the control flow graph of a Bytecode."""
+
+    blocks: List[_B]
+
+    #: Block starting at each label targeted by a jump or a TryBegin.
+    labels: Dict[Label, _B]
+
+    #: TryBegins of the Bytecode, followed by the TryBegins created when they
+    #: are split across disconnected blocks.
+    try_begins: Dict[TryBegin, List[TryBegin]]
+
+    #: TryEnds replacing the TryEnds of the Bytecode, by index, whose TryBegin
+    #: was split.
+    overrides: Dict[int, TryEnd]
+
+
+def _split_blocks(
+    bytecode: _bytecode.Bytecode, new_block: Callable[[int], _B]
+) -> _BlockSplit[_B]:
+    """Split a Bytecode in the blocks of its control flow graph.
+
+    This is shared by ControlFlowGraph.from_bytecode and ControlFlowGraphView,
+    so that both agree on the blocks. *new_block* creates a block starting at
+    the given index.
+
+    """
+    # label => instruction index
+    label_to_block_index = {}
+    jumps = []
+    try_end_locations = {}
+    for index, instr in enumerate(bytecode):
+        if isinstance(instr, Label):
+            label_to_block_index[instr] = index
+        elif isinstance(instr, Instr) and isinstance(instr.arg, Label):
+            jumps.append((index, instr.arg))
+        elif isinstance(instr, TryBegin):
+            assert isinstance(instr.target, Label)
+            jumps.append((index, instr.target))
+        elif isinstance(instr, TryEnd):
+            try_end_locations[instr.entry] = index
+
+    # Figure out on which index block targeted by a label start
+    block_starts = {}
+    for target_index, target_label in jumps:
+        target_index = label_to_block_index[target_label]
+        block_starts[target_index] = target_label
+
+    blocks: List[_B] = []
+
+    def add_block(start: int) -> _B:
+        if blocks:
+            blocks[-1].end = start
+        block = new_block(start)
+        blocks.append(block)
+        return block
+
+    block = add_block(0)
+    labels: Dict[Label, _B] = {}
+    # Map input TryBegin to the TryBegins of the blocks (split across blocks may
+    # yield multiple TryBegin from a single in the bytecode). The first one is
+    # the TryBegin of the bytecode itself.
+    try_begins: Dict[TryBegin, List[TryBegin]] = {}
+    # Storage for TryEnds that need to be inserted at the beginning of a block.
+    # We use a list because the same block can be reached through several paths
+    # with different active TryBegins
+    add_try_end: Dict[Label, List[TryEnd]] = defaultdict(list)
+    overrides: Dict[int, TryEnd] = {}
+
+    # Track the currently active try begin
+    active_try_begin: Optional[TryBegin] = None
+    try_begin_inserted_in_block = False
+    last_instr: Optional[Instr] = None
+    # Last non artificial instruction of the current block
+    block_last_instr: Optional[Instr] = None
+    for index, instr in enumerate(list.__iter__(bytecode)):
+        # Reference to the current block if we create a new one in the following.
+        old_block: Optional[_B] = None
+
+        # First we determine if we need to create a new block:
+        # - by checking the current instruction index
+        if index in block_starts:
+            # Create a new block if the last created one is not empty
+            # (of real instructions)
+            if index != 0 and block_last_instr is not None:
+                old_block = block
+                new = add_block(index)
+                # If the last non artificial instruction is not final connect
+                # this block to the next.
+                if not block_last_instr.is_final():
+                    block.next_block = new
+                block = new
+                block_last_instr = None
+            labels[block_starts[index]] = block
+
+        # - by inspecting the last instr
+        elif block_last_instr is not None and last_instr is not None:
+            # The last instruction is final but we did not create a block
+            # -> sounds like a block of dead code but we preserve it
+            if last_instr.is_final():
+                old_block = block
+                block = add_block(index)
+                block_last_instr = None
+
+            # We are dealing with a conditional jump
+            elif last_instr.has_jump():
+                old_block = block
+                new = add_block(index)
+                block.next_block = new
+                block = new
+                block_last_instr = None
+
+        # If we created a new block, we check:
+        # - if the current instruction is a TryEnd and if the last instruction
+        #   is final in which case we insert the TryEnd in the old block.
+        # - if we have a currently active TryBegin for which we may need to
+        #   create a TryEnd in the previous block and a new TryBegin in the
+        #   new one because the blocks are not connected.
+        if old_block is not None:
+            temp = try_begin_inserted_in_block
+            try_begin_inserted_in_block = False
+
+        if old_block is not None and last_instr is not None:
+            # The last instruction is final, if the current instruction is a
+            # TryEnd insert it in the same block and move to the next instruction
+            if last_instr.is_final() and isinstance(instr, TryEnd):
+                assert active_try_begin
+                latest = try_begins[active_try_begin][-1]
+                if instr.entry is not latest:
+                    overrides[index] = TryEnd(latest)
+                old_block.end = block.start = block.end = index + 1
+                old_block._size += 1
+                active_try_begin = None
+                continue
+
+            # If we have an active TryBegin and last_instr is:
+            elif active_try_begin is not None:
+                # - a jump whose target is beyond the TryEnd of the active
+                #   TryBegin: we remember TryEnd should be prepended to the
+                #   target block.
+                if (
+                    last_instr.has_jump()
+                    and active_try_begin in try_end_locations
+                    and (
+                        # last_instr is a jump so arg is a Label
+                        label_to_block_index[last_instr.arg]  # type: ignore
+                        >= try_end_locations[active_try_begin]
+                    )
+                ):
+                    assert isinstance(last_instr.arg, Label)
+                    add_try_end[last_instr.arg].append(
+                        TryEnd(try_begins[active_try_begin][-1])
+                    )
+
+                # - final and the try begin originate from the current block:
+                #   we insert a TryEnd in the old block and a new TryBegin in
+                #   the new one since the blocks are disconnected.
+                if last_instr.is_final() and temp:
+                    old_block._tail.append(TryEnd(try_begins[active_try_begin][-1]))
+                    new_tb = TryBegin(
+                        active_try_begin.target, active_try_begin.push_lasti
+                    )
+                    block._head.append(new_tb)
+                    try_begins[active_try_begin].append(new_tb)
+                    try_begin_inserted_in_block = True
+
+        last_instr = None
+
+        if isinstance(instr, Label):
+            continue
+
+        block._size += 1
+        if isinstance(instr, TryBegin):
+            assert active_try_begin is None
+            active_try_begin = instr
+            try_begin_inserted_in_block = True
+            try_begins[instr] = [instr]
+        elif isinstance(instr, TryEnd):
+            latest = try_begins[instr.entry][-1]
+            if latest is not instr.entry:
+                overrides[index] = TryEnd(latest)
+            active_try_begin = None
+            try_begin_inserted_in_block = False
+        elif isinstance(instr, Instr):
+            last_instr = block_last_instr = instr
+
+    block.end = len(bytecode)
+
+    # Insert the necessary TryEnds at the beginning of block that were marked
+    # (if we did not already insert an equivalent TryEnd earlier).
+    for lab, tes in add_try_end.items():
+        block = labels[lab]
+        existing_te_entries = set()
+        for i in itertools.chain(
+            block._head,
+            (
+                overrides.get(index, instr)
+                for index, instr in enumerate(
+                    list.__getitem__(bytecode, slice(block.start, block.end)),
+                    block.start,
+                )
+                if not isinstance(instr, Label)
+            ),
+        ):
+            if isinstance(i, TryEnd):
+                existing_te_entries.add(i.entry)
+            else:
+                break
+        for te in tes:
+            if te.entry not in existing_te_entries:
+                block._head.insert(0, te)
+                existing_te_entries.add(te.entry)
+
+    return _BlockSplit(blocks, labels, try_begins, overrides)
+
+
 class ControlFlowGraph(_bytecode.BaseBytecode):
     def __init__(self) -> None:
         super().__init__()
@@ -482,6 +1019,11 @@ class ControlFlowGraph(_bytecode.BaseBytecode):
         except KeyError:
             raise ValueError(f"the block {block} is not part of this bytecode")  # noqa
 
+    @staticmethod
+    def _get_block(block: BasicBlock) -> BasicBlock:
+        # Jumps and TryBegin directly refer to their target block
+        return block
+
     def _add_block(self, block: BasicBlock) -> None:
         block_index = len(self._blocks)
         self._blocks.append(block)
@@ -499,103 +1041,134 @@ class ControlFlowGraph(_bytecode.BaseBytecode):
         *,
         check_pre_and_post: bool = True,
         compute_exception_stack_depths: bool = True,
+        use_worklist: bool = False,
     ) -> int:
         """Compute the stack size by iterating through the blocks
 
         The implementation make use of a generator function to avoid issue with
-        deeply nested recursions.
+        deeply nested recursions. If *use_worklist* is True, the worklist based
+        implementation of :meth:`compute_stack_depths` is used instead.
 
         """
         # In the absence of any block return 0
         if not self:
             return 0
 
-        # Create the common storage for the calculation
-        common = _StackSizeComputationStorage(
-            check_pre_and_post,
-            seen_blocks=set(),
-            blocks_startsizes={id(b): set() for b in self},
-            exception_block_startsize=dict.fromkeys([id(b) for b in self], 32768),
-            exception_block_maxsize=dict.fromkeys([id(b) for b in self], -32768),
-            try_begins=[],
-        )
+        if use_worklist:
+            return self.compute_stack_depths(
+                check_pre_and_post=check_pre_and_post,
+                compute_exception_stack_depths=compute_exception_stack_depths,
+            )[0]
 
-        # Starting with Python 3.10, generator and coroutines start with one object
-        # on the stack (None, anything is an error).
-        initial_stack_size = 0
-        if (
-            not PY313  # under 3.13+ RETURN_GENERATOR make this explicit
-            and PY310
-            and self.flags
-            & (
-                CompilerFlags.GENERATOR
-                | CompilerFlags.COROUTINE
-                | CompilerFlags.ASYNC_GENERATOR
-            )
-        ):
-            initial_stack_size = 1
+        return self._compute_stacksize_with_generators(
+            check_pre_and_post, compute_exception_stack_depths
+        )[0]
 
-        # Create a generator/coroutine responsible of dealing with the first block
-        coro = _StackSizeComputer(
-            common, self[0], initial_stack_size, 0, 0, None, None
-        ).run()
+    def compute_stack_depths(
+        self,
+        *,
+        check_pre_and_post: bool = True,
+        compute_exception_stack_depths: bool = True,
+    ) -> Tuple[int, List[Optional[int]]]:
+        """Compute the stack size and the stack depth on entry of each block.
 
-        # Create a list of generator that have not yet been exhausted
-        coroutines: List[Generator[Union[_StackSizeComputer, int], int, None]] = []
+        Blocks are analyzed from a worklist, once each, as long as they are
+        always reached with the same stack depth. Otherwise the computation is
+        performed as in :meth:`compute_stacksize`.
 
-        push_coroutine = coroutines.append
-        pop_coroutine = coroutines.pop
-        args = None
+        Return the stack size and the list of the entry depths of the blocks
+        (None for unreachable blocks, the largest depth for blocks reached with
+        different depths).
+
+        """
+        # In the absence of any block return 0
+        if not self:
+            return 0, []
 
+        worklist = _StackDepthWorklist(self, check_pre_and_post)
         try:
-            while True:
-                # Mypy does not seem to honor the fact that one must send None
-                # to a brand new generator irrespective of its send type.
-                args = coro.send(None)  # type: ignore
-
-                # Consume the stored generators as long as they return a simple
-                # integer that is to be used to resume the last stored generator.
-                while isinstance(args, int):
-                    coro = pop_coroutine()
-                    args = coro.send(args)
-
-                # Otherwise we enter a new block and we store the generator under
-                # use and create a new one to process the new block
-                push_coroutine(coro)
-                coro = args.run()
-
-        except IndexError:
-            # The exception occurs when all the generators have been exhausted
-            # in which case the last yielded value is the stacksize.
-            assert args is not None and isinstance(args, int)
-
-            # Exception handling block size is reported separately since we need
-            # to report only the stack usage for the smallest start size for the
-            # block
-            args = max(args, *common.exception_block_maxsize.values())
-
-            # Check if there is dead code that may contain TryBegin/TryEnd pairs.
-            # For any such pair we set a huge size (the exception table format does not
-            # mandate a maximum value). We do so so that if  the pair is fused with
-            # another it does not alter the computed size.
-            for block in self:
-                if not common.blocks_startsizes[id(block)]:
-                    for i in block:
-                        if isinstance(i, TryBegin) and i.stack_depth is UNSET:
-                            i.stack_depth = 32768
-
-            # If requested update the TryBegin stack size
-            if compute_exception_stack_depths:
-                for tb in common.try_begins:
-                    size = common.exception_block_startsize[id(tb.target)]
-                    assert size >= 0
-                    tb.stack_depth = size
-
-            return args
+            stacksize = worklist.run(_get_initial_stack_size(self.flags))
+        except (_FallbackToComputer, RuntimeError):
+            # Let the generators based computation sort out the inconsistent
+            # entry states and report errors.
+            stacksize, common = self._compute_stacksize_with_generators(
+                check_pre_and_post, compute_exception_stack_depths
+            )
+            return stacksize, [
+                max((size for size, _ in sizes), default=None)
+                for sizes in (common.blocks_startsizes[id(b)] for b in self)
+            ]
+
+        # Mark TryBegin in dead code, see _compute_stacksize_with_generators
+        entry_sizes = worklist.entry_sizes
+        for block, entry_size in zip(self, entry_sizes):
+            if entry_size is None:
+                for i in block:
+                    if isinstance(i, TryBegin) and i.stack_depth is UNSET:
+                        i.stack_depth = 32768
+
+        if compute_exception_stack_depths:
+            for tb in worklist.try_begins:
+                assert isinstance(tb.target, BasicBlock)
+                size = entry_sizes[self.get_block_index(tb.target)]
+                if size is None:
+                    size = 32768
+                assert size >= 0
+                tb.stack_depth = size
+
+        return stacksize, entry_sizes
+
+    def _compute_stacksize_with_generators(
+        self, check_pre_and_post: bool, compute_exception_stack_depths: bool
+    ) -> Tuple[int, _StackSizeComputationStorage]:
+        stacksize, common = _run_stack_size_computers(self, check_pre_and_post)
+
+        # Check if there is dead code that may contain TryBegin/TryEnd pairs.
+        # For any such pair we set a huge size (the exception table format does not
+        # mandate a maximum value). We do so so that if  the pair is fused with
+        # another it does not alter the computed size.
+        for block in self:
+            if not common.blocks_startsizes[id(block)]:
+                for i in block:
+                    if isinstance(i, TryBegin) and i.stack_depth is UNSET:
+                        i.stack_depth = 32768
+
+        # If requested update the TryBegin stack size
+        if compute_exception_stack_depths:
+            for tb in common.try_begins:
+                size = common.exception_block_startsize[id(tb.target)]
+                assert size >= 0
+                tb.stack_depth = size
+
+        return stacksize, common
 
     def __repr__(self) -> str:
         return "<ControlFlowGraph block#=%s>" % len(self._blocks)
 
+    def __getstate__(self) -> Dict[str, Any]:
+        state = super().__getstate__()
+        # Blocks are indexed by identifier
+        del state["_block_index"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._block_index = {
+            id(block): index for index, block in enumerate(self._blocks)
+        }
+
+    def _iter_items(self) -> Iterator[Any]:
+        for block in self._blocks:
+            yield block
+            yield block.next_block
+            # Avoid the validation performed by BasicBlock.__iter__
+            yield from list.__iter__(block)
+
+    def _get_attrs_state(self) -> List[Any]:
+        state = super()._get_attrs_state()
+        state.append(list(self.argnames))
+        return state
+
     # Helper to obtain a flat list of instr, which does not refer to block at
     # anymore. Used for comparison of different CFG.
     def _get_instructions(
@@ -741,187 +1314,70 @@ class ControlFlowGraph(_bytecode.BaseBytecode):
         return [b for b in self if id(b) not in seen_block_ids]
 
     @staticmethod
-    def from_bytecode(bytecode: _bytecode.Bytecode) -> "ControlFlowGraph":
-        # label => instruction index
-        label_to_block_index = {}
-        jumps = []
-        try_end_locations = {}
-        for index, instr in enumerate(bytecode):
-            if isinstance(instr, Label):
-                label_to_block_index[instr] = index
-            elif isinstance(instr, Instr) and isinstance(instr.arg, Label):
-                jumps.append((index, instr.arg))
-            elif isinstance(instr, TryBegin):
-                assert isinstance(instr.target, Label)
-                jumps.append((index, instr.target))
-            elif isinstance(instr, TryEnd):
-                try_end_locations[instr.entry] = index
+    def from_bytes(data: bytes) -> "ControlFlowGraph":
+        """Load a control flow graph serialized by :meth:`to_bytes`."""
+        return load_cfg(data)
+
+    def to_bytes(self) -> bytes:
+        """Serialize the control flow graph to a compact binary format.
+
+        Jumps, exception handling pseudo instructions and next blocks keep
+        referring to the same blocks once loaded with :meth:`from_bytes`.
+        Constants are marshalled and the data can only be loaded by the same
+        Python version.
+
+        """
+        return dump_cfg(self)
 
-        # Figure out on which index block targeted by a label start
-        block_starts = {}
-        for target_index, target_label in jumps:
-            target_index = label_to_block_index[target_label]
-            block_starts[target_index] = target_label
+    @staticmethod
+    def from_bytecode(bytecode: _bytecode.Bytecode) -> "ControlFlowGraph":
+        split = _split_blocks(bytecode, _BlockBounds)
 
         bytecode_blocks = ControlFlowGraph()
         bytecode_blocks._copy_attr_from(bytecode)
         bytecode_blocks.argnames = list(bytecode.argnames)
+        blocks = {id(split.blocks[0]): bytecode_blocks[0]}
+        for bounds in split.blocks[1:]:
+            blocks[id(bounds)] = bytecode_blocks.add_block()
+
+        # Copies of the TryBegins of the bytecode. The TryBegins created when
+        # splitting them across blocks are not part of the bytecode and are
+        # used as is.
+        try_begin_copies = {tb: tb.copy() for tb in split.try_begins}
+
+        def copy_try_end(try_end: TryEnd) -> TryEnd:
+            return TryEnd(try_begin_copies.get(try_end.entry, try_end.entry))
 
         # copy instructions, convert labels to block labels
-        block = bytecode_blocks[0]
-        labels = {}
         jumping_instrs: List[Instr] = []
-        # Map input TryBegin to CFG TryBegins (split across blocks may yield multiple
-        # TryBegin from a single in the bytecode).
-        try_begins: Dict[TryBegin, list[TryBegin]] = {}
-        # Storage for TryEnds that need to be inserted at the beginning of a block.
-        # We use a list because the same block can be reached through several paths
-        # with different active TryBegins
-        add_try_end: Dict[Label, List[TryEnd]] = defaultdict(list)
-
-        # Track the currently active try begin
-        active_try_begin: Optional[TryBegin] = None
-        try_begin_inserted_in_block = False
-        last_instr: Optional[Instr] = None
-        for index, instr in enumerate(bytecode):
-            # Reference to the current block if we create a new one in the following.
-            old_block: BasicBlock | None = None
-
-            # First we determine if we need to create a new block:
-            # - by checking the current instruction index
-            if index in block_starts:
-                old_label = block_starts[index]
-                # Create a new block if the last created one is not empty
-                # (of real instructions)
-                if index != 0 and (li := block.get_last_non_artificial_instruction()):
-                    old_block = block
-                    new_block = bytecode_blocks.add_block()
-                    # If the last non artificial instruction is not final connect
-                    # this block to the next.
-                    if not li.is_final():
-                        block.next_block = new_block
-                    block = new_block
-                if old_label is not None:
-                    labels[old_label] = block
-
-            # - by inspecting the last instr
-            elif block.get_last_non_artificial_instruction() and last_instr is not None:
-                # The last instruction is final but we did not create a block
-                # -> sounds like a block of dead code but we preserve it
-                if last_instr.is_final():
-                    old_block = block
-                    block = bytecode_blocks.add_block()
-
-                # We are dealing with a conditional jump
-                elif last_instr.has_jump():
-                    assert isinstance(last_instr.arg, Label)
-                    old_block = block
-                    new_block = bytecode_blocks.add_block()
-                    block.next_block = new_block
-                    block = new_block
-
-            # If we created a new block, we check:
-            # - if the current instruction is a TryEnd and if the last instruction
-            #   is final in which case we insert the TryEnd in the old block.
-            # - if we have a currently active TryBegin for which we may need to
-            #   create a TryEnd in the previous block and a new TryBegin in the
-            #   new one because the blocks are not connected.
-            if old_block is not None:
-                temp = try_begin_inserted_in_block
-                try_begin_inserted_in_block = False
-
-            if old_block is not None and last_instr is not None:
-                # The last instruction is final, if the current instruction is a
-                # TryEnd insert it in the same block and move to the next instruction
-                if last_instr.is_final() and isinstance(instr, TryEnd):
-                    assert active_try_begin
-                    nte = instr.copy()
-                    nte.entry = try_begins[active_try_begin][-1]
-                    old_block.append(nte)
-                    active_try_begin = None
+        for bounds in split.blocks:
+            block = blocks[id(bounds)]
+            if bounds.next_block is not None:
+                block.next_block = blocks[id(bounds.next_block)]
+            for pseudo in bounds._head:
+                block.append(
+                    copy_try_end(pseudo) if isinstance(pseudo, TryEnd) else pseudo
+                )
+            for index in range(bounds.start, bounds.end):
+                instr = bytecode[index]
+                if isinstance(instr, Label):
                     continue
-
-                # If we have an active TryBegin and last_instr is:
-                elif active_try_begin is not None:
-                    # - a jump whose target is beyond the TryEnd of the active
-                    #   TryBegin: we remember TryEnd should be prepended to the
-                    #   target block.
-                    if (
-                        last_instr.has_jump()
-                        and active_try_begin in try_end_locations
-                        and (
-                            # last_instr is a jump so arg is a Label
-                            label_to_block_index[last_instr.arg]  # type: ignore
-                            >= try_end_locations[active_try_begin]
-                        )
-                    ):
-                        assert isinstance(last_instr.arg, Label)
-                        add_try_end[last_instr.arg].append(
-                            TryEnd(try_begins[active_try_begin][-1])
-                        )
-
-                    # - final and the try begin originate from the current block:
-                    #   we insert a TryEnd in the old block and a new TryBegin in
-                    #   the new one since the blocks are disconnected.
-                    if last_instr.is_final() and temp:
-                        old_block.append(TryEnd(try_begins[active_try_begin][-1]))
-                        new_tb = TryBegin(
-                            active_try_begin.target, active_try_begin.push_lasti
-                        )
-                        block.append(new_tb)
-                        # Add this new TryBegin to the map to properly update
-                        # the target.
-                        try_begins[active_try_begin].append(new_tb)
-                        try_begin_inserted_in_block = True
-
-            last_instr = None
-
-            if isinstance(instr, Label):
-                continue
-
-            # don't copy SetLineno objects
-            if isinstance(instr, (Instr, TryBegin, TryEnd)):
-                new = instr.copy()
-                if isinstance(instr, TryBegin):
-                    assert active_try_begin is None
-                    active_try_begin = instr
-                    try_begin_inserted_in_block = True
-                    assert isinstance(new, TryBegin)
-                    try_begins[instr] = [new]
+                if index in split.overrides:
+                    instr = split.overrides[index]
+                elif isinstance(instr, TryBegin):
+                    instr = try_begin_copies[instr]
                 elif isinstance(instr, TryEnd):
-                    assert isinstance(new, TryEnd)
-                    new.entry = try_begins[instr.entry][-1]
-                    active_try_begin = None
-                    try_begin_inserted_in_block = False
-                else:
-                    last_instr = instr
+                    instr = copy_try_end(instr)
+                # SetLineno objects are not copied
+                elif isinstance(instr, Instr):
+                    instr = instr.copy()
                     if isinstance(instr.arg, Label):
-                        assert isinstance(new, Instr)
-                        jumping_instrs.append(new)
-
-                instr = new
-
-            block.append(instr)
-
-        # Insert the necessary TryEnds at the beginning of block that were marked
-        # (if we did not already insert an equivalent TryEnd earlier).
-        for lab, tes in add_try_end.items():
-            block = labels[lab]
-            existing_te_entries = set()
-            index = 0
-            # We use a while loop since the block cannot yet be iterated on since
-            # jumps still use labels instead of blocks
-            while index < len(block):
-                i = block[index]
-                index += 1
-                if isinstance(i, TryEnd):
-                    existing_te_entries.add(i.entry)
-                else:
-                    break
-            for te in tes:
-                if te.entry not in existing_te_entries:
-                    labels[lab].insert(0, te)
-                    existing_te_entries.add(te.entry)
+                        jumping_instrs.append(instr)
+                block.append(instr)
+            for try_end in bounds._tail:
+                block.append(copy_try_end(try_end))
+
+        labels = {label: blocks[id(bounds)] for label, bounds in split.labels.items()}
 
         # Replace labels by block in jumping instructions
         for instr in jumping_instrs:
@@ -930,12 +1386,14 @@ class ControlFlowGraph(_bytecode.BaseBytecode):
             instr.arg = labels[label]
 
         # Replace labels by block in TryBegin
-        for b_tb, c_tbs in try_begins.items():
+        for b_tb, c_tbs in split.try_begins.items():
             label = b_tb.target
             assert isinstance(label, Label)
-            for c_tb in c_tbs:
+            try_begin_copies[b_tb].target = labels[label]
+            for c_tb in c_tbs[1:]:
                 c_tb.target = labels[label]
 
+        bytecode._transfer_source_code(bytecode_blocks)
         return bytecode_blocks
 
     def to_bytecode(self) -> _bytecode.Bytecode:
@@ -1043,6 +1501,7 @@ class ControlFlowGraph(_bytecode.BaseBytecode):
         bytecode.argnames = list(self.argnames)
         bytecode[:] = instructions
 
+        self._transfer_source_code(bytecode)
         return bytecode
 
     def to_code(
@@ -1051,8 +1510,22 @@ class ControlFlowGraph(_bytecode.BaseBytecode):
         *,
         check_pre_and_post: bool = True,
         compute_exception_stack_depths: bool = True,
+        mode: Literal["safe", "fast"] = "safe",
     ) -> types.CodeType:
         """Convert to code."""
+        self._check_to_code_mode(mode)
+        code = self._reuse_source_code(stacksize, compute_exception_stack_depths)
+        if code is not None:
+            return code
+
+        if mode == "fast" and all(
+            instr.stack_depth is not UNSET
+            for block in self
+            for instr in block
+            if isinstance(instr, TryBegin)
+        ):
+            compute_exception_stack_depths = False
+
         if stacksize is None:
             stacksize = self.compute_stacksize(
                 check_pre_and_post=check_pre_and_post,
@@ -1064,3 +1537,163 @@ class ControlFlowGraph(_bytecode.BaseBytecode):
             check_pre_and_post=False,
             compute_exception_stack_depths=False,
         )
+
+
+class BasicBlockView(_BlockBounds):
+    """Read-only block of a :class:`ControlFlowGraphView`.
+
+    The block covers the instructions of the viewed Bytecode between the
+    indices ``start`` (included) and ``end`` (excluded), skipping labels. The
+    pseudo-instructions a ControlFlowGraph would add to the block (when a
+    TryBegin/TryEnd pair spans disconnected blocks) are stored aside so that the
+    viewed instructions are never copied.
+
+    """
+
+    __slots__ = ("_graph",)
+
+    # a BasicBlockView object, or None
+    next_block: Optional["BasicBlockView"]  # type: ignore[assignment]
+
+    def __init__(self, graph: "ControlFlowGraphView", start: int) -> None:
+        super().__init__(start)
+        self._graph = graph
+
+    def __repr__(self) -> str:
+        return "<BasicBlockView start=%s end=%s>" % (self.start, self.end)
+
+    def __len__(self) -> int:
+        return len(self._head) + self._size + len(self._tail)
+
+    def __iter__(self) -> Iterator[Union[Instr, SetLineno, TryBegin, TryEnd]]:
+        yield from self._head
+        overrides = self._graph._overrides
+        index = self.start
+        for instr in list.__getitem__(self._graph.bytecode, slice(index, self.end)):
+            if not isinstance(instr, Label):
+                if overrides and index in overrides:
+                    instr = overrides[index]
+                yield instr
+            index += 1
+        yield from self._tail
+
+    def get_last_non_artificial_instruction(self) -> Optional[Instr]:
+        for instr in reversed(list(self)):
+            if isinstance(instr, Instr):
+                return instr
+
+        return None
+
+    def get_jump(self) -> Optional["BasicBlockView"]:
+        last_instr = self.get_last_non_artificial_instruction()
+        if last_instr is None or not last_instr.has_jump():
+            return None
+
+        return self._graph._get_block(last_instr.arg)
+
+    def get_trailing_try_end(self, index: int) -> Optional[TryEnd]:
+        instructions = list(self)
+        while index + 1 < len(instructions):
+            if isinstance(b := instructions[index + 1], TryEnd):
+                return b
+            index += 1
+
+        return None
+
+
+class ControlFlowGraphView:
+    """Read-only control flow graph of a Bytecode.
+
+    The view splits the Bytecode in the same blocks as
+    :meth:`ControlFlowGraph.from_bytecode` but only records the block boundaries
+    and the labels targeted by jumps, so that it is much cheaper to build. The
+    Bytecode must not be modified while the view is in use.
+
+    """
+
+    def __init__(self, bytecode: _bytecode.Bytecode) -> None:
+        self.bytecode = bytecode
+        self._blocks: List[BasicBlockView] = []
+        # Index of the blocks by the id of the blocks and of the labels
+        # referring to them.
+        self._block_index: Dict[int, int] = {}
+        # TryEnd referring to a TryBegin split across blocks by index in the
+        # bytecode.
+        self._overrides: Dict[int, TryEnd] = {}
+        self._split_blocks(bytecode)
+
+    @property
+    def flags(self) -> CompilerFlags:
+        return self.bytecode.flags
+
+    def __repr__(self) -> str:
+        return "<ControlFlowGraphView block#=%s>" % len(self._blocks)
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def __iter__(self) -> Iterator[BasicBlockView]:
+        return iter(self._blocks)
+
+    def __getitem__(self, index: Union[int, BasicBlockView]) -> BasicBlockView:
+        if isinstance(index, BasicBlockView):
+            index = self.get_block_index(index)
+        return self._blocks[index]
+
+    def get_block_index(self, block: BasicBlockView) -> int:
+        try:
+            return self._block_index[id(block)]
+        except KeyError:
+            raise ValueError(f"the block {block} is not part of this view")  # noqa
+
+    def get_dead_blocks(self) -> List[BasicBlockView]:
+        seen_block_ids = set()
+        stack = [self._blocks[0]]
+        while stack:
+            block = stack.pop()
+            if id(block) in seen_block_ids:
+                continue
+            seen_block_ids.add(id(block))
+            for i in block:
+                if isinstance(i, Instr) and isinstance(i.arg, Label):
+                    stack.append(self._get_block(i.arg))
+                elif isinstance(i, TryBegin):
+                    stack.append(self._get_block(i.target))
+
+        return [b for b in self if id(b) not in seen_block_ids]
+
+    def compute_stacksize(
+        self, *, check_pre_and_post: bool = True, use_worklist: bool = False
+    ) -> int:
+        """Compute the stack size as :meth:`ControlFlowGraph.compute_stacksize`.
+
+        The stack depths of the TryBegin pseudo-instructions of the Bytecode are
+        never updated.
+
+        """
+        if use_worklist:
+            try:
+                return _StackDepthWorklist(self, check_pre_and_post).run(
+                    _get_initial_stack_size(self.flags)
+                )
+            except (_FallbackToComputer, RuntimeError):
+                pass
+
+        return _run_stack_size_computers(self, check_pre_and_post)[0]
+
+    # --- Private API
+
+    def _get_block(self, target: Union[Label, BasicBlockView]) -> BasicBlockView:
+        return self._blocks[self._block_index[id(target)]]
+
+    def _split_blocks(self, bytecode: _bytecode.Bytecode) -> None:
+        split = _split_blocks(bytecode, lambda start: BasicBlockView(self, start))
+        self._blocks = split.blocks
+        self._overrides = split.overrides
+        self._block_index = {
+            id(block): index for index, block in enumerate(self._blocks)
+        }
+
+        # Make the labels usable as jump targets
+        for label, block in split.labels.items():
+            self._block_index[id(label)] = self._block_index[id(block)]
@@ -0,0 +1,431 @@
+import itertools
+import opcode as _opcode
+import operator
+import types
+from array import array
+from typing import Any, Iterable, Iterator, List, Literal, Optional, Tuple, Union
+
+# alias to keep the 'bytecode' variable free
+import bytecode as _bytecode
+from bytecode.concrete import (
+    _NO_POSITIONS,
+    ConcreteBytecode,
+    ConcreteInstr,
+    ExceptionTableEntry,
+    _set_code_attributes,
+)
+from bytecode.instr import (
+    _CACHE_COUNTS,
+    _COND_JUMP,
+    _FINAL,
+    _HAS_ARG,
+    _HAS_JUMP,
+    _OPCODE_PROPERTIES,
+    _UNCOND_JUMP,
+    _UNSET,
+    UNSET,
+    InstrLocation,
+    SetLineno,
+    _intern_location,
+    const_key,
+)
+from bytecode.utils import PY311, PY313
+
+# Sentinels stored in the location columns: _NO_VALUE for a field of the location
+# which is None and _NO_LOCATION (in the lineno column) for an instruction without
+# location.
+_NO_VALUE = -1
+_NO_LOCATION = -2
+
+
+def _pack_location(location: Optional[InstrLocation]) -> Tuple[int, int, int, int]:
+    if location is None:
+        return (_NO_LOCATION, _NO_VALUE, _NO_VALUE, _NO_VALUE)
+    return _pack_positions(
+        (
+            location.lineno,
+            location.end_lineno,
+            location.col_offset,
+            location.end_col_offset,
+        )
+    )
+
+
+def _pack_positions(positions: Iterable[Optional[int]]) -> Tuple[int, int, int, int]:
+    return tuple(_NO_VALUE if p is None else p for p in positions)  # type: ignore
+
+
+class ConcreteInstrView:
+    """Read-only view of an instruction of a :class:`CompactConcreteBytecode`."""
+
+    __slots__ = ("_bytecode", "_index")
+
+    def __init__(self, bytecode: "CompactConcreteBytecode", index: int) -> None:
+        self._bytecode = bytecode
+        self._index = index
+
+    def __repr__(self) -> str:
+        arg = self.arg
+        if arg is not UNSET:
+            return "<%s arg=%r location=%s>" % (self.name, arg, self.location)
+        else:
+            return "<%s location=%s>" % (self.name, self.location)
+
+    @property
+    def opcode(self) -> int:
+        return self._bytecode._opcodes[self._index]
+
+    @property
+    def name(self) -> str:
+        return _opcode.opname[self._bytecode._opcodes[self._index]]
+
+    @property
+    def arg(self) -> Union[int, _UNSET]:
+        return self._bytecode._get_arg(self._index)
+
+    @property
+    def extended_args(self) -> Optional[int]:
+        extended_args = self._bytecode._extended_args[self._index]
+        return None if extended_args < 0 else extended_args
+
+    @property
+    def size(self) -> int:
+        extended_args = self._bytecode._extended_args[self._index]
+        if extended_args >= 0:
+            return 2 + 2 * extended_args
+        arg = self._bytecode._args[self._index]
+        return 2 + 2 * max(0, (arg.bit_length() - 1) // 8)
+
+    @property
+    def location(self) -> Optional[InstrLocation]:
+        return self._bytecode._get_location(self._index)
+
+    @property
+    def lineno(self) -> Union[int, _UNSET, None]:
+        lineno = self._bytecode._linenos[self._index]
+        if lineno == _NO_LOCATION:
+            return UNSET
+        return None if lineno == _NO_VALUE else lineno
+
+    def require_arg(self) -> bool:
+        """Does the instruction require an argument?"""
+        return bool(_OPCODE_PROPERTIES[self.opcode] & _HAS_ARG)
+
+    def has_jump(self) -> bool:
+        return bool(_OPCODE_PROPERTIES[self.opcode] & _HAS_JUMP)
+
+    def is_cond_jump(self) -> bool:
+        """Is a conditional jump?"""
+        return bool(_OPCODE_PROPERTIES[self.opcode] & _COND_JUMP)
+
+    def is_uncond_jump(self) -> bool:
+        """Is an unconditional jump?"""
+        return bool(_OPCODE_PROPERTIES[self.opcode] & _UNCOND_JUMP)
+
+    def is_final(self) -> bool:
+        return bool(_OPCODE_PROPERTIES[self.opcode] & _FINAL)
+
+    def to_instr(self) -> ConcreteInstr:
+        """Create the equivalent concrete instruction."""
+        return self._bytecode._get_instr(self._index)
+
+
+class CompactConcreteBytecode(_bytecode.BaseBytecode):
+    """Concrete bytecode stored in arrays rather than instruction objects.
+
+    Each instruction (including CACHE entries on Python 3.11+) is stored as an
+    opcode, an argument, a number of EXTENDED_ARG and the four fields of its
+    location in one array per field. The instructions cannot be modified:
+    convert to a :class:`ConcreteBytecode` to do so.
+
+    """
+
+    #: List of "constant" objects for the bytecode
+    consts: List
+
+    #: List of names used by local variables.
+    names: List[str]
+
+    #: List of names used by input variables.
+    varnames: List[str]
+
+    #: Table describing portion of the bytecode in which exceptions are caught and
+    #: where there are handled.
+    #: Used only in Python 3.11+
+    exception_table: List[ExceptionTableEntry]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.consts = []
+        self.names = []
+        self.varnames = []
+        self.exception_table = []
+        self._opcodes = array("B")
+        # Argument of instructions without argument is stored as 0.
+        self._args = array("I")
+        # Number of EXTENDED_ARG folded in the instruction, -1 for None.
+        self._extended_args = array("b")
+        self._linenos = array("i")
+        self._end_linenos = array("i")
+        self._col_offsets = array("i")
+        self._end_col_offsets = array("i")
+
+    def __repr__(self) -> str:
+        return "<CompactConcreteBytecode instr#=%s>" % len(self)
+
+    def __len__(self) -> int:
+        return len(self._opcodes)
+
+    def __iter__(self) -> Iterator[ConcreteInstrView]:
+        for index in range(len(self._opcodes)):
+            yield ConcreteInstrView(self, index)
+
+    def __getitem__(self, index: int) -> ConcreteInstrView:
+        # Support negative indices and raise IndexError for invalid ones
+        return ConcreteInstrView(self, range(len(self))[operator.index(index)])
+
+    def __eq__(self, other: Any) -> bool:
+        if type(self) is not type(other):
+            return False
+
+        if list(map(const_key, self.consts)) != list(map(const_key, other.consts)):
+            return False
+        if self.names != other.names:
+            return False
+        if self.varnames != other.varnames:
+            return False
+        if self._get_columns() != other._get_columns():
+            return False
+
+        return super().__eq__(other)
+
+    @staticmethod
+    def from_code(
+        code: types.CodeType, *, extended_arg: bool = False
+    ) -> "CompactConcreteBytecode":
+        """Create a compact bytecode from a code object.
+
+        On Python 3.11+ the code is decoded directly into the arrays. Otherwise,
+        it is converted from :meth:`ConcreteBytecode.from_code`.
+
+        """
+        if not PY311:
+            return CompactConcreteBytecode.from_concrete_bytecode(
+                ConcreteBytecode.from_code(code, extended_arg=extended_arg)
+            )
+
+        bytecode = CompactConcreteBytecode()
+        _set_code_attributes(bytecode, code)
+        bytecode._decode_code(code, extended_arg)
+        bytecode._set_source_code(code)
+        return bytecode
+
+    @staticmethod
+    def from_concrete_bytecode(
+        bytecode: ConcreteBytecode,
+    ) -> "CompactConcreteBytecode":
+        """Create a compact bytecode from a concrete bytecode.
+
+        SetLineno pseudo-instructions are not supported, use
+        :meth:`ConcreteBytecode.legalize` to remove them first.
+
+        """
+        compact = CompactConcreteBytecode()
+        compact._copy_attr_from(bytecode)
+        compact.consts = list(bytecode.consts)
+        compact.names = list(bytecode.names)
+        compact.varnames = list(bytecode.varnames)
+        compact.exception_table = list(bytecode.exception_table)
+
+        opcodes = compact._opcodes
+        args = compact._args
+        extended_args = compact._extended_args
+        columns = (
+            compact._linenos,
+            compact._end_linenos,
+            compact._col_offsets,
+            compact._end_col_offsets,
+        )
+        for instr in bytecode:
+            if isinstance(instr, SetLineno):
+                raise ValueError(
+                    "SetLineno cannot be stored in a CompactConcreteBytecode, "
+                    "legalize the bytecode first"
+                )
+            opcodes.append(instr._opcode)
+            args.append(0 if instr._arg is UNSET else instr._arg)
+            extended_args.append(
+                -1 if instr._extended_args is None else instr._extended_args
+            )
+            for column, value in zip(columns, _pack_location(instr._location)):
+                column.append(value)
+
+        bytecode._transfer_source_code(compact)
+        return compact
+
+    def to_concrete_bytecode(self) -> ConcreteBytecode:
+        """Convert to a concrete bytecode made of ConcreteInstr objects."""
+        bytecode = ConcreteBytecode()
+        bytecode._copy_attr_from(self)
+        bytecode.consts = list(self.consts)
+        bytecode.names = list(self.names)
+        bytecode.varnames = list(self.varnames)
+        bytecode.exception_table = list(self.exception_table)
+        bytecode[:] = [self._get_instr(index) for index in range(len(self))]
+        self._transfer_source_code(bytecode)
+        return bytecode
+
+    def compute_stacksize(self, *, check_pre_and_post: bool = True) -> int:
+        return self.to_concrete_bytecode().compute_stacksize(
+            check_pre_and_post=check_pre_and_post
+        )
+
+    def to_code(
+        self,
+        stacksize: Optional[int] = None,
+        *,
+        check_pre_and_post: bool = True,
+        compute_exception_stack_depths: bool = True,
+        mode: Literal["safe", "fast"] = "safe",
+    ) -> types.CodeType:
+        """Convert to a code object, see :meth:`ConcreteBytecode.to_code`."""
+        self._check_to_code_mode(mode)
+        code = self._reuse_source_code(stacksize, compute_exception_stack_depths)
+        if code is not None:
+            return code
+
+        return self.to_concrete_bytecode().to_code(
+            stacksize,
+            check_pre_and_post=check_pre_and_post,
+            compute_exception_stack_depths=compute_exception_stack_depths,
+            mode=mode,
+        )
+
+    # --- Private API
+
+    def _iter_items(self) -> Iterator[Any]:
+        # Instructions cannot be modified
+        return iter(())
+
+    def _get_attrs_state(self) -> List[Any]:
+        state = super()._get_attrs_state()
+        state.append([id(const) for const in self.consts])
+        state.append(list(self.names))
+        state.append(list(self.varnames))
+        state.append(
+            [
+                (entry.start_offset, entry.stop_offset, entry.target, entry.push_lasti)
+                for entry in self.exception_table
+            ]
+        )
+        return state
+
+    def _get_columns(self) -> Tuple[array, ...]:
+        return (
+            self._opcodes,
+            self._args,
+            self._extended_args,
+            self._linenos,
+            self._end_linenos,
+            self._col_offsets,
+            self._end_col_offsets,
+        )
+
+    def _get_arg(self, index: int) -> Union[int, _UNSET]:
+        op = self._opcodes[index]
+        # opcode == 0 corresponds to CACHE instruction in 3.11+
+        if _OPCODE_PROPERTIES[op] & _HAS_ARG or op == 0:
+            return self._args[index]
+        return UNSET
+
+    def _get_location(self, index: int) -> Optional[InstrLocation]:
+        lineno = self._linenos[index]
+        if lineno == _NO_LOCATION:
+            return None
+        return _intern_location(
+            tuple(  # type: ignore
+                None if value == _NO_VALUE else value
+                for value in (
+                    lineno,
+                    self._end_linenos[index],
+                    self._col_offsets[index],
+                    self._end_col_offsets[index],
+                )
+            )
+        )
+
+    def _get_instr(self, index: int) -> ConcreteInstr:
+        op = self._opcodes[index]
+        arg = self._get_arg(index)
+        location = self._get_location(index)
+        extended_args = self._extended_args[index]
+        if extended_args < 0:
+            return ConcreteInstr._from_opcode(op, arg, location)
+        return ConcreteInstr(
+            _opcode.opname[op], arg, location=location, extended_args=extended_args
+        )
+
+    def _decode_code(self, code: types.CodeType, extended_arg: bool) -> None:
+        # Same as ConcreteBytecode._decode_code followed by
+        # ConcreteBytecode._remove_extended_args (unless extended_arg is True)
+        # without creating ConcreteInstr objects.
+        assert PY311
+        append_opcode = self._opcodes.append
+        append_arg = self._args.append
+        append_extended_args = self._extended_args.append
+        append_lineno = self._linenos.append
+        append_end_lineno = self._end_linenos.append
+        append_col_offset = self._col_offsets.append
+        append_end_col_offset = self._end_col_offsets.append
+
+        extended_arg_opcode = _opcode.EXTENDED_ARG
+        nop_opcode = _opcode.opmap["NOP"]
+        nb_extended_args = 0
+        extended_arg_value: Optional[int] = None
+        caches = 0
+        location = _pack_positions(_NO_POSITIONS)
+        for op, arg, positions in zip(
+            code.co_code[::2],
+            code.co_code[1::2],
+            itertools.chain(code.co_positions(), itertools.repeat(_NO_POSITIONS)),
+        ):
+            if caches:
+                caches -= 1
+                # On 3.13+, CACHE entries share the location of their instruction
+                if not PY313:
+                    location = _pack_positions(positions)
+                op = arg = 0
+                nb = -1
+            else:
+                location = _pack_positions(positions)
+                props = _OPCODE_PROPERTIES[op]
+                caches = _CACHE_COUNTS[op]
+                if op == extended_arg_opcode and not extended_arg:
+                    nb_extended_args += 1
+                    if extended_arg_value is not None:
+                        extended_arg_value = (extended_arg_value << 8) + arg
+                    else:
+                        extended_arg_value = arg
+                    continue
+
+                if extended_arg_value is not None:
+                    arg = 0 if op == nop_opcode else (extended_arg_value << 8) + arg
+                    nb = nb_extended_args
+                    extended_arg_value = None
+                    nb_extended_args = 0
+                else:
+                    if not props & _HAS_ARG:
+                        arg = 0
+                    nb = -1
+
+            append_opcode(op)
+            append_arg(arg)
+            append_extended_args(nb)
+            lineno, end_lineno, col_offset, end_col_offset = location
+            append_lineno(lineno)
+            append_end_lineno(end_lineno)
+            append_col_offset(col_offset)
+            append_end_col_offset(end_col_offset)
+
+        if extended_arg_value is not None:
+            raise ValueError("EXTENDED_ARG at the end of the code")
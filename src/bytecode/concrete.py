@@ -1,3 +1,4 @@
+import bisect
 import dis
 import inspect
 import itertools
@@ -11,6 +12,7 @@ from typing import (
     Iterable,
     Iterator,
     List,
+    Literal,
     MutableSequence,
     Optional,
     Sequence,
@@ -25,14 +27,25 @@ from typing import (
 import bytecode as _bytecode
 from bytecode.flags import CompilerFlags
 from bytecode.instr import (
+    _ARG_BITFLAG2_NAME,
+    _ARG_BITFLAG_NAME,
+    _ARG_COMPARE,
+    _ARG_CONST,
+    _ARG_DUAL_LOCAL,
+    _ARG_FREE,
+    _ARG_INT,
+    _ARG_INTRINSIC_1,
+    _ARG_INTRINSIC_2,
+    _ARG_KINDS,
+    _ARG_LOCAL,
+    _ARG_NAME,
+    _CACHE_COUNTS,
+    _HAS_ARG,
+    _HAS_JUMP,
+    _OPCODE_PROPERTIES,
     _UNSET,
-    BITFLAG2_OPCODES,
-    BITFLAG_OPCODES,
     DUAL_ARG_OPCODES,
     DUAL_ARG_OPCODES_SINGLE_OPS,
-    INTRINSIC,
-    INTRINSIC_1OP,
-    INTRINSIC_2OP,
     PLACEHOLDER_LABEL,
     UNSET,
     BaseInstr,
@@ -49,6 +62,7 @@ from bytecode.instr import (
     TryBegin,
     TryEnd,
     _check_arg_int,
+    _intern_location,
     const_key,
     opcode_has_argument,
 )
@@ -59,6 +73,8 @@ from bytecode.utils import PY310, PY311, PY312, PY313
 # - dis displays bytes
 OFFSET_AS_INSTRUCTION = PY310
 
+_NO_POSITIONS = (None, None, None, None)
+
 
 def _set_docstring(code: _bytecode.BaseBytecode, consts: Sequence) -> None:
     if not consts:
@@ -68,6 +84,30 @@ def _set_docstring(code: _bytecode.BaseBytecode, consts: Sequence) -> None:
         code.docstring = first_const
 
 
+def _set_code_attributes(bytecode: Any, code: types.CodeType) -> None:
+    """Set the attributes of a concrete bytecode from a code object."""
+    bytecode.name = code.co_name
+    bytecode.filename = code.co_filename
+    bytecode.flags = CompilerFlags(code.co_flags)
+    bytecode.argcount = code.co_argcount
+    bytecode.posonlyargcount = code.co_posonlyargcount
+    bytecode.kwonlyargcount = code.co_kwonlyargcount
+    bytecode.first_lineno = code.co_firstlineno
+    bytecode.names = list(code.co_names)
+    bytecode.consts = list(code.co_consts)
+    bytecode.varnames = list(code.co_varnames)
+    bytecode.freevars = list(code.co_freevars)
+    bytecode.cellvars = list(code.co_cellvars)
+    _set_docstring(bytecode, code.co_consts)
+    if PY311:
+        bytecode.exception_table = ConcreteBytecode._parse_exception_table(
+            code.co_exceptiontable
+        )
+        bytecode.qualname = code.co_qualname
+    else:
+        bytecode.qualname = bytecode.qualname
+
+
 T = TypeVar("T", bound="ConcreteInstr")
 
 
@@ -120,6 +160,14 @@ class ConcreteInstr(BaseInstr[int]):
         arg: int,
     ) -> None:
         super()._set(name, arg)
+        self._update_size(arg)
+
+    def _init_unchecked(self, name: str, opcode: int, arg: int) -> None:
+        super()._init_unchecked(name, opcode, arg)
+        self._extended_args = None
+        self._update_size(arg)
+
+    def _update_size(self, arg: int) -> None:
         size = 2
         if arg is not UNSET:
             while arg > 0xFF:
@@ -181,16 +229,63 @@ class ConcreteInstr(BaseInstr[int]):
         return cls(name, arg, lineno=lineno)
 
     def use_cache_opcodes(self) -> int:
-        if sys.version_info >= (3, 13):
-            return (
-                dis._inline_cache_entries[self._name]  # type: ignore[attr-defined]
-                if self._name in dis._inline_cache_entries  # type: ignore[attr-defined]
-                else 0
-            )
-        elif sys.version_info >= (3, 11):
-            return dis._inline_cache_entries[self._opcode]  # type: ignore
-        else:
-            return 0
+        return _CACHE_COUNTS[self._opcode]
+
+
+def _is_cache(instr: Union[ConcreteInstr, SetLineno]) -> bool:
+    return PY311 and isinstance(instr, ConcreteInstr) and instr._opcode == 0
+
+
+def _get_units(instr: Union[ConcreteInstr, SetLineno]) -> int:
+    """Size of an instruction in the unit of jump arguments and offsets."""
+    if isinstance(instr, SetLineno):
+        return 0
+    return (instr._size // 2) if OFFSET_AS_INSTRUCTION else instr._size
+
+
+def _get_layout(
+    items: Sequence[Union[ConcreteInstr, SetLineno]],
+) -> Tuple[List[int], List[int], List[int]]:
+    """Get the sizes and offsets of instructions and the indexes of the jumps."""
+    unit_size = 2 if OFFSET_AS_INSTRUCTION else 1
+    units = [
+        0 if isinstance(item, SetLineno) else item._size // unit_size for item in items
+    ]
+    # Only SetLineno have a null size
+    jumps = [
+        i
+        for i, item in enumerate(items)
+        if units[i] and _OPCODE_PROPERTIES[item._opcode] & _HAS_JUMP  # type: ignore
+    ]
+    return units, list(itertools.accumulate(units, initial=0)), jumps
+
+
+def _find_instr(units: List[int], offsets: List[int], offset: int) -> Optional[int]:
+    """Get the index of the instruction starting at offset."""
+    size = len(units)
+    i = bisect.bisect_left(offsets, offset, 0, size)
+    # Skip SetLineno
+    while i < size and not units[i]:
+        i += 1
+    if i == size or offsets[i] != offset:
+        return None
+    return i
+
+
+def _set_jump_arg(instr: ConcreteInstr, arg: int) -> ConcreteInstr:
+    # Instructions can be shared by copies of a bytecode, so the jump is copied.
+    # Its size is kept if its argument shrinks so that relaxing jumps converges.
+    new_instr = ConcreteInstr._from_opcode(instr._opcode, arg, instr._location)
+    if new_instr._size < instr._size:
+        new_instr._extended_args = instr._size // 2 - 1
+        new_instr._update_size(arg)
+    return new_instr
+
+
+def _make_caches(count: int, location: Optional[InstrLocation]) -> List[ConcreteInstr]:
+    """Create a run of CACHE instructions sharing the same location."""
+    from_opcode = ConcreteInstr._from_opcode
+    return [from_opcode(0, 0, location) for _ in range(count)]
 
 
 class ExceptionTableEntry:
@@ -301,6 +396,23 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
             self.consts = bytecode.consts
             self.names = bytecode.names
             self.varnames = bytecode.varnames
+            self.exception_table = bytecode.exception_table
+
+    def _get_attrs_state(self) -> List[Any]:
+        state = super()._get_attrs_state()
+        # Constants are compared by identity since equal constants of different
+        # types (0, 0.0, False) are not interchangeable. The original constants
+        # are kept alive by the code object so their id cannot be reused.
+        state.append([id(const) for const in self.consts])
+        state.append(list(self.names))
+        state.append(list(self.varnames))
+        state.append(
+            [
+                (entry.start_offset, entry.stop_offset, entry.target, entry.push_lasti)
+                for entry in self.exception_table
+            ]
+        )
+        return state
 
     def __repr__(self) -> str:
         return "<ConcreteBytecode instr#=%s>" % len(self)
@@ -323,12 +435,15 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
 
     @staticmethod
     def from_code(
-        code: types.CodeType, *, extended_arg: bool = False
+        code: types.CodeType, *, extended_arg: bool = False, use_dis: bool = False
     ) -> "ConcreteBytecode":
         instructions: MutableSequence[Union[SetLineno, ConcreteInstr]]
-        # For Python 3.11+ we use dis to extract the detailed location information at
-        # reduced maintenance cost.
-        if PY311:
+        # For Python 3.11+ we decode co_code directly and pair each code unit with
+        # the matching entry of co_positions. The dis based implementation is kept
+        # to allow cross-checking both decoders.
+        if PY311 and not use_dis:
+            instructions = ConcreteBytecode._decode_code(code)
+        elif PY311:
             instructions = []
             for i in dis.get_instructions(code, show_caches=True):
                 loc = InstrLocation.from_positions(i.positions) if i.positions else None
@@ -343,8 +458,7 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
                 )
                 # cache_info only exist on 3.13+
                 for _, size, _ in (i.cache_info or ()) if PY313 else ():  # type: ignore
-                    for _ in range(size):
-                        instructions.append(ConcreteInstr("CACHE", 0, location=loc))
+                    instructions.extend(_make_caches(size, loc))
         else:
             if PY310:
                 line_starts = {offset: lineno for offset, _, lineno in code.co_lines()}
@@ -376,30 +490,52 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
             # The list is modified in place
             bytecode._remove_extended_args(instructions)
 
-        bytecode.name = code.co_name
-        bytecode.filename = code.co_filename
-        bytecode.flags = CompilerFlags(code.co_flags)
-        bytecode.argcount = code.co_argcount
-        bytecode.posonlyargcount = code.co_posonlyargcount
-        bytecode.kwonlyargcount = code.co_kwonlyargcount
-        bytecode.first_lineno = code.co_firstlineno
-        bytecode.names = list(code.co_names)
-        bytecode.consts = list(code.co_consts)
-        bytecode.varnames = list(code.co_varnames)
-        bytecode.freevars = list(code.co_freevars)
-        bytecode.cellvars = list(code.co_cellvars)
-        _set_docstring(bytecode, code.co_consts)
-        if PY311:
-            bytecode.exception_table = bytecode._parse_exception_table(
-                code.co_exceptiontable
-            )
-            bytecode.qualname = code.co_qualname
-        else:
-            bytecode.qualname = bytecode.qualname
-
+        _set_code_attributes(bytecode, code)
         bytecode[:] = instructions
+        bytecode._set_source_code(code)
         return bytecode
 
+    @staticmethod
+    def _decode_code(code: types.CodeType) -> List[Union[SetLineno, ConcreteInstr]]:
+        assert PY311
+        co_code = code.co_code
+        instructions: List[Union[SetLineno, ConcreteInstr]] = []
+        append = instructions.append
+        # co_code only contains valid opcodes and arguments in 0..255
+        from_opcode = ConcreteInstr._from_opcode
+        # Positions provided by the interpreter are valid and mostly shared
+        intern_location = _intern_location
+        caches = 0
+        loc: Optional[InstrLocation] = None
+        # co_positions yields one entry per code unit (including CACHE and
+        # EXTENDED_ARG) so it can be zipped with the (opcode, arg) pairs. It may
+        # however be shorter if the line table is incomplete, so we pad it.
+        for op, arg, positions in zip(
+            co_code[::2],
+            co_code[1::2],
+            itertools.chain(code.co_positions(), itertools.repeat(_NO_POSITIONS)),
+        ):
+            # The inline cache entries following an instruction are zeroed in
+            # co_code, we expose them as CACHE instructions.
+            if caches:
+                caches -= 1
+                # On 3.13+, CACHE entries share the location of their instruction
+                # (matching the dis based decoder).
+                if not PY313:
+                    loc = intern_location(positions)
+                append(from_opcode(0, 0, loc))
+                continue
+
+            loc = intern_location(positions)
+            append(
+                from_opcode(
+                    op, arg if _OPCODE_PROPERTIES[op] & _HAS_ARG else UNSET, loc
+                )
+            )
+            caches = _CACHE_COUNTS[op]
+
+        return instructions
+
     @staticmethod
     def _normalize_lineno(
         instructions: Sequence[Union[ConcreteInstr, SetLineno]], first_lineno: int
@@ -421,23 +557,50 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
     def _assemble_code(
         self,
     ) -> Tuple[bytes, List[Tuple[int, int, int, Optional[InstrLocation]]]]:
-        offset = 0
-        code_str = []
+        instructions = list(self._normalize_lineno(self, self.first_lineno))
+
+        # Assemble all instructions in place in a single buffer, which is
+        # preallocated assuming each instruction assembles to its size. The
+        # results are identical to joining ConcreteInstr.assemble() outputs.
+        code = bytearray(sum(instr._size for _, instr in instructions))
+        extended_arg = _opcode.EXTENDED_ARG
         linenos = []
-        for lineno, instr in self._normalize_lineno(self, self.first_lineno):
-            code_str.append(instr.assemble())
-            i_size = instr.size
-            linenos.append(
-                (
-                    (offset * 2) if OFFSET_AS_INSTRUCTION else offset,
-                    i_size,
-                    lineno,
-                    instr.location,
-                )
-            )
-            offset += (i_size // 2) if OFFSET_AS_INSTRUCTION else i_size
+        append = linenos.append
+        offset = 0
+        pos = 0
+        for lineno, instr in instructions:
+            i_size = instr._size
+            append((offset, i_size, lineno, instr._location))
+            offset += i_size
+
+            # Fast path for instruction without EXTENDED_ARG (UNSET is 0)
+            arg = instr._arg
+            if i_size == 2 and arg <= 0xFF:
+                code[pos] = instr._opcode
+                code[pos + 1] = arg
+                pos += 2
+                continue
+
+            if arg is UNSET:
+                arg = 0
+                length = 2
+            else:
+                # EXTENDED_ARG required by the argument, the instruction may be
+                # padded with more of them up to its size.
+                length = max(2 + 2 * max(0, (arg.bit_length() - 1) // 8), i_size)
+            if length != i_size:
+                code[pos : pos + i_size] = bytes(length)
+
+            end = pos + length
+            code[end - 2] = instr._opcode
+            code[end - 1] = arg & 0xFF
+            for ext_pos in range(end - 4, pos - 1, -2):
+                arg >>= 8
+                code[ext_pos] = extended_arg
+                code[ext_pos + 1] = arg & 0xFF
+            pos = end
 
-        return (b"".join(code_str), linenos)
+        return (bytes(code), linenos)
 
     # Used on 3.8 and 3.9
     @staticmethod
@@ -751,29 +914,30 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
         # following opcode the way a normal EXTENDED_ARG does. As a
         # consequence, they need to be tracked manually as otherwise the
         # offsets in jump targets can end up being wrong.
+        # The instructions are compacted in a single pass into a new list which
+        # replaces the content of the input once we are done. Deleting the
+        # EXTENDED_ARG in place would be quadratic in the number of instructions.
+        extended_arg_opcode = _opcode.EXTENDED_ARG
         nb_extended_args = 0
         extended_arg = None
-        index = 0
-        while index < len(instructions):
-            instr = instructions[index]
-
+        folded: List[Union[SetLineno, ConcreteInstr]] = []
+        append = folded.append
+        for instr in instructions:
             # Skip SetLineno meta instruction
             if isinstance(instr, SetLineno):
-                index += 1
+                append(instr)
                 continue
 
-            if instr.name == "EXTENDED_ARG":
+            if instr._opcode == extended_arg_opcode:
                 nb_extended_args += 1
                 if extended_arg is not None:
-                    extended_arg = (extended_arg << 8) + instr.arg
+                    extended_arg = (extended_arg << 8) + instr._arg
                 else:
-                    extended_arg = instr.arg
-
-                del instructions[index]
+                    extended_arg = instr._arg
                 continue
 
             if extended_arg is not None:
-                arg = UNSET if instr.name == "NOP" else (extended_arg << 8) + instr.arg
+                arg = UNSET if instr.name == "NOP" else (extended_arg << 8) + instr._arg
                 extended_arg = None
 
                 instr = ConcreteInstr(
@@ -782,14 +946,17 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
                     location=instr.location,
                     extended_args=nb_extended_args,
                 )
-                instructions[index] = instr
                 nb_extended_args = 0
 
-            index += 1
+            append(instr)
 
         if extended_arg is not None:
             raise ValueError("EXTENDED_ARG at the end of the code")
 
+        # Avoid rewriting the sequence if no EXTENDED_ARG was found.
+        if len(folded) != len(instructions):
+            instructions[:] = folded
+
     # Taken and adapted from exception_handling_notes.txt in cpython/Objects
     @staticmethod
     def _parse_varint(except_table_iterator: Iterator[int]) -> int:
@@ -801,19 +968,19 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
             val |= b & 63
         return val
 
-    def _parse_exception_table(
-        self, exception_table: bytes
-    ) -> List[ExceptionTableEntry]:
+    @staticmethod
+    def _parse_exception_table(exception_table: bytes) -> List[ExceptionTableEntry]:
         assert PY311
+        parse_varint = ConcreteBytecode._parse_varint
         table = []
         iterator = iter(exception_table)
         try:
             while True:
-                start = self._parse_varint(iterator)
-                length = self._parse_varint(iterator)
+                start = parse_varint(iterator)
+                length = parse_varint(iterator)
                 end = start + length - 1  # Present as inclusive
-                target = self._parse_varint(iterator)
-                dl = self._parse_varint(iterator)
+                target = parse_varint(iterator)
+                dl = parse_varint(iterator)
                 depth = dl >> 1
                 lasti = bool(dl & 1)
                 table.append(ExceptionTableEntry(start, end, target, depth, lasti))
@@ -846,10 +1013,188 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
 
         return bytes(table)
 
+    def patch(
+        self,
+        index: int,
+        instructions: Sequence[Union[ConcreteInstr, SetLineno]],
+        *,
+        count: int = 1,
+    ) -> None:
+        """Replace instructions without converting to abstract bytecode.
+
+        Replace the *count* instructions starting at *index*, along with their
+        CACHE entries, by *instructions*. CACHE entries are added after the new
+        instructions requiring them. New instructions without a location are
+        copied and get the location of the instruction at *index*.
+
+        If the size of the code changes, the arguments of the jumps (including
+        the new ones, whose arguments are relative to the patched code), their
+        EXTENDED_ARG prefixes and the offsets of the exception table are
+        updated. Jumps and exception table entries referring to the instruction
+        at *index* refer to the first new instruction.
+
+        The bytecode must not contain EXTENDED_ARG instructions, which are kept
+        by ``from_code(code, extended_arg=True)``.
+
+        Stack depths are not recomputed: if the patch keeps them unchanged, the
+        code can be assembled quickly with ``to_code(stacksize, mode="fast")``.
+
+        """
+        items = list(list.__iter__(self))
+        size = len(items)
+        if not 0 <= index <= size:
+            raise IndexError("patch index out of range")
+        if index < size and _is_cache(items[index]):
+            raise ValueError("cannot patch a CACHE entry")
+        stop = index
+        for _ in range(count):
+            if stop >= size:
+                raise IndexError("not enough instructions to replace")
+            stop += 1
+            while stop < size and _is_cache(items[stop]):
+                stop += 1
+
+        location = (
+            items[index]._location
+            if index < size and isinstance(items[index], ConcreteInstr)
+            else None
+        )
+        new_items: List[Union[ConcreteInstr, SetLineno]] = []
+        for instr in instructions:
+            self._check_instr(instr)
+            if isinstance(instr, ConcreteInstr):
+                if location is not None and instr._location is None:
+                    instr = instr.copy()
+                    instr._location = location
+                new_items.append(instr)
+                new_items.extend(
+                    _make_caches(_CACHE_COUNTS[instr._opcode], instr._location)
+                )
+            else:
+                new_items.append(instr)
+        # EXTENDED_ARG items (kept by from_code(extended_arg=True)) hold the high
+        # bits of the argument of the next instruction which cannot be updated.
+        extended_arg = _opcode.EXTENDED_ARG
+        if any(
+            not isinstance(item, SetLineno) and item._opcode == extended_arg
+            for item in itertools.chain(items, new_items)
+        ):
+            raise ValueError(
+                "cannot patch bytecode containing EXTENDED_ARG instructions, "
+                "use from_code() with extended_arg=False"
+            )
+        delta = len(new_items) - (stop - index)
+
+        def new_index(i: int) -> int:
+            if i < index:
+                return i
+            if i == index:
+                return index
+            if i >= stop:
+                return i + delta
+            raise ValueError(
+                "instruction %d is replaced but a jump or an exception table "
+                "entry refers to it" % i
+            )
+
+        # Resolve the targets of the jumps and the offsets of the exception
+        # table entries to the index of the instructions in the patched code.
+        old_units, old_offsets, old_jumps = _get_layout(items)
+        jumps: List[Tuple[int, ConcreteInstr, int]] = []
+        for i in old_jumps:
+            if index <= i < stop:
+                continue
+            jump = items[i]
+            target = _find_instr(
+                old_units,
+                old_offsets,
+                jump.get_jump_target(old_offsets[i]),  # type: ignore
+            )
+            if target is None:
+                raise ValueError("invalid jump target for instruction %d" % i)
+            position = i if i < index else i + delta
+            jumps.append((position, jump, new_index(target)))  # type: ignore
+
+        def locate(offset: int, is_stop: bool = False) -> Tuple[int, int]:
+            i = bisect.bisect_right(old_offsets, offset, 0, size) - 1
+            # Offsets are kept relative to the end of the instruction, except
+            # start offsets pointing to its first unit (no EXTENDED_ARG).
+            rel = old_offsets[i + 1] - offset
+            if not is_stop:
+                return new_index(i), (0 if offset == old_offsets[i] else rel)
+            # The inclusive stop offset follows the end of the instruction
+            if i < index:
+                return i, rel
+            if i >= stop:
+                return i + delta, rel
+            return index + len(new_items) - 1, 1
+
+        entries = [
+            (locate(e.start_offset), locate(e.stop_offset, True), locate(e.target), e)
+            for e in self.exception_table
+        ]
+
+        patched = items[:index] + new_items + items[stop:]
+        new_units, _, new_jumps = _get_layout(new_items)
+        units = old_units[:index] + new_units + old_units[stop:]
+        offsets = list(itertools.accumulate(units, initial=0))
+        for i in new_jumps:
+            i += index
+            jump = patched[i]
+            target = _find_instr(units, offsets, jump.get_jump_target(offsets[i]))  # type: ignore
+            if target is None:
+                raise ValueError("invalid jump target for new instruction")
+            jumps.append((i, jump, target))  # type: ignore
+
+        # Jumps can only grow, so the relaxation converges.
+        while True:
+            resized = False
+            for jump_index, (i, instr, target) in enumerate(jumps):
+                instr_offset = offsets[i] + units[i] + _CACHE_COUNTS[instr._opcode]
+                if instr.is_forward_rel_jump():
+                    arg = offsets[target] - instr_offset
+                elif instr.is_backward_rel_jump():
+                    arg = instr_offset - offsets[target]
+                else:
+                    arg = offsets[target]
+                if arg < 0:
+                    raise ValueError("jump %d cannot reach its target" % i)
+                if arg != instr._arg:
+                    instr = patched[i] = _set_jump_arg(instr, arg)
+                    jumps[jump_index] = (i, instr, target)
+                    if _get_units(instr) != units[i]:
+                        units[i] = _get_units(instr)
+                        resized = True
+            if not resized:
+                break
+            offsets = list(itertools.accumulate(units, initial=0))
+
+        def get_offset(position: Tuple[int, int]) -> int:
+            i, rel = position
+            return offsets[i] if rel == 0 else offsets[i] + units[i] - rel
+
+        exception_table = []
+        for start, end, target, entry in entries:
+            start_offset = get_offset(start)
+            stop_offset = get_offset(end)
+            # Entries covering only replaced instructions may become empty
+            if stop_offset >= start_offset:
+                exception_table.append(
+                    ExceptionTableEntry(
+                        start_offset,
+                        stop_offset,
+                        get_offset(target),
+                        entry.stack_depth,
+                        entry.push_lasti,
+                    )
+                )
+
+        self[:] = patched
+        self.exception_table = exception_table
+
     def compute_stacksize(self, *, check_pre_and_post: bool = True) -> int:
-        bytecode = self.to_bytecode()
-        cfg = _bytecode.ControlFlowGraph.from_bytecode(bytecode)
-        return cfg.compute_stacksize(check_pre_and_post=check_pre_and_post)
+        view = _bytecode.ControlFlowGraphView(self.to_bytecode())
+        return view.compute_stacksize(check_pre_and_post=check_pre_and_post)
 
     def to_code(
         self,
@@ -857,10 +1202,24 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
         *,
         check_pre_and_post: bool = True,
         compute_exception_stack_depths: bool = True,
+        mode: Literal["safe", "fast"] = "safe",
     ) -> types.CodeType:
+        self._check_to_code_mode(mode)
+        code = self._reuse_source_code(stacksize, compute_exception_stack_depths)
+        if code is not None:
+            return code
+
+        if mode == "fast":
+            # The stack depths stored in the exception table are used as is and
+            # the instructions are assembled without being regenerated.
+            if stacksize is None:
+                stacksize = self.compute_stacksize(
+                    check_pre_and_post=check_pre_and_post
+                )
+
         # Prevent reconverting the concrete bytecode to bytecode and cfg to do the
         # calculation if we need to do it.
-        if stacksize is None or (PY311 and compute_exception_stack_depths):
+        elif stacksize is None or (PY311 and compute_exception_stack_depths):
             cfg = _bytecode.ControlFlowGraph.from_bytecode(self.to_bytecode())
             stacksize = cfg.compute_stacksize(
                 check_pre_and_post=check_pre_and_post,
@@ -1046,22 +1405,23 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
                 opcode = c_instr._opcode
                 arg: InstrArg
                 c_arg = c_instr.arg
+                kind = _ARG_KINDS[opcode]
                 # FIXME: better error reporting
-                if opcode in _opcode.hasconst:
+                if kind == _ARG_INT:
+                    arg = c_arg
+                elif kind == _ARG_CONST:
                     arg = self.consts[c_arg]
-                elif opcode in _opcode.haslocal:
-                    if opcode in DUAL_ARG_OPCODES:
-                        arg = (locals_lookup[c_arg >> 4], locals_lookup[c_arg & 15])
-                    else:
-                        arg = locals_lookup[c_arg]
-                elif opcode in _opcode.hasname:
-                    if opcode in BITFLAG_OPCODES:
-                        arg = (bool(c_arg & 1), self.names[c_arg >> 1])
-                    elif opcode in BITFLAG2_OPCODES:
-                        arg = (bool(c_arg & 1), bool(c_arg & 2), self.names[c_arg >> 2])
-                    else:
-                        arg = self.names[c_arg]
-                elif opcode in _opcode.hasfree:
+                elif kind == _ARG_LOCAL:
+                    arg = locals_lookup[c_arg]
+                elif kind == _ARG_NAME:
+                    arg = self.names[c_arg]
+                elif kind == _ARG_BITFLAG_NAME:
+                    arg = (bool(c_arg & 1), self.names[c_arg >> 1])
+                elif kind == _ARG_DUAL_LOCAL:
+                    arg = (locals_lookup[c_arg >> 4], locals_lookup[c_arg & 15])
+                elif kind == _ARG_BITFLAG2_NAME:
+                    arg = (bool(c_arg & 1), bool(c_arg & 2), self.names[c_arg >> 2])
+                elif kind == _ARG_FREE:
                     if c_arg < ncells:
                         n_or_cell = cells_lookup[c_arg]
                         arg = (
@@ -1072,18 +1432,17 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
                     else:
                         name = self.freevars[c_arg - ncells]
                         arg = FreeVar(name)
-                elif opcode in _opcode.hascompare:
+                elif kind == _ARG_COMPARE:
                     arg = Compare(
                         (c_arg >> 5) + ((1 << 4) if (c_arg & 16) else 0)
                         if PY313
                         else ((c_arg >> 4) if PY312 else c_arg)
                     )
-                elif opcode in INTRINSIC_1OP:
+                elif kind == _ARG_INTRINSIC_1:
                     arg = Intrinsic1Op(c_arg)
-                elif opcode in INTRINSIC_2OP:
-                    arg = Intrinsic2Op(c_arg)
                 else:
-                    arg = c_arg
+                    assert kind == _ARG_INTRINSIC_2
+                    arg = Intrinsic2Op(c_arg)
 
                 location = c_instr.location or InstrLocation(lineno, None, None, None)
 
@@ -1092,7 +1451,7 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
                     instr_index = len(instructions)
                     jumps.append((instr_index, jump_target))
 
-                instructions.append(Instr(c_instr.name, arg, location=location))
+                instructions.append(Instr._from_opcode(opcode, arg, location))
 
             # We now insert the TryEnd entries
             if current_instr_offset in ex_end:
@@ -1139,15 +1498,57 @@ class ConcreteBytecode(_bytecode._BaseBytecodeList[Union[ConcreteInstr, SetLinen
         _set_docstring(bytecode, self.consts)
 
         bytecode.extend(instructions)
+        self._transfer_source_code(bytecode)
         return bytecode
 
 
+class _OffsetTree:
+    """Fenwick tree over instruction sizes.
+
+    Provide the offset at which an instruction starts (i.e. the sum of the sizes
+    of all the instructions preceding it) while allowing to update the size of
+    a single instruction, both in O(log n).
+
+    """
+
+    __slots__ = ("_tree",)
+
+    def __init__(self, sizes: Sequence[int]) -> None:
+        # Build the tree in linear time, the tree is 1-indexed.
+        tree = [0, *sizes]
+        n = len(tree)
+        for i in range(1, n):
+            parent = i + (i & -i)
+            if parent < n:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def add(self, index: int, delta: int) -> None:
+        """Add delta to the size of the instruction at index."""
+        tree = self._tree
+        i = index + 1
+        n = len(tree)
+        while i < n:
+            tree[i] += delta
+            i += i & -i
+
+    def offset(self, index: int) -> int:
+        """Offset of the instruction at index (can be the number of instructions)."""
+        tree = self._tree
+        total = 0
+        i = index
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+
 class _ConvertBytecodeToConcrete:
     # XXX document attributes
 
-    #: Default number of passes of compute_jumps() before giving up.  Refer to
-    #: assemble_jump_offsets() in compile.c for background.
-    _compute_jumps_passes = 10
+    #: Default number of passes of compute_jumps() before giving up. None means
+    #: no limit, the relaxation performed by compute_jumps() always converges.
+    _compute_jumps_passes: Optional[int] = None
 
     def __init__(self, code: _bytecode.Bytecode) -> None:
         assert isinstance(code, _bytecode.Bytecode)
@@ -1166,6 +1567,9 @@ class _ConvertBytecodeToConcrete:
         self.consts_list: List[Any] = []
         self.names: List[str] = []
         self.varnames: List[str] = []
+        # Index of the first occurrence of each name in names and varnames
+        self.names_indices: Dict[str, int] = {}
+        self.varnames_indices: Dict[str, int] = {}
 
     def add_const(self, value: Any) -> int:
         key = const_key(value)
@@ -1176,13 +1580,18 @@ class _ConvertBytecodeToConcrete:
         self.consts_list.append(value)
         return index
 
-    @staticmethod
-    def add(names: List[str], name: str) -> int:
-        try:
-            index = names.index(name)
-        except ValueError:
-            index = len(names)
-            names.append(name)
+    def add_name(self, name: str) -> int:
+        index = self.names_indices.get(name)
+        if index is None:
+            index = self.names_indices[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def add_varname(self, name: str) -> int:
+        index = self.varnames_indices.get(name)
+        if index is None:
+            index = self.varnames_indices[name] = len(self.varnames)
+            self.varnames.append(name)
         return index
 
     def concrete_instructions(self) -> None:
@@ -1201,7 +1610,7 @@ class _ConvertBytecodeToConcrete:
                     assert isinstance(binstr.arg, tuple)
                     for parg in binstr.arg:
                         assert isinstance(parg, str)
-                        self.add(self.varnames, parg)
+                        self.add_varname(parg)
 
         # We use None as a sentinel to ensure caches for the last instruction are
         # properly generated.
@@ -1219,12 +1628,9 @@ class _ConvertBytecodeToConcrete:
                     # We preserve the location of the instruction requiring the
                     # presence of cache instructions
                     self.instructions.extend(
-                        [
-                            ConcreteInstr(
-                                "CACHE", 0, location=self.instructions[-1].location
-                            )
-                            for i in range(self.required_caches)
-                        ]
+                        _make_caches(
+                            self.required_caches, self.instructions[-1].location
+                        )
                     )
                     self.required_caches = 0
                     self.seen_manual_cache = False
@@ -1272,7 +1678,6 @@ class _ConvertBytecodeToConcrete:
             if instr.location is not UNSET and instr.location is not None:
                 location = instr.location
 
-            instr_name = instr.name
             opcode = instr._opcode
             arg = instr.arg
             is_jump = False
@@ -1281,46 +1686,53 @@ class _ConvertBytecodeToConcrete:
                 # fake value, real value is set in compute_jumps()
                 c_arg = 0
                 is_jump = True
-            elif opcode in _opcode.hasconst:
-                c_arg = self.add_const(arg)
-            elif opcode in _opcode.haslocal:
-                if opcode in DUAL_ARG_OPCODES:
+            else:
+                kind = _ARG_KINDS[opcode]
+                if kind == _ARG_INT:
+                    assert isinstance(arg, int)
+                    c_arg = arg
+                elif kind == _ARG_CONST:
+                    c_arg = self.add_const(arg)
+                elif kind == _ARG_LOCAL:
+                    if PY313 and isinstance(arg, CellVar):
+                        cell_instrs.append(len(self.instructions))
+                        c_arg = self.bytecode.cellvars.index(arg.name)
+                    elif PY313 and isinstance(arg, FreeVar):
+                        free_instrs.append(len(self.instructions))
+                        c_arg = self.bytecode.freevars.index(arg.name)
+                    else:
+                        assert isinstance(arg, str)
+                        c_arg = self.add_varname(arg)
+                elif kind == _ARG_NAME:
+                    assert isinstance(arg, str), f"Got {arg}, expected a str"
+                    c_arg = self.add_name(arg)
+                elif kind == _ARG_BITFLAG_NAME:
+                    assert (
+                        isinstance(arg, tuple)
+                        and len(arg) == 2
+                        and isinstance(arg[0], bool)
+                        and isinstance(arg[1], str)
+                    ), arg
+                    index = self.add_name(arg[1])
+                    c_arg = int(arg[0]) + (index << 1)
+                elif kind == _ARG_DUAL_LOCAL:
                     assert (
                         isinstance(arg, tuple)
                         and len(arg) == 2
                         and isinstance(arg[0], str)
                         and isinstance(arg[1], str)
                     )
-                    arg1_index = self.add(self.varnames, arg[0])
-                    arg2_index = self.add(self.varnames, arg[1])
+                    arg1_index = self.add_varname(arg[0])
+                    arg2_index = self.add_varname(arg[1])
                     if arg1_index > 16 or arg2_index > 16:
                         n1, n2 = DUAL_ARG_OPCODES_SINGLE_OPS[opcode]
                         c_instr = ConcreteInstr(n1, arg1_index, location=location)
                         self.instructions.append(c_instr)
-                        instr_name = n2
+                        opcode = _opcode.opmap[n2]
                         c_arg = arg2_index
                     else:
                         c_arg = (arg1_index << 4) + arg2_index
-                elif PY313 and isinstance(arg, CellVar):
-                    cell_instrs.append(len(self.instructions))
-                    c_arg = self.bytecode.cellvars.index(arg.name)
-                elif PY313 and isinstance(arg, FreeVar):
-                    free_instrs.append(len(self.instructions))
-                    c_arg = self.bytecode.freevars.index(arg.name)
-                else:
-                    assert isinstance(arg, str)
-                    c_arg = self.add(self.varnames, arg)
-            elif opcode in _opcode.hasname:
-                if opcode in BITFLAG_OPCODES:
-                    assert (
-                        isinstance(arg, tuple)
-                        and len(arg) == 2
-                        and isinstance(arg[0], bool)
-                        and isinstance(arg[1], str)
-                    ), arg
-                    index = self.add(self.names, arg[1])
-                    c_arg = int(arg[0]) + (index << 1)
-                elif opcode in BITFLAG2_OPCODES:
+                elif kind == _ARG_BITFLAG2_NAME:
                     assert (
                         isinstance(arg, tuple)
                         and len(arg) == 3
@@ -1328,44 +1740,37 @@ class _ConvertBytecodeToConcrete:
                         and isinstance(arg[1], bool)
                         and isinstance(arg[2], str)
                     ), arg
-                    index = self.add(self.names, arg[2])
+                    index = self.add_name(arg[2])
                     c_arg = int(arg[0]) + 2 * int(arg[1]) + (index << 2)
-                else:
-                    assert isinstance(arg, str), f"Got {arg}, expected a str"
-                    c_arg = self.add(self.names, arg)
-            elif opcode in _opcode.hasfree:
-                if isinstance(arg, CellVar):
-                    cell_instrs.append(len(self.instructions))
-                    c_arg = self.bytecode.cellvars.index(arg.name)
-                else:
-                    assert isinstance(arg, FreeVar)
-                    free_instrs.append(len(self.instructions))
-                    c_arg = self.bytecode.freevars.index(arg.name)
-            elif opcode in _opcode.hascompare:
-                if isinstance(arg, Compare):
-                    # In Python 3.13 the 4 lowest bits are used for caching
-                    # and the 5th one indicate a cast to bool
-                    if PY313:
-                        c_arg = (
-                            arg._get_mask()
-                            + ((arg.value & 0b1111) << 5)
-                            + (arg.value & 16)
-                        )
-                    # In Python 3.12 the 4 lowest bits are used for caching
-                    # See compare_masks in compile.c
-                    elif PY312:
-                        c_arg = arg._get_mask() + (arg.value << 4)
+                elif kind == _ARG_FREE:
+                    if isinstance(arg, CellVar):
+                        cell_instrs.append(len(self.instructions))
+                        c_arg = self.bytecode.cellvars.index(arg.name)
                     else:
-                        c_arg = arg.value
-            elif opcode in INTRINSIC:
-                if isinstance(arg, (Intrinsic1Op, Intrinsic2Op)):
+                        assert isinstance(arg, FreeVar)
+                        free_instrs.append(len(self.instructions))
+                        c_arg = self.bytecode.freevars.index(arg.name)
+                elif kind == _ARG_COMPARE:
+                    if isinstance(arg, Compare):
+                        # In Python 3.13 the 4 lowest bits are used for caching
+                        # and the 5th one indicate a cast to bool
+                        if PY313:
+                            c_arg = (
+                                arg._get_mask()
+                                + ((arg.value & 0b1111) << 5)
+                                + (arg.value & 16)
+                            )
+                        # In Python 3.12 the 4 lowest bits are used for caching
+                        # See compare_masks in compile.c
+                        elif PY312:
+                            c_arg = arg._get_mask() + (arg.value << 4)
+                        else:
+                            c_arg = arg.value
+                elif isinstance(arg, (Intrinsic1Op, Intrinsic2Op)):
                     c_arg = arg.value
-            else:
-                assert isinstance(arg, int)
-                c_arg = arg
 
             # The above should have performed all the necessary conversion
-            c_instr = ConcreteInstr(instr_name, c_arg, location=location)
+            c_instr = ConcreteInstr._from_opcode(opcode, c_arg, location)
             if is_jump:
                 self.jumps.append((len(self.instructions), label, c_instr))
 
@@ -1386,8 +1791,8 @@ class _ConvertBytecodeToConcrete:
             n_shared = 0
             n_unshared = 0
             for i, name in enumerate(self.bytecode.cellvars):
-                if name in self.varnames:
-                    shared_name_indexes[i] = self.varnames.index(name)
+                if name in self.varnames_indices:
+                    shared_name_indexes[i] = self.varnames_indices[name]
                     n_shared += 1
                 else:
                     shared_name_indexes[i] = len(self.varnames) + n_unshared
@@ -1405,72 +1810,103 @@ class _ConvertBytecodeToConcrete:
             c_instr = self.instructions[index]
             c_instr.arg += free_offset
 
-    def compute_jumps(self) -> bool:
-        # For labels we need the offset before the instruction at a given index but for
-        # exception table entries we need the offset of the instruction which can differ
-        # in the presence of extended args...
-        label_offsets = []
-        instruction_offsets = []
-        offset = 0
-        for instr in self.instructions:
-            label_offsets.append(offset)
-            # If an instruction uses extended args, those appear before the instruction
-            # causing the instruction to appear at offset that accounts for extended
-            # args.
-            offset += (
-                (instr.size // 2 - 1) if OFFSET_AS_INSTRUCTION else (instr.size - 2)
-            )
-            instruction_offsets.append(offset)
-            offset += 1 if OFFSET_AS_INSTRUCTION else 2
-        # needed if a label is at the end
-        label_offsets.append(offset)
-
-        # Fix argument of jump instructions: resolve labels
-        modified = False
+    def compute_jumps(self, max_passes: Optional[int] = None) -> None:
+        """Resolve the arguments of jumps and the exception table entries offsets.
+
+        Growing the argument of a jump may require an EXTENDED_ARG which moves
+        all the following instructions and may in turn require to grow other
+        jumps. Since sizes can only grow, this relaxation always converges. Once
+        a jump grew, the offsets are tracked in a Fenwick tree and each pass only
+        revisits the jumps spanning an instruction whose size changed.
+
+        """
+        # Sizes and offsets are expressed in the unit used by jump arguments.
+        sizes = [
+            (instr.size // 2) if OFFSET_AS_INSTRUCTION else instr.size
+            for instr in self.instructions
+        ]
+        # For labels we need the offset before the instruction at a given index
+        # (i.e. including the extended args). The first pass uses plain offsets
+        # since in most cases no jump will need to grow.
+        label_offsets = list(itertools.accumulate(sizes, initial=0))
+        offset_of = label_offsets.__getitem__
+        tree: Optional[_OffsetTree] = None
+
+        # The argument of a jump only depends on the size of the instructions
+        # between the jump and its target (and on all the instructions before its
+        # target for absolute jumps).
+        jumps: List[Tuple[int, int, int, int, ConcreteInstr]] = []
         for index, label, instr in self.jumps:
             target_index = self.labels[label]
-            target_offset = label_offsets[target_index]
-
-            # For jump using cache opcodes, an argument of 0 jumps to the
-            # first non cache instructions right after the jump instruction
-            instr_offset = label_offsets[index] + instr.use_cache_opcodes()
-            if instr.is_forward_rel_jump():
-                target_offset -= instr_offset + (
-                    instr.size // 2 if OFFSET_AS_INSTRUCTION else instr.size
-                )
-            elif instr.is_backward_rel_jump():
-                target_offset = (
-                    instr_offset
-                    + (instr.size // 2 if OFFSET_AS_INSTRUCTION else instr.size)
-                    - target_offset
+            if instr.is_abs_jump():
+                first, last = 0, target_index
+            else:
+                first, last = min(index, target_index), max(index, target_index)
+            jumps.append((first, last, index, target_index, instr))
+
+        pending = jumps
+        passes = 0
+        while pending:
+            passes += 1
+            resized: List[int] = []
+            for _, _, index, target_index, instr in pending:
+                target_offset = offset_of(target_index)
+
+                # For jump using cache opcodes, an argument of 0 jumps to the
+                # first non cache instructions right after the jump instruction
+                instr_offset = offset_of(index) + instr.use_cache_opcodes()
+                if instr.is_forward_rel_jump():
+                    target_offset -= instr_offset + sizes[index]
+                elif instr.is_backward_rel_jump():
+                    target_offset = instr_offset + sizes[index] - target_offset
+
+                old_size = instr.size
+                # FIXME: better error report if target_offset is negative
+                instr.arg = target_offset
+                if instr.size != old_size:
+                    size = (instr.size // 2) if OFFSET_AS_INSTRUCTION else instr.size
+                    if tree is not None:
+                        tree.add(index, size - sizes[index])
+                    sizes[index] = size
+                    resized.append(index)
+
+            if not resized:
+                break
+
+            # A pass modifying the code requires another one to validate it.
+            if max_passes is not None and passes >= max_passes:
+                raise RuntimeError(
+                    "compute_jumps() failed to converge after %d passes" % max_passes
                 )
 
-            old_size = instr.size
-            # FIXME: better error report if target_offset is negative
-            instr.arg = target_offset
-            if instr.size != old_size:
-                modified = True
+            if tree is None:
+                tree = _OffsetTree(sizes)
+                offset_of = tree.offset
+
+            resized.sort()
+            pending = []
+            for jump in jumps:
+                i = bisect.bisect_left(resized, jump[0])
+                if i < len(resized) and resized[i] <= jump[1]:
+                    pending.append(jump)
 
-        # If a jump required an extended arg hence invalidating the calculation
-        # we return early before filling the exception table entries
-        if modified:
-            return modified
+        # If an instruction uses extended args, those appear before the instruction
+        # causing the instruction to appear at offset that accounts for extended
+        # args.
+        last_unit = 1 if OFFSET_AS_INSTRUCTION else 2
 
         # Resolve labels for exception handling entries
         for tb, entry in self.exception_handling_blocks.items():
             # Set the offset for the start and end offset from the instruction
             # index stored when assembling the concrete instructions.
-            entry.start_offset = instruction_offsets[entry.start_offset]
-            entry.stop_offset = instruction_offsets[entry.stop_offset]
+            start, stop = entry.start_offset, entry.stop_offset
+            entry.start_offset = offset_of(start) + sizes[start] - last_unit
+            entry.stop_offset = offset_of(stop) + sizes[stop] - last_unit
 
             # Set the offset to the target instruction
             lb = tb.target
             assert isinstance(lb, Label)
-            target_index = self.labels[lb]
-            target_offset = label_offsets[target_index]
-            entry.target = target_offset
-
-        return False
+            entry.target = offset_of(self.labels[lb])
 
     def to_concrete_bytecode(
         self,
@@ -1489,18 +1925,12 @@ class _ConvertBytecodeToConcrete:
         if first_const is not UNSET:
             self.add_const(first_const)
 
-        self.varnames.extend(self.bytecode.argnames)
+        for name in self.bytecode.argnames:
+            self.varnames_indices.setdefault(name, len(self.varnames))
+            self.varnames.append(name)
 
         self.concrete_instructions()
-        for _ in range(0, compute_jumps_passes):
-            modified = self.compute_jumps()
-            if not modified:
-                break
-        else:
-            raise RuntimeError(
-                "compute_jumps() failed to converge after"
-                " %d passes" % (compute_jumps_passes)
-            )
+        self.compute_jumps(compute_jumps_passes)
 
         concrete = ConcreteBytecode(
             self.instructions,
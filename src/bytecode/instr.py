@@ -1,11 +1,24 @@
 import dis
 import enum
+import functools
 import opcode as _opcode
 import sys
+import types
 from abc import abstractmethod
 from dataclasses import dataclass
-from marshal import dumps as _dumps
-from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar, Union
+from marshal import dumps as _dumps, loads as _loads
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 try:
     from typing import TypeGuard
@@ -169,6 +182,10 @@ class _UNSET(int):
     def __eq__(self, other) -> bool:
         return self is other
 
+    def __reduce__(self):
+        # Unpickle as the singleton
+        return (_UNSET, ())
+
 
 for op in [
     "__abs__",
@@ -222,15 +239,50 @@ for op in [
 UNSET = _UNSET()
 
 
-def const_key(obj: Any) -> Union[bytes, Tuple[type, int]]:
+def _const_key(obj: Any) -> Union[bytes, Tuple[type, int]]:
     try:
-        return _dumps(obj)
+        # Version 2 of the format does not depend on whether strings are
+        # interned or objects are referenced several times, so that constants
+        # loaded by marshal or pickle are equal to the original ones.
+        return _dumps(obj, 2)
     except ValueError:
         # For other types, we use the object identifier as an unique identifier
         # to ensure that they are seen as unequal.
         return (type(obj), id(obj))
 
 
+# Marshalling large constants (literal tables, nested code objects) is
+# expensive and the same constant objects are used by many instructions and
+# compared again and again, so the keys of immutable constants are memoized
+# by identity. Each entry keeps its constant alive, so that its identifier
+# cannot be reused by another object while it is in the table. Only hashable
+# instances of these exact types are memoized: a hashable tuple or frozenset
+# cannot contain a mutable container. The table is bounded by simply clearing
+# it when full.
+_MEMOIZED_CONST_TYPES = frozenset((str, bytes, tuple, frozenset, types.CodeType))
+_MAX_CONST_KEYS = 1024
+_const_keys: Dict[int, Tuple[Any, Union[bytes, Tuple[type, int]]]] = {}
+
+
+def const_key(obj: Any) -> Union[bytes, Tuple[type, int]]:
+    if type(obj) not in _MEMOIZED_CONST_TYPES:
+        return _const_key(obj)
+
+    entry = _const_keys.get(id(obj))
+    if entry is not None and entry[0] is obj:
+        return entry[1]
+    try:
+        hash(obj)
+    except TypeError:
+        return _const_key(obj)
+
+    key = _const_key(obj)
+    if len(_const_keys) >= _MAX_CONST_KEYS:
+        _const_keys.clear()
+    _const_keys[id(obj)] = (obj, key)
+    return key
+
+
 class Label:
     __slots__ = ()
 
@@ -292,6 +344,133 @@ else:
         return opcode >= dis.HAVE_ARGUMENT
 
 
+# --- Opcode properties
+
+# Properties of each opcode are precomputed for the running interpreter and
+# stored as bit flags in _OPCODE_PROPERTIES so that the BaseInstr predicates
+# boil down to a table lookup. The number of inline cache entries following the
+# instruction is stored in the bits above _CACHE_SHIFT.
+_HAS_ARG = 1 << 0
+_HAS_JUMP = 1 << 1
+_COND_JUMP = 1 << 2
+_UNCOND_JUMP = 1 << 3
+_FINAL = 1 << 4
+_ABS_JUMP = 1 << 5
+_FORWARD_JUMP = 1 << 6
+_BACKWARD_JUMP = 1 << 7
+_HAS_CONST = 1 << 8
+_HAS_LOCAL = 1 << 9
+_HAS_NAME = 1 << 10
+_HAS_FREE = 1 << 11
+_CACHE_SHIFT = 12
+
+# JUMP_BACKWARD has been introduced in 3.11+
+# JUMP_ABSOLUTE was removed in 3.11+
+_UNCOND_JUMP_NAMES = frozenset(
+    ("JUMP_FORWARD", "JUMP_ABSOLUTE", "JUMP_BACKWARD", "JUMP_BACKWARD_NO_INTERRUPT")
+)
+
+_FINAL_NAMES = frozenset(
+    (
+        "RETURN_VALUE",
+        "RETURN_CONST",
+        "RAISE_VARARGS",
+        "RERAISE",
+        "BREAK_LOOP",
+        "CONTINUE_LOOP",
+    )
+)
+
+
+def _inline_cache_entries(opcode: int) -> int:
+    if PY313:
+        return dis._inline_cache_entries.get(  # type: ignore[attr-defined]
+            _opcode.opname[opcode], 0
+        )
+    elif PY311:
+        return dis._inline_cache_entries[opcode]  # type: ignore[attr-defined]
+    else:
+        return 0
+
+
+def _compute_opcode_properties(opcode: int) -> int:
+    name = _opcode.opname[opcode]
+    props = _inline_cache_entries(opcode) << _CACHE_SHIFT
+    if opcode_has_argument(opcode):
+        props |= _HAS_ARG
+    if opcode in _opcode.hasjrel or opcode in _opcode.hasjabs:
+        props |= _HAS_JUMP
+    # Ex: POP_JUMP_IF_TRUE, JUMP_IF_FALSE_OR_POP
+    # IN 3.11+ the JUMP and the IF are no necessary adjacent in the name.
+    if "JUMP_" in name and "IF_" in name:
+        props |= _COND_JUMP
+    if name in _UNCOND_JUMP_NAMES:
+        props |= _UNCOND_JUMP | _FINAL
+    if name in _FINAL_NAMES:
+        props |= _FINAL
+    if opcode in HASJABS:
+        props |= _ABS_JUMP
+    if opcode in HASJREL:
+        props |= _BACKWARD_JUMP if "BACKWARD" in name else _FORWARD_JUMP
+    if opcode in _opcode.hasconst:
+        props |= _HAS_CONST
+    if opcode in _opcode.haslocal:
+        props |= _HAS_LOCAL
+    if opcode in _opcode.hasname:
+        props |= _HAS_NAME
+    if opcode in _opcode.hasfree:
+        props |= _HAS_FREE
+    return props
+
+
+_OPCODE_PROPERTIES: List[int] = [_compute_opcode_properties(op) for op in range(256)]
+
+# Number of inline cache entries following each opcode, split out of
+# _OPCODE_PROPERTIES since it is looked up for every jump in each pass resolving
+# jumps and for every instruction emitted when converting to concrete bytecode.
+_CACHE_COUNTS: List[int] = [props >> _CACHE_SHIFT for props in _OPCODE_PROPERTIES]
+
+# Kind of argument of each opcode, used by the conversions between concrete and
+# abstract bytecode to pick how to resolve an argument with a single lookup
+# instead of testing the membership of the opcode in the opcode lists.
+_ARG_INT = 0
+_ARG_CONST = 1
+_ARG_LOCAL = 2
+_ARG_DUAL_LOCAL = 3
+_ARG_NAME = 4
+_ARG_BITFLAG_NAME = 5
+_ARG_BITFLAG2_NAME = 6
+_ARG_FREE = 7
+_ARG_COMPARE = 8
+_ARG_INTRINSIC_1 = 9
+_ARG_INTRINSIC_2 = 10
+
+
+def _compute_arg_kind(opcode: int) -> int:
+    if opcode in _opcode.hasconst:
+        return _ARG_CONST
+    if opcode in _opcode.haslocal:
+        return _ARG_DUAL_LOCAL if opcode in DUAL_ARG_OPCODES else _ARG_LOCAL
+    if opcode in _opcode.hasname:
+        if opcode in BITFLAG_OPCODES:
+            return _ARG_BITFLAG_NAME
+        if opcode in BITFLAG2_OPCODES:
+            return _ARG_BITFLAG2_NAME
+        return _ARG_NAME
+    if opcode in _opcode.hasfree:
+        return _ARG_FREE
+    if opcode in _opcode.hascompare:
+        return _ARG_COMPARE
+    if opcode in INTRINSIC_1OP:
+        return _ARG_INTRINSIC_1
+    if opcode in INTRINSIC_2OP:
+        return _ARG_INTRINSIC_2
+    return _ARG_INT
+
+
+_ARG_KINDS: List[int] = [_compute_arg_kind(op) for op in range(256)]
+
+
 # --- Instruction stack effect impact
 
 # We split the stack effect between the manipulations done on the stack before
@@ -408,6 +587,30 @@ DYNAMIC_STACK_EFFECTS: Dict[
 }
 
 
+@functools.lru_cache(maxsize=4096)
+def opcode_pre_and_post_stack_effect(
+    opcode: int, oparg: Optional[int], jump: Optional[bool] = None
+) -> Tuple[int, int]:
+    """Effect of an opcode on the stack before and after its execution.
+
+    *oparg* is the integer argument as accepted by :func:`dis.stack_effect`. The
+    results are memoized since they are queried for every instruction of every
+    block visited when computing the stack size.
+
+    """
+    effect = dis.stack_effect(opcode, oparg, jump=jump)
+
+    name = _opcode.opname[opcode]
+    if name in STATIC_STACK_EFFECTS:
+        return STATIC_STACK_EFFECTS[name]
+    elif name in DYNAMIC_STACK_EFFECTS:
+        return DYNAMIC_STACK_EFFECTS[name](effect, oparg, jump)
+    else:
+        # For instruction with no special value we simply consider the effect apply
+        # before execution
+        return (effect, 0)
+
+
 # --- Instruction location
 
 
@@ -500,6 +703,57 @@ class InstrLocation:
             position.end_col_offset,
         )
 
+    @classmethod
+    def unchecked(
+        cls,
+        lineno: Optional[int],
+        end_lineno: Optional[int],
+        col_offset: Optional[int],
+        end_col_offset: Optional[int],
+    ) -> "InstrLocation":
+        """Create a location without validating it.
+
+        This is meant for positions provided by the interpreter (such as the
+        ones of code.co_positions()) which are known to be valid.
+
+        """
+        location = object.__new__(cls)
+        object.__setattr__(location, "lineno", lineno)
+        object.__setattr__(location, "end_lineno", end_lineno)
+        object.__setattr__(location, "col_offset", col_offset)
+        object.__setattr__(location, "end_col_offset", end_col_offset)
+        return location
+
+    def __reduce__(self):
+        # The default implementation cannot set the attributes of a frozen class
+        return (
+            InstrLocation.unchecked,
+            (self.lineno, self.end_lineno, self.col_offset, self.end_col_offset),
+        )
+
+
+# Locations are immutable and consecutive instructions very often share the
+# same positions, so the locations created from the positions provided by the
+# interpreter are interned. The table is bounded by simply clearing it when full.
+_MAX_INTERNED_LOCATIONS = 4096
+_interned_locations: Dict[
+    Tuple[Optional[int], Optional[int], Optional[int], Optional[int]], InstrLocation
+] = {}
+
+
+def _intern_location(
+    positions: Tuple[Optional[int], Optional[int], Optional[int], Optional[int]],
+) -> InstrLocation:
+    """Get a shared location for valid positions provided by the interpreter."""
+    try:
+        return _interned_locations[positions]
+    except KeyError:
+        pass
+    if len(_interned_locations) >= _MAX_INTERNED_LOCATIONS:
+        _interned_locations.clear()
+    location = _interned_locations[positions] = InstrLocation.unchecked(*positions)
+    return location
+
 
 class SetLineno:
     __slots__ = ("_lineno",)
@@ -556,7 +810,7 @@ A = TypeVar("A", bound=object)
 class BaseInstr(Generic[A]):
     """Abstract instruction."""
 
-    __slots__ = ("_arg", "_location", "_name", "_opcode")
+    __slots__ = ("_arg", "_location", "_modified", "_name", "_opcode")
 
     # Work around an issue with the default value of arg
     def __init__(
@@ -575,6 +829,33 @@ class BaseInstr(Generic[A]):
         else:
             self._location = InstrLocation(lineno, None, None, None)
 
+    @classmethod
+    def unchecked(
+        cls: Type[T],
+        name: str,
+        arg: A = UNSET,  # type: ignore
+        *,
+        lineno: Union[int, _UNSET, None] = UNSET,
+        location: Optional[InstrLocation] = None,
+    ) -> T:
+        """Create an instruction without validating its name and argument.
+
+        This is meant for code emitting large amounts of instructions which are
+        known to be valid. Passing an invalid argument results in undefined
+        behavior when the instruction is later used. Instrumented and pseudo
+        opcodes are still rejected since they have no properties.
+
+        """
+        opcode = _opcode.opmap[name]
+        if opcode >= MIN_INSTRUMENTED_OPCODE:
+            raise ValueError(
+                f"operation {name} is an instrumented or pseudo opcode. "
+                "Only base opcodes are supported"
+            )
+        if not location and lineno is not UNSET:
+            location = InstrLocation(lineno, None, None, None)
+        return cls._from_opcode(opcode, arg, location)
+
     # Work around an issue with the default value of arg
     def set(self, name: str, arg: A = UNSET) -> None:  # type: ignore
         """Modify the instruction in-place.
@@ -586,7 +867,7 @@ class BaseInstr(Generic[A]):
 
     def require_arg(self) -> bool:
         """Does the instruction require an argument?"""
-        return opcode_has_argument(self._opcode)
+        return bool(_OPCODE_PROPERTIES[self._opcode] & _HAS_ARG)
 
     @property
     def name(self) -> str:
@@ -643,6 +924,7 @@ class BaseInstr(Generic[A]):
             self._location = None
         else:
             self._location = InstrLocation(lineno, None, None, None)
+        self._modified = True
 
     @property
     def location(self) -> Optional[InstrLocation]:
@@ -655,91 +937,45 @@ class BaseInstr(Generic[A]):
                 "The instr location must be an instance of InstrLocation or None."
             )
         self._location = location
+        self._modified = True
 
     def stack_effect(self, jump: Optional[bool] = None) -> int:
-        if not self.require_arg():
-            arg = None
-        # 3.11 where LOAD_GLOBAL arg encode whether or we push a null
-        # 3.12 does the same for LOAD_ATTR
-        elif self._opcode in BITFLAG_OPCODES and isinstance(self._arg, tuple):
-            assert len(self._arg) == 2
-            arg = self._arg[0]
-        # 3.12 does a similar trick for LOAD_SUPER_ATTR
-        elif self._opcode in BITFLAG2_OPCODES and isinstance(self._arg, tuple):
-            assert len(self._arg) == 3
-            arg = self._arg[0]
-        elif not isinstance(self._arg, int) or self._opcode in _opcode.hasconst:
-            # Argument is either a non-integer or an integer constant,
-            # not oparg.
-            arg = 0
-        else:
-            arg = self._arg
-
-        return dis.stack_effect(self._opcode, arg, jump=jump)
+        return dis.stack_effect(self._opcode, self._stack_effect_arg(), jump=jump)
 
     def pre_and_post_stack_effect(self, jump: Optional[bool] = None) -> Tuple[int, int]:
         # Allow to check that execution will not cause a stack underflow
-        _effect = self.stack_effect(jump=jump)
-
-        n = self.name
-        if n in STATIC_STACK_EFFECTS:
-            return STATIC_STACK_EFFECTS[n]
-        elif n in DYNAMIC_STACK_EFFECTS:
-            return DYNAMIC_STACK_EFFECTS[n](_effect, self.arg, jump)
-        else:
-            # For instruction with no special value we simply consider the effect apply
-            # before execution
-            return (_effect, 0)
+        return opcode_pre_and_post_stack_effect(
+            self._opcode, self._stack_effect_arg(), jump
+        )
 
     def copy(self: T) -> T:
-        return self.__class__(self._name, self._arg, location=self._location)
+        return self._from_opcode(self._opcode, self._arg, self._location)
 
     def has_jump(self) -> bool:
-        return self._has_jump(self._opcode)
+        return bool(_OPCODE_PROPERTIES[self._opcode] & _HAS_JUMP)
 
     def is_cond_jump(self) -> bool:
         """Is a conditional jump?"""
-        # Ex: POP_JUMP_IF_TRUE, JUMP_IF_FALSE_OR_POP
-        # IN 3.11+ the JUMP and the IF are no necessary adjacent in the name.
-        name = self._name
-        return "JUMP_" in name and "IF_" in name
+        return bool(_OPCODE_PROPERTIES[self._opcode] & _COND_JUMP)
 
     def is_uncond_jump(self) -> bool:
         """Is an unconditional jump?"""
-        # JUMP_BACKWARD has been introduced in 3.11+
-        # JUMP_ABSOLUTE was removed in 3.11+
-        return self.name in {
-            "JUMP_FORWARD",
-            "JUMP_ABSOLUTE",
-            "JUMP_BACKWARD",
-            "JUMP_BACKWARD_NO_INTERRUPT",
-        }
+        return bool(_OPCODE_PROPERTIES[self._opcode] & _UNCOND_JUMP)
 
     def is_abs_jump(self) -> bool:
         """Is an absolute jump."""
-        return self._opcode in HASJABS
+        return bool(_OPCODE_PROPERTIES[self._opcode] & _ABS_JUMP)
 
     def is_forward_rel_jump(self) -> bool:
         """Is a forward relative jump."""
-        return self._opcode in HASJREL and "BACKWARD" not in self._name
+        return bool(_OPCODE_PROPERTIES[self._opcode] & _FORWARD_JUMP)
 
     def is_backward_rel_jump(self) -> bool:
         """Is a backward relative jump."""
-        return self._opcode in HASJREL and "BACKWARD" in self._name
+        return bool(_OPCODE_PROPERTIES[self._opcode] & _BACKWARD_JUMP)
 
     def is_final(self) -> bool:
-        if self._name in {
-            "RETURN_VALUE",
-            "RETURN_CONST",
-            "RAISE_VARARGS",
-            "RERAISE",
-            "BREAK_LOOP",
-            "CONTINUE_LOOP",
-        }:
-            return True
-        if self.is_uncond_jump():
-            return True
-        return False
+        return bool(_OPCODE_PROPERTIES[self._opcode] & _FINAL)
 
     def __repr__(self) -> str:
         if self._arg is not UNSET:
@@ -762,6 +998,31 @@ class BaseInstr(Generic[A]):
 
     _arg: A
 
+    # Set when the instruction is modified through its public API. Used to detect
+    # whether a bytecode object still matches the code object it was created from.
+    _modified: bool
+
+    @classmethod
+    def _from_opcode(
+        cls: Type[T], opcode: int, arg: A, location: Optional[InstrLocation]
+    ) -> T:
+        """Create an instruction from an opcode and an already validated argument.
+
+        Used by the conversions between the different bytecode representations
+        to avoid validating again instructions which are known to be valid.
+
+        """
+        instr = cls.__new__(cls)
+        instr._init_unchecked(_opcode.opname[opcode], opcode, arg)
+        instr._location = location
+        return instr
+
+    def _init_unchecked(self, name: str, opcode: int, arg: A) -> None:
+        self._name = name
+        self._opcode = opcode
+        self._arg = arg
+        self._modified = False
+
     def _set(self, name: str, arg: A) -> None:
         if not isinstance(name, str):
             raise TypeError("operation name must be a str")
@@ -781,10 +1042,35 @@ class BaseInstr(Generic[A]):
         self._name = name
         self._opcode = opcode
         self._arg = arg
+        self._modified = True
+
+    def _stack_effect_arg(self) -> Optional[int]:
+        """Argument to use to compute the stack effect of the instruction."""
+        opcode = self._opcode
+        props = _OPCODE_PROPERTIES[opcode]
+        if not props & _HAS_ARG:
+            return None
+
+        arg = self._arg
+        if isinstance(arg, int):
+            # An integer constant is not an oparg.
+            return 0 if props & _HAS_CONST else arg
+        # 3.11 where LOAD_GLOBAL arg encode whether or we push a null
+        # 3.12 does the same for LOAD_ATTR
+        elif opcode in BITFLAG_OPCODES and isinstance(arg, tuple):
+            assert len(arg) == 2
+            return arg[0]
+        # 3.12 does a similar trick for LOAD_SUPER_ATTR
+        elif opcode in BITFLAG2_OPCODES and isinstance(arg, tuple):
+            assert len(arg) == 3
+            return arg[0]
+        else:
+            # Argument is a non-integer, not oparg.
+            return 0
 
     @staticmethod
     def _has_jump(opcode) -> bool:
-        return opcode in _opcode.hasjrel or opcode in _opcode.hasjabs
+        return bool(_OPCODE_PROPERTIES[opcode] & _HAS_JUMP)
 
     @abstractmethod
     def _check_arg(self, name: str, opcode: int, arg: A) -> None:
@@ -809,9 +1095,25 @@ InstrArg = Union[
 ]
 
 
+def _unpickle_code_instr(
+    cls: Type["Instr"], opcode: int, data: bytes, location: Optional[InstrLocation]
+) -> "Instr":
+    return cls._from_opcode(opcode, _loads(data), location)
+
+
 class Instr(BaseInstr[InstrArg]):
     __slots__ = ()
 
+    def __reduce__(self):
+        arg = self._arg
+        if isinstance(arg, types.CodeType):
+            # Code objects cannot be pickled, unlike their marshalled form
+            return (
+                _unpickle_code_instr,
+                (type(self), self._opcode, _dumps(arg), self._location),
+            )
+        return (type(self)._from_opcode, (self._opcode, arg, self._location))
+
     def _cmp_key(self) -> Tuple[Optional[InstrLocation], str, Any]:
         arg: Any = self._arg
         if self._opcode in _opcode.hasconst:
@@ -0,0 +1,393 @@
+import argparse
+import compileall
+import hashlib
+import importlib
+import json
+import marshal
+import os
+import sys
+from importlib.util import MAGIC_NUMBER, cache_from_source, source_from_cache
+from types import CodeType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from bytecode.transform import BulkTransformer
+from bytecode.version import __version__
+
+#: Name of the file storing, at the root of each rewritten directory (or in the
+#: directory of each rewritten file), the state of the files after they were
+#: rewritten so that unchanged files are skipped.
+MANIFEST_NAME = ".bytecode-rewrite.json"
+
+# pyc files start with a header made of the magic number, some flags and the
+# mtime and size or the hash of the source. The header describes the source and
+# is kept as is when rewriting a pyc file.
+_HEADER_SIZE = 16
+
+
+# Constant added to the module code of rewritten files, along with the import
+# path of the transformer, so that they are not transformed again.
+_REWRITTEN_MARKER = "bytecode rewrite"
+
+
+def _get_rewriter(code: CodeType) -> Optional[str]:
+    """Import path of the transformer which rewrote a module, if any."""
+    for const in code.co_consts:
+        if type(const) is tuple and len(const) == 2 and const[0] == _REWRITTEN_MARKER:
+            return const[1]
+    return None
+
+
+def _mark_rewritten(code: CodeType, transformer_path: str) -> CodeType:
+    marker = (_REWRITTEN_MARKER, transformer_path)
+    return code.replace(co_consts=(*code.co_consts, marker))
+
+
+def _find_source(path: str) -> Optional[str]:
+    try:
+        source_path = source_from_cache(path)
+    except ValueError:
+        # Legacy .pyc file stored next to its source
+        source_path = path[:-1]
+    return source_path if os.path.isfile(source_path) else None
+
+
+def _compile_source(source_path: str, path: str, filename: str) -> CodeType:
+    # Match the optimization level of the .pyc file (name.tag.opt-N.pyc)
+    name = os.path.basename(path)
+    optimize = 2 if ".opt-2." in name else 1 if ".opt-1." in name else 0
+    with open(source_path, "rb") as f:
+        source = f.read()
+    return compile(source, filename, "exec", dont_inherit=True, optimize=optimize)
+
+
+def _split_transformer_path(path: str) -> Tuple[str, str]:
+    module_name, sep, qualname = path.partition(":")
+    if not sep:
+        module_name, _, qualname = path.rpartition(".")
+    if not module_name or not qualname:
+        raise ValueError(
+            "invalid transformer %r, expected module:function or module.function" % path
+        )
+    return module_name, qualname
+
+
+def _load_transformer(path: str) -> Callable[[CodeType], CodeType]:
+    module_name, qualname = _split_transformer_path(path)
+    transformer: Any = importlib.import_module(module_name)
+    for name in qualname.split("."):
+        transformer = getattr(transformer, name)
+    if not callable(transformer):
+        raise TypeError("transformer %r is not callable" % path)
+    return transformer
+
+
+def _get_modules_hash(
+    transformer: Callable[[CodeType], CodeType], transformer_path: str
+) -> str:
+    # Hash of the module given in the import path of the transformer and of the
+    # module defining it, so that files are rewritten again when its
+    # implementation changes
+    module_names = [_split_transformer_path(transformer_path)[0]]
+    defining_module = getattr(transformer, "__module__", None)
+    if defining_module and defining_module not in module_names:
+        module_names.append(defining_module)
+    digest = hashlib.sha256()
+    for module_name in module_names:
+        filename = getattr(sys.modules.get(module_name), "__file__", None)
+        if filename is None:
+            continue
+        try:
+            with open(filename, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            continue
+    return digest.hexdigest()
+
+
+def _iter_pyc_files(directory: str) -> Iterator[str]:
+    # __pycache__ directories can contain files compiled by other interpreters
+    tag = ".%s." % sys.implementation.cache_tag
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        in_pycache = os.path.basename(root) == "__pycache__"
+        for filename in sorted(files):
+            if filename.endswith(".pyc") and (not in_pycache or tag in filename):
+                yield os.path.join(root, filename)
+
+
+def _read_pyc(path: str) -> Tuple[bytes, CodeType]:
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != MAGIC_NUMBER:
+        raise ValueError("bad magic number, compiled by another Python version")
+    code = marshal.loads(memoryview(data)[_HEADER_SIZE:])
+    if not isinstance(code, CodeType):
+        raise ValueError("does not contain a code object")
+    return data[:_HEADER_SIZE], code
+
+
+def _write_pyc(path: str, data: bytes) -> None:
+    tmp_path = "%s.%s.tmp" % (path, os.getpid())
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _get_state(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _get_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class _Manifest:
+    """State of the files of a directory after they were rewritten.
+
+    A partial manifest records files given individually: the entries of the
+    other files of the directory are kept when it is saved.
+
+    """
+
+    def __init__(
+        self, directory: str, key: List[str], force: bool, partial: bool = False
+    ) -> None:
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.key = key
+        self.force = force
+        self.partial = partial
+        #: Mtime, size and hash of each file, indexed by relative path.
+        self.files: Dict[str, List[Any]] = {}
+        #: Entries of the files found while rewriting the directory.
+        self.new_files: Dict[str, List[Any]] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return
+        # Files rewritten by another transformer or interpreter are rewritten
+        if isinstance(content, dict) and content.get("key") == key:
+            self.files = content.get("files", {})
+
+    def is_unchanged(self, name: str, path: str) -> bool:
+        entry = self.files.get(name)
+        if entry is None or self.force:
+            return False
+        state = _get_state(path)
+        if entry[:2] != state:
+            # The file may have been touched without being modified
+            with open(path, "rb") as f:
+                if _get_hash(f.read()) != entry[2]:
+                    return False
+            entry = [*state, entry[2]]
+        self.new_files[name] = entry
+        return True
+
+    def add(self, name: str, path: str, data: bytes) -> None:
+        self.new_files[name] = [*_get_state(path), _get_hash(data)]
+
+    def save(self) -> None:
+        files = {**self.files, **self.new_files} if self.partial else self.new_files
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"key": self.key, "files": files}, f, sort_keys=True)
+
+
+def _rewrite(
+    paths: Sequence[str],
+    transformer: Callable[[CodeType], CodeType],
+    transformer_path: str,
+    *,
+    jobs: Optional[int] = None,
+    compile_sources: bool = False,
+    force: bool = False,
+    quiet: bool = False,
+    transformer_version: str = "",
+) -> int:
+    key = [
+        MAGIC_NUMBER.hex(),
+        __version__,
+        transformer_path,
+        transformer_version,
+        _get_modules_hash(transformer, transformer_path),
+    ]
+
+    # Collect the files to rewrite along with the manifest recording them.
+    # Files given individually are recorded in a manifest in their directory.
+    files: List[Tuple[str, _Manifest, str]] = []
+    manifests: List[_Manifest] = []
+    file_manifests: Dict[str, _Manifest] = {}
+    for path in paths:
+        if os.path.isdir(path):
+            if compile_sources:
+                compileall.compile_dir(path, quiet=1, workers=jobs or 0)
+            manifest = _Manifest(path, key, force)
+            manifests.append(manifest)
+            for pyc_path in _iter_pyc_files(path):
+                files.append((pyc_path, manifest, os.path.relpath(pyc_path, path)))
+        else:
+            if path.endswith(".py"):
+                if compile_sources:
+                    compileall.compile_file(path, quiet=1)
+                path = cache_from_source(path)
+            directory, name = os.path.split(os.path.abspath(path))
+            manifest = file_manifests.get(directory)
+            if manifest is None:
+                manifest = _Manifest(directory, key, force, partial=True)
+                file_manifests[directory] = manifest
+                manifests.append(manifest)
+            files.append((path, manifest, name))
+
+    pending: List[Tuple[str, _Manifest, str, bytes, CodeType]] = []
+    rewritten = skipped = failed = 0
+    for path, manifest, name in files:
+        try:
+            if manifest.is_unchanged(name, path):
+                skipped += 1
+                continue
+            header, code = _read_pyc(path)
+            rewriter = _get_rewriter(code)
+            if rewriter is not None:
+                # Transform the original code rather than the rewritten one
+                source_path = _find_source(path)
+                if source_path is not None:
+                    code = _compile_source(source_path, path, code.co_filename)
+                elif rewriter == transformer_path:
+                    skipped += 1
+                    continue
+                else:
+                    raise ValueError(
+                        "already rewritten by %s and the source was not found"
+                        % rewriter
+                    )
+        except (OSError, ValueError, EOFError, TypeError, SyntaxError) as exc:
+            print("%s: %s" % (path, exc), file=sys.stderr)
+            failed += 1
+            continue
+        pending.append((path, manifest, name, header, code))
+
+    if pending:
+        bulk_transformer = BulkTransformer(transformer, max_workers=jobs)
+        new_codes = bulk_transformer.transform(
+            [item[4] for item in pending], return_exceptions=True
+        )
+        for (path, manifest, name, header, _), new_code in zip(pending, new_codes):
+            if isinstance(new_code, Exception):
+                print(
+                    "%s: transformer failed: %s: %s"
+                    % (path, type(new_code).__name__, new_code),
+                    file=sys.stderr,
+                )
+                failed += 1
+                continue
+            new_code = _mark_rewritten(new_code, transformer_path)
+            data = header + marshal.dumps(new_code)
+            try:
+                _write_pyc(path, data)
+            except OSError as exc:
+                print("%s: %s" % (path, exc), file=sys.stderr)
+                failed += 1
+                continue
+            rewritten += 1
+            manifest.add(name, path, data)
+
+        if not quiet:
+            for pid, stats in sorted(bulk_transformer.workers.items()):
+                print(
+                    "worker %d: %d code objects in %.2f s (%.0f code objects/s)"
+                    % (pid, stats.code_objects, stats.duration, stats.throughput)
+                )
+
+    for manifest in manifests:
+        try:
+            manifest.save()
+        except OSError as exc:
+            print("%s: %s" % (manifest.path, exc), file=sys.stderr)
+            failed += 1
+
+    if not quiet:
+        print(
+            "%d files rewritten, %d unchanged files skipped, %d failures"
+            % (rewritten, skipped, failed)
+        )
+    return 1 if failed else 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m bytecode", description="Tools working on Python bytecode."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rewrite = subparsers.add_parser(
+        "rewrite",
+        help="rewrite compiled Python files using a code transformer",
+        description=(
+            "Rewrite compiled Python files (.pyc) by applying a code transformer "
+            "to each code object they contain, including nested code objects. "
+            "Files which did not change since they were last rewritten by the "
+            "same transformer are skipped, based on their mtime and hash "
+            "recorded in a %s file at the root of each directory, or in the "
+            "directory of each file given individually." % MANIFEST_NAME
+        ),
+    )
+    rewrite.add_argument(
+        "transformer",
+        help="import path of the transformer, a picklable callable taking and "
+        "returning a code object, as module:function",
+    )
+    rewrite.add_argument(
+        "paths",
+        nargs="+",
+        metavar="path",
+        help="directory searched recursively for .pyc files, .pyc file or "
+        "Python source whose cached .pyc file is rewritten",
+    )
+    rewrite.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    rewrite.add_argument(
+        "--compile",
+        action="store_true",
+        help="compile the Python sources with compileall before rewriting",
+    )
+    rewrite.add_argument(
+        "--transformer-version",
+        default="",
+        help="version of the transformer, to change whenever its behavior "
+        "changes without its module being modified so that all the files are "
+        "rewritten again",
+    )
+    rewrite.add_argument(
+        "--force",
+        action="store_true",
+        help="rewrite all the files, including unchanged ones",
+    )
+    rewrite.add_argument("-q", "--quiet", action="store_true")
+
+    args = parser.parse_args(argv)
+    try:
+        transformer = _load_transformer(args.transformer)
+    except (ImportError, AttributeError, TypeError, ValueError) as exc:
+        rewrite.error(str(exc))
+    return _rewrite(
+        args.paths,
+        transformer,
+        args.transformer,
+        jobs=args.jobs,
+        compile_sources=args.compile,
+        force=args.force,
+        quiet=args.quiet,
+        transformer_version=args.transformer_version,
+    )
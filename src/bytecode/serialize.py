@@ -0,0 +1,352 @@
+import marshal
+import sys
+from array import array
+from importlib.util import MAGIC_NUMBER
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import bytecode as _bytecode
+from bytecode.flags import CompilerFlags
+from bytecode.instr import (
+    DUAL_ARG_OPCODES,
+    UNSET,
+    BinaryOp,
+    CellVar,
+    Compare,
+    FreeVar,
+    Instr,
+    InstrLocation,
+    Intrinsic1Op,
+    Intrinsic2Op,
+    Label,
+    SetLineno,
+    TryBegin,
+    TryEnd,
+)
+
+# The serialized data starts with a header identifying the format, the kind of
+# object serialized and the interpreter, since opcodes differ between Python
+# versions. The rest of the data is marshalled.
+_FORMAT = b"BCS\x01"
+_BYTECODE = b"B"
+_CFG = b"C"
+_HEADER_SIZE = len(_FORMAT) + 1 + len(MAGIC_NUMBER)
+
+# Each item is encoded as a 16-bit code: the opcode of an instruction in the
+# lowest byte and the kind of its argument or of the pseudo instruction in the
+# highest byte. Data of the items is stored in a separate list of arguments.
+_NO_ARG = 0
+_VALUE_ARG = 1
+_TARGET_ARG = 2
+_PAIR_ARG = 3
+_CELL_ARG = 4
+_FREE_ARG = 5
+_COMPARE_ARG = 6
+_BINARY_OP_ARG = 7
+_INTRINSIC_1_ARG = 8
+_INTRINSIC_2_ARG = 9
+_LABEL = 12
+_TRY_BEGIN = 13
+_TRY_END = 14
+_SET_LINENO = 15
+
+# Arguments of these types are stored as their name or value and recreated by
+# calling their type.
+_ARG_TAGS: Dict[type, int] = {
+    CellVar: _CELL_ARG,
+    FreeVar: _FREE_ARG,
+    Compare: _COMPARE_ARG,
+    BinaryOp: _BINARY_OP_ARG,
+    Intrinsic1Op: _INTRINSIC_1_ARG,
+    Intrinsic2Op: _INTRINSIC_2_ARG,
+}
+_ARG_TYPES: List[Any] = [None] * (_INTRINSIC_2_ARG + 1)
+for _type, _tag in _ARG_TAGS.items():
+    _ARG_TYPES[_tag] = _type
+
+_Items = Sequence[Union[Instr, Label, TryBegin, TryEnd, SetLineno]]
+
+
+def _to_little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode, data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _dump_var(var: Union[str, CellVar, FreeVar]) -> Any:
+    if isinstance(var, str):
+        return var
+    return (_ARG_TAGS[type(var)], var.name)
+
+
+def _load_var(var: Any) -> Union[str, CellVar, FreeVar]:
+    if isinstance(var, str):
+        return var
+    return _ARG_TYPES[var[0]](var[1])
+
+
+def _dump_attrs(bytecode: "_bytecode.BaseBytecode") -> Tuple[Any, ...]:
+    docstring = bytecode.docstring
+    return (
+        bytecode.argcount,
+        bytecode.posonlyargcount,
+        bytecode.kwonlyargcount,
+        int(bytecode.flags),
+        bytecode.first_lineno,
+        bytecode.name,
+        bytecode.qualname,
+        bytecode.filename,
+        () if docstring is UNSET else (docstring,),
+        tuple(bytecode.cellvars),
+        tuple(bytecode.freevars),
+        tuple(bytecode.argnames),  # type: ignore
+    )
+
+
+def _load_attrs(bytecode: "_bytecode.BaseBytecode", attrs: Tuple[Any, ...]) -> None:
+    (
+        bytecode.argcount,
+        bytecode.posonlyargcount,
+        bytecode.kwonlyargcount,
+        flags,
+        bytecode.first_lineno,
+        bytecode.name,
+        bytecode.qualname,
+        bytecode.filename,
+        docstring,
+        cellvars,
+        freevars,
+        argnames,
+    ) = attrs
+    bytecode.flags = CompilerFlags(flags)
+    if docstring:
+        bytecode.docstring = docstring[0]
+    bytecode.cellvars = list(cellvars)
+    bytecode.freevars = list(freevars)
+    bytecode.argnames = list(argnames)  # type: ignore
+
+
+def _dump_items(
+    items: _Items, target_type: type, get_target: Callable[[Any], int]
+) -> Tuple[Any, ...]:
+    codes = array("H")
+    args: List[Any] = []
+    location_indexes = array("I")
+    locations: Dict[Optional[InstrLocation], int] = {None: 0}
+    try_begins: Dict[TryBegin, int] = {}
+    try_begin_list: List[TryBegin] = []
+
+    def get_try_begin(try_begin: TryBegin) -> int:
+        index = try_begins.get(try_begin)
+        if index is None:
+            index = try_begins[try_begin] = len(try_begin_list)
+            try_begin_list.append(try_begin)
+        return index
+
+    for item in items:
+        if isinstance(item, Instr):
+            opcode = item._opcode
+            arg = item._arg
+            if arg is UNSET:
+                tag = _NO_ARG
+            else:
+                tag = _ARG_TAGS.get(type(arg), _VALUE_ARG)
+                if tag != _VALUE_ARG:
+                    arg = arg.name if tag <= _FREE_ARG else arg.value
+                elif isinstance(arg, target_type):
+                    tag = _TARGET_ARG
+                    arg = get_target(arg)
+                elif opcode in DUAL_ARG_OPCODES:
+                    tag = _PAIR_ARG
+                    arg = tuple(_dump_var(var) for var in arg)
+                args.append(arg)
+            codes.append((tag << 8) | opcode)
+
+            location = item._location
+            location_index = locations.get(location)
+            if location_index is None:
+                location_index = locations[location] = len(locations)
+            location_indexes.append(location_index)
+        elif isinstance(item, Label):
+            codes.append(_LABEL << 8)
+            args.append(get_target(item))
+        elif isinstance(item, TryBegin):
+            codes.append(_TRY_BEGIN << 8)
+            args.append(get_try_begin(item))
+        elif isinstance(item, TryEnd):
+            codes.append(_TRY_END << 8)
+            args.append(get_try_begin(item.entry))
+        elif isinstance(item, SetLineno):
+            codes.append(_SET_LINENO << 8)
+            args.append(item.lineno)
+        else:
+            raise ValueError("cannot serialize %s objects" % type(item).__name__)
+
+    # Targets of the TryBegin are only resolved now since a TryEnd can refer
+    # to a TryBegin which was not encountered yet.
+    try_begin_data = tuple(
+        (
+            get_target(try_begin.target),
+            try_begin.push_lasti,
+            -1 if try_begin.stack_depth is UNSET else try_begin.stack_depth,
+        )
+        for try_begin in try_begin_list
+    )
+    typecode = "H" if len(locations) <= 0xFFFF else "I"
+    return (
+        _to_little_endian(codes),
+        tuple(args),
+        typecode,
+        _to_little_endian(array(typecode, location_indexes)),
+        _to_little_endian(
+            array(
+                "i",
+                [
+                    -1 if value is None else value
+                    for loc in locations
+                    if loc is not None
+                    for value in (
+                        loc.lineno,
+                        loc.end_lineno,
+                        loc.col_offset,
+                        loc.end_col_offset,
+                    )
+                ],
+            )
+        ),
+        try_begin_data,
+    )
+
+
+def _load_items(data: Tuple[Any, ...], targets: List[Any]) -> List[Any]:
+    codes, args, typecode, location_indexes, locations, try_begin_data = data
+    positions = [
+        None if value < 0 else value for value in _from_little_endian("i", locations)
+    ]
+    location_table: List[Optional[InstrLocation]] = [None]
+    location_table.extend(
+        InstrLocation.unchecked(*positions[index : index + 4])
+        for index in range(0, len(positions), 4)
+    )
+    try_begins = [
+        TryBegin(targets[target], push_lasti, UNSET if stack_depth < 0 else stack_depth)
+        for target, push_lasti, stack_depth in try_begin_data
+    ]
+
+    from_opcode = Instr._from_opcode
+    next_arg = iter(args).__next__
+    next_location = iter(_from_little_endian(typecode, location_indexes)).__next__
+    items: List[Any] = []
+    append = items.append
+    for code in _from_little_endian("H", codes):
+        tag = code >> 8
+        if tag < _LABEL:
+            if tag == _NO_ARG:
+                arg = UNSET
+            elif tag == _VALUE_ARG:
+                arg = next_arg()
+            elif tag == _TARGET_ARG:
+                arg = targets[next_arg()]
+            elif tag == _PAIR_ARG:
+                arg = tuple(_load_var(var) for var in next_arg())
+            else:
+                arg = _ARG_TYPES[tag](next_arg())
+            append(from_opcode(code & 0xFF, arg, location_table[next_location()]))
+        elif tag == _LABEL:
+            append(targets[next_arg()])
+        elif tag == _TRY_BEGIN:
+            append(try_begins[next_arg()])
+        elif tag == _TRY_END:
+            append(TryEnd(try_begins[next_arg()]))
+        else:
+            append(SetLineno(next_arg()))
+    return items
+
+
+def _dump(kind: bytes, data: Tuple[Any, ...]) -> bytes:
+    return _FORMAT + kind + MAGIC_NUMBER + marshal.dumps(data)
+
+
+def _load(kind: bytes, data: bytes) -> Tuple[Any, ...]:
+    header = _FORMAT + kind + MAGIC_NUMBER
+    if data[:_HEADER_SIZE] != header:
+        if data[: len(_FORMAT)] != _FORMAT:
+            raise ValueError("not a serialized bytecode")
+        if data[len(_FORMAT) : len(_FORMAT) + 1] != kind:
+            raise ValueError("serialized object of another type")
+        raise ValueError("bytecode serialized by another Python version")
+    return marshal.loads(memoryview(data)[_HEADER_SIZE:])
+
+
+def dump_bytecode(bytecode: "_bytecode.Bytecode") -> bytes:
+    labels: Dict[Label, int] = {}
+
+    def get_label(label: Label) -> int:
+        index = labels.get(label)
+        if index is None:
+            index = labels[label] = len(labels)
+        return index
+
+    items = _dump_items(list.__iter__(bytecode), Label, get_label)  # type: ignore
+    return _dump(_BYTECODE, (_dump_attrs(bytecode), len(labels), items))
+
+
+def load_bytecode(data: bytes) -> "_bytecode.Bytecode":
+    attrs, label_count, items = _load(_BYTECODE, data)
+    bytecode = _bytecode.Bytecode()
+    _load_attrs(bytecode, attrs)
+    list.extend(bytecode, _load_items(items, [Label() for _ in range(label_count)]))
+    return bytecode
+
+
+def dump_cfg(cfg: "_bytecode.ControlFlowGraph") -> bytes:
+    blocks = list(cfg)
+
+    def iter_items():
+        for block in blocks:
+            yield from list.__iter__(block)
+
+    items = _dump_items(
+        iter_items(),
+        _bytecode.BasicBlock,
+        cfg.get_block_index,  # type: ignore
+    )
+    block_sizes = array("I", [len(block) for block in blocks])
+    next_blocks = tuple(
+        -1 if block.next_block is None else cfg.get_block_index(block.next_block)
+        for block in blocks
+    )
+    return _dump(
+        _CFG,
+        (_dump_attrs(cfg), _to_little_endian(block_sizes), next_blocks, items),
+    )
+
+
+def load_cfg(data: bytes) -> "_bytecode.ControlFlowGraph":
+    attrs, block_sizes, next_blocks, items = _load(_CFG, data)
+    cfg = _bytecode.ControlFlowGraph()
+    _load_attrs(cfg, attrs)
+
+    blocks = [_bytecode.BasicBlock() for _ in next_blocks]
+    cfg._blocks = []
+    cfg._block_index = {}
+    for block in blocks:
+        cfg._add_block(block)
+
+    instructions = _load_items(items, blocks)
+    start = 0
+    for block, size, next_block in zip(
+        blocks, _from_little_endian("I", block_sizes), next_blocks
+    ):
+        list.extend(block, instructions[start : start + size])
+        start += size
+        if next_block >= 0:
+            block.next_block = blocks[next_block]
+    return cfg
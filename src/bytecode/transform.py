@@ -0,0 +1,156 @@
+import functools
+import marshal
+import os
+import pickle
+import time
+from dataclasses import dataclass
+from types import CodeType
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+
+def transform_code_tree(
+    code: CodeType, transformer: Callable[[CodeType], CodeType]
+) -> CodeType:
+    """Apply a transformer to a code object and all its nested code objects.
+
+    The tree of code objects is walked once and the transformer is applied
+    bottom-up: the code objects passed to the transformer already contain the
+    transformed nested code objects in their constants. Equal code objects are
+    only transformed once, and code objects whose nested code objects were left
+    unchanged by the transformer are not copied.
+
+    """
+    transformed: Dict[CodeType, CodeType] = {}
+
+    def transform(code: CodeType) -> CodeType:
+        try:
+            return transformed[code]
+        except KeyError:
+            pass
+
+        consts = code.co_consts
+        new_consts = tuple(
+            transform(const) if isinstance(const, CodeType) else const
+            for const in consts
+        )
+        if any(new is not old for new, old in zip(new_consts, consts)):
+            new_code = code.replace(co_consts=new_consts)
+        else:
+            new_code = code
+
+        result = transformed[code] = transformer(new_code)
+        return result
+
+    return transform(code)
+
+
+@dataclass
+class WorkerStats:
+    """Statistics of a worker process of a BulkTransformer."""
+
+    #: Number of code objects transformed, including nested code objects.
+    code_objects: int = 0
+
+    #: Time spent by the worker loading, transforming and dumping code objects,
+    #: in seconds.
+    duration: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Number of code objects transformed per second."""
+        return self.code_objects / self.duration if self.duration else 0.0
+
+
+# Transformer of the current worker process, set by the pool initializer so
+# that it is only pickled once per worker rather than once per code object.
+_worker_transformer: Optional[Callable[[CodeType], CodeType]] = None
+
+
+def _init_worker(transformer: Callable[[CodeType], CodeType]) -> None:
+    global _worker_transformer
+    _worker_transformer = transformer
+
+
+def _transform_marshalled(
+    data: bytes, return_exceptions: bool = False
+) -> Tuple[Union[bytes, Exception], int, int, float]:
+    start = time.perf_counter()
+    transformer = _worker_transformer
+    assert transformer is not None
+    count = 0
+
+    def counting_transformer(code: CodeType) -> CodeType:
+        nonlocal count
+        count += 1
+        return transformer(code)
+
+    result: Union[bytes, Exception]
+    try:
+        new_code = transform_code_tree(marshal.loads(data), counting_transformer)
+        result = marshal.dumps(new_code)
+    except Exception as exc:
+        if not return_exceptions:
+            raise
+        result = exc
+        try:
+            pickle.dumps(exc)
+        except Exception:
+            # The exception is sent back to the parent process
+            result = RuntimeError("%s: %s" % (type(exc).__name__, exc))
+    return result, os.getpid(), count, time.perf_counter() - start
+
+
+class BulkTransformer:
+    """Transform many code objects in a pool of worker processes.
+
+    Code objects cannot be pickled, they are sent to the workers and back in
+    their marshalled form. *transformer* must be picklable (for instance a
+    function defined at the top level of a module) and is applied to each code
+    object and its nested code objects using :func:`transform_code_tree`.
+
+    """
+
+    def __init__(
+        self,
+        transformer: Callable[[CodeType], CodeType],
+        *,
+        max_workers: Optional[int] = None,
+        chunksize: int = 1,
+    ) -> None:
+        self.transformer = transformer
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+        #: Statistics of each worker process, indexed by process identifier.
+        self.workers: Dict[int, WorkerStats] = {}
+
+    def transform(
+        self, codes: Iterable[CodeType], *, return_exceptions: bool = False
+    ) -> List[Union[CodeType, Exception]]:
+        """Transform code objects, returning the results in the same order.
+
+        If *return_exceptions* is true, an exception raised by the transformer
+        is returned in place of the code object it failed to transform rather
+        than being raised.
+
+        """
+        # Imported here since it imports multiprocessing which is slow to import
+        from concurrent.futures import ProcessPoolExecutor
+
+        new_codes: List[Union[CodeType, Exception]] = []
+        with ProcessPoolExecutor(
+            self.max_workers, initializer=_init_worker, initargs=(self.transformer,)
+        ) as executor:
+            for data, pid, count, duration in executor.map(
+                functools.partial(
+                    _transform_marshalled, return_exceptions=return_exceptions
+                ),
+                [marshal.dumps(code) for code in codes],
+                chunksize=self.chunksize,
+            ):
+                stats = self.workers.setdefault(pid, WorkerStats())
+                stats.code_objects += count
+                stats.duration += duration
+                new_codes.append(
+                    data if isinstance(data, Exception) else marshal.loads(data)
+                )
+        return new_codes
@@ -1,8 +1,10 @@
+import contextlib
 import dis
 import sys
 import textwrap
 import types
 import unittest
+from unittest import mock
 
 from bytecode import (
     UNSET,
@@ -14,6 +16,7 @@ from bytecode import (
     Instr,
     Label,
 )
+from bytecode.bytecode import BaseBytecode
 
 
 def _format_instr_list(block, labels, lineno):
@@ -125,6 +128,19 @@ def dump_bytecode(code, lineno=False):
             print()
 
 
+@contextlib.contextmanager
+def assemble_code():
+    """Assemble the code objects even if the bytecode was not modified.
+
+    to_code() returns the code object an unmodified bytecode was created from,
+    which round trip tests use as a context manager or a decorator to check
+    the assembler instead.
+
+    """
+    with mock.patch.object(BaseBytecode, "_reuse_source_code", lambda *args: None):
+        yield
+
+
 def get_code(source, *, filename="<string>", function=False):
     source = textwrap.dedent(source).strip()
     code = compile(source, filename, "exec")
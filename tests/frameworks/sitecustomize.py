@@ -7,7 +7,7 @@ from types import CodeType, ModuleType
 
 from module import BaseModuleWatchdog  # type: ignore
 
-from bytecode import Bytecode, ControlFlowGraph, Instr
+from bytecode import Bytecode, ControlFlowGraph, transform_code_tree
 
 _original_exec = exec
 
@@ -54,23 +54,27 @@ class ModuleCodeCollector(BaseModuleWatchdog):
         except ImportError:
             pass
 
-    def transform(
-        self, code: CodeType, _module: ModuleType, root: bool = True
-    ) -> CodeType:
-        # Round-trip the code object through the library
-        try:
-            start = time()
+    def transform(self, code: CodeType, _module: ModuleType) -> CodeType:
+        start = time()
+
+        # Round-trip the code object and all its nested code objects through
+        # the library
+        recompiled_code = transform_code_tree(
+            code, lambda code: self.recompile(code, _module)
+        )
+
+        self.stopwatch += time() - start
 
+        return recompiled_code
+
+    def recompile(self, code: CodeType, _module: ModuleType) -> CodeType:
+        try:
             abstract_code = Bytecode.from_code(code)
         except Exception as e:
             msg = f"Failed to convert {code} from {_module} into abstract code"
             raise BytecodeError(msg, code, e) from e
 
         try:
-            for instr in abstract_code:
-                if isinstance(instr, Instr) and isinstance(instr.arg, CodeType):
-                    instr.arg = self.transform(instr.arg, _module, root=False)
-
             cfg = ControlFlowGraph.from_bytecode(abstract_code)
 
             recompiled_code = cfg.to_code()
@@ -78,10 +82,6 @@ class ModuleCodeCollector(BaseModuleWatchdog):
             # Check we can still disassemble the code
             dis.dis(recompiled_code, file=io.StringIO())
 
-            if root:
-                # Only time the root code objects because of the recursion
-                self.stopwatch += time() - start
-
             self.count += 1
 
             return recompiled_code
@@ -6,11 +6,21 @@ import textwrap
 import types
 import unittest
 
-from bytecode import Bytecode, ConcreteInstr, FreeVar, Instr, Label, SetLineno
+from bytecode import (
+    Bytecode,
+    ConcreteInstr,
+    FreeVar,
+    Instr,
+    Label,
+    SetLineno,
+    TryBegin,
+    TryEnd,
+    get_code_reuse_count,
+)
 from bytecode.instr import BinaryOp, InstrLocation
 from bytecode.utils import PY313
 
-from . import TestCase, get_code
+from . import TestCase, assemble_code, get_code
 
 
 class BytecodeTests(TestCase):
@@ -63,6 +73,152 @@ class BytecodeTests(TestCase):
             ],
         )
 
+    def test_insert_instructions(self):
+        label = Label()
+        handler = Label()
+        try_begin = TryBegin(handler, False)
+        try_end = TryEnd(try_begin)
+        location = InstrLocation(2, 2, 0, 5)
+        code = Bytecode(
+            [
+                Instr("LOAD_NAME", "x", lineno=1),
+                Instr("JUMP_FORWARD", label, lineno=1),
+                label,
+                try_begin,
+                Instr("LOAD_CONST", 1, location=location),
+                try_end,
+                Instr("RETURN_VALUE", location=location),
+                handler,
+                Instr("RETURN_VALUE", lineno=3),
+            ]
+        )
+        probe = Instr("NOP")
+        located = Instr("NOP", lineno=5)
+
+        with self.assertRaises(IndexError):
+            code.insert_instructions({10: [probe]})
+        with self.assertRaises(IndexError):
+            code.insert_instructions({-1: [probe]})
+
+        code.insert_instructions(
+            {0: [probe], 2: [probe, located], 5: [probe], 7: [probe], 9: [probe]}
+        )
+        # Instructions are inserted after labels and pseudo instructions
+        self.assertListEqual(
+            code,
+            [
+                Instr("NOP", lineno=1),
+                Instr("LOAD_NAME", "x", lineno=1),
+                Instr("JUMP_FORWARD", label, lineno=1),
+                label,
+                try_begin,
+                Instr("NOP", location=location),
+                Instr("NOP", lineno=5),
+                Instr("LOAD_CONST", 1, location=location),
+                try_end,
+                Instr("NOP", location=location),
+                Instr("RETURN_VALUE", location=location),
+                handler,
+                Instr("NOP", lineno=3),
+                Instr("RETURN_VALUE", lineno=3),
+                Instr("NOP"),
+            ],
+        )
+        # Only instructions without a location are copied
+        self.assertIsNone(probe.location)
+        self.assertIsNot(code[0], probe)
+        self.assertIs(code[6], located)
+        self.assertIs(code[-1], probe)
+
+    def test_insert_instructions_by_line(self):
+        code = Bytecode(
+            [
+                Instr("LOAD_CONST", 1, lineno=1),
+                Instr("STORE_NAME", "x", lineno=1),
+                Instr("LOAD_NAME", "x", lineno=2),
+                Instr("STORE_NAME", "y"),
+                Instr("LOAD_CONST", None, lineno=1),
+                Instr("RETURN_VALUE", lineno=1),
+            ]
+        )
+        code.insert_instructions(
+            {1: [Instr("NOP")], 2: [Instr("NOP")], 3: [Instr("NOP")]}, by_line=True
+        )
+        self.assertListEqual(
+            code,
+            [
+                Instr("NOP", lineno=1),
+                Instr("LOAD_CONST", 1, lineno=1),
+                Instr("STORE_NAME", "x", lineno=1),
+                Instr("NOP", lineno=2),
+                Instr("LOAD_NAME", "x", lineno=2),
+                Instr("STORE_NAME", "y"),
+                Instr("NOP", lineno=1),
+                Instr("LOAD_CONST", None, lineno=1),
+                Instr("RETURN_VALUE", lineno=1),
+            ],
+        )
+
+        # Lines are the ones set by legalize
+        code = Bytecode(
+            [Instr("NOP"), SetLineno(5), Instr("NOP"), Instr("NOP", lineno=7)]
+        )
+        code.first_lineno = 3
+        code.insert_instructions(
+            {
+                3: [Instr("LOAD_CONST", 3)],
+                5: [Instr("LOAD_CONST", 5)],
+                7: [Instr("LOAD_CONST", 7)],
+            },
+            by_line=True,
+        )
+        code.legalize()
+        self.assertListEqual(
+            code,
+            [
+                Instr("LOAD_CONST", 3, lineno=3),
+                Instr("NOP", lineno=3),
+                Instr("LOAD_CONST", 5, lineno=5),
+                Instr("NOP", lineno=5),
+                Instr("NOP", lineno=5),
+            ],
+        )
+
+    def test_insert_instructions_code(self):
+        code = get_code(
+            """
+            try:
+                y = 1 // x
+            except ZeroDivisionError:
+                y = -1
+            """
+        )
+        bytecode = Bytecode.from_code(code)
+        bytecode.insert_instructions(
+            {
+                lineno: [
+                    Instr("LOAD_CONST", lineno),
+                    Instr("STORE_NAME", "line_%s" % lineno),
+                ]
+                for lineno in range(1, 5)
+            },
+            by_line=True,
+        )
+        new_code = bytecode.to_code()
+
+        namespace = {"x": 0}
+        exec(new_code, namespace)
+        self.assertEqual(namespace["y"], -1)
+        self.assertEqual(
+            sorted(name for name in namespace if name.startswith("line_")),
+            ["line_1", "line_2", "line_3", "line_4"],
+        )
+
+        namespace = {"x": 1}
+        exec(new_code, namespace)
+        self.assertEqual(namespace["y"], 1)
+        self.assertNotIn("line_3", namespace)
+
     def test_slice(self):
         code = Bytecode()
         code.first_lineno = 3
@@ -401,6 +557,73 @@ class BytecodeTests(TestCase):
         co = code.to_code(stacksize=42, compute_exception_stack_depths=False)
         self.assertEqual(co.co_stacksize, 42)
 
+    def test_to_code_unmodified(self):
+        code = get_code("x = 1; y = x + 2")
+        count = get_code_reuse_count()
+
+        bytecode = Bytecode.from_code(code)
+        self.assertIs(bytecode.to_code(), code)
+        self.assertIs(bytecode.to_code(stacksize=code.co_stacksize), code)
+        self.assertEqual(get_code_reuse_count(), count + 2)
+
+        # An explicit stack size or exception stack depths are honored
+        self.assertIsNot(bytecode.to_code(stacksize=code.co_stacksize + 1), code)
+        self.assertIsNot(
+            bytecode.to_code(
+                stacksize=code.co_stacksize, compute_exception_stack_depths=False
+            ),
+            code,
+        )
+        self.assertEqual(get_code_reuse_count(), count + 2)
+
+        # Bytecode created from scratch or copied are not tied to a code object
+        self.assertIsNot(bytecode.copy().to_code(), code)
+
+    def test_to_code_fast_mode(self):
+        def f(x):
+            try:
+                return x + 1
+            except ValueError:
+                return 0
+
+        for conserve in (True, False):
+            with self.subTest(conserve=conserve):
+                bytecode = Bytecode.from_code(
+                    f.__code__, conserve_exception_block_stackdepth=conserve
+                ).copy()
+                code = bytecode.to_code(mode="fast")
+                self.assertCodeObjectEqual(code, bytecode.to_code())
+                self.assertEqual(code.co_code, f.__code__.co_code)
+
+        with self.assertRaises(ValueError):
+            Bytecode().to_code(mode="unsafe")
+
+    def test_to_code_modified(self):
+        code = get_code("x = 1; y = x + 2")
+
+        def first_instr(bytecode):
+            return next(i for i in bytecode if isinstance(i, Instr) and i.arg == 1)
+
+        modifications = {
+            "attribute": lambda b: setattr(b, "name", "other"),
+            "flags": lambda b: setattr(b, "flags", b.flags | 0x20),
+            "cellvars": lambda b: b.cellvars.append("cell"),
+            "append": lambda b: b.insert(len(b) - 1, Instr("NOP")),
+            "slice": lambda b: b.__setitem__(slice(0, 1), [b[0].copy()]),
+            "replace": lambda b: b.__setitem__(
+                b.index(first_instr(b)), Instr("LOAD_CONST", 1)
+            ),
+            "arg": lambda b: setattr(first_instr(b), "arg", 1),
+            "location": lambda b: setattr(
+                first_instr(b), "location", InstrLocation(5, None, None, None)
+            ),
+        }
+        for name, modify in modifications.items():
+            with self.subTest(name):
+                bytecode = Bytecode.from_code(code)
+                modify(bytecode)
+                self.assertIsNot(bytecode.to_code(), code)
+
     def test_negative_size_unary(self):
         opnames = (
             "UNARY_POSITIVE",
@@ -744,6 +967,7 @@ class BytecodeTests(TestCase):
                 while callable(f := f()):
                     pass
 
+    @assemble_code()
     def test_empty_try_block(self):
         if sys.version_info < (3, 11):
             self.skipTest("Exception tables were introduced in 3.11")
@@ -773,6 +997,7 @@ class BytecodeTests(TestCase):
         # Do another round trip
         Bytecode.from_code(foo.__code__).to_code()
 
+    @assemble_code()
     def test_try_block_around_extended_arg(self):
         """Test that we can handle small try blocks around opcodes that require
         extended arguments.
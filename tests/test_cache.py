@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import functools
+import os
+import tempfile
+import textwrap
+import types
+import unittest
+
+from bytecode import Bytecode, CachingTransformer, Instr
+
+from . import TestCase
+
+
+def rename_names(code, *args):
+    # Load "y" wherever "x" is loaded
+    bytecode = Bytecode.from_code(code)
+    for instr in bytecode:
+        if isinstance(instr, Instr) and instr.name == "LOAD_NAME" and instr.arg == "x":
+            instr.arg = "y"
+    return bytecode.to_code()
+
+
+NAME = "rename_names"
+
+
+class CachingTransformerTests(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.directory = os.path.join(tmp_dir.name, "cache")
+        self.filename = os.path.join(tmp_dir.name, "module.py")
+        self.calls = 0
+
+    def transformer(self, code, *args):
+        self.calls += 1
+        return rename_names(code, *args)
+
+    def compile_module(self, source):
+        source = textwrap.dedent(source)
+        with open(self.filename, "w", encoding="utf-8") as f:
+            f.write(source)
+        return compile(source, self.filename, "exec")
+
+    def run_module(self, code):
+        namespace = {"x": 1, "y": 2}
+        exec(code, namespace)
+        return namespace["z"]
+
+    def test_module(self):
+        code = self.compile_module("z = x")
+
+        transformer = CachingTransformer(self.transformer, self.directory, name=NAME)
+        self.assertEqual(self.run_module(transformer(code, None)), 2)
+        self.assertEqual((transformer.hits, transformer.misses), (0, 1))
+
+        # A new transformer (as in a new process) uses the stored code object
+        transformer = CachingTransformer(self.transformer, self.directory, name=NAME)
+        new_code = transformer(code, None)
+        self.assertEqual(self.run_module(new_code), 2)
+        self.assertEqual(new_code.co_filename, self.filename)
+        self.assertEqual((transformer.hits, transformer.misses), (1, 0))
+        self.assertEqual(self.calls, 1)
+
+        # The source changed
+        code = self.compile_module("z = x + 1")
+        self.assertEqual(self.run_module(transformer(code, None)), 3)
+        self.assertEqual((transformer.hits, transformer.misses), (1, 1))
+        self.assertEqual(self.calls, 2)
+
+    def test_stale_code(self):
+        # The code object was compiled from an older version of the source
+        old_code = self.compile_module("z = x")
+        code = self.compile_module("z = x + 1")
+
+        transformer = CachingTransformer(self.transformer, self.directory, name=NAME)
+        self.assertEqual(self.run_module(transformer(old_code)), 2)
+        self.assertEqual(self.run_module(transformer(code)), 3)
+        self.assertEqual((transformer.hits, transformer.misses), (0, 2))
+
+    def test_transformer_version(self):
+        code = self.compile_module("z = x")
+        CachingTransformer(self.transformer, self.directory, name=NAME, version="1")(
+            code
+        )
+
+        transformer = CachingTransformer(
+            self.transformer, self.directory, name=NAME, version="2"
+        )
+        transformer(code)
+        self.assertEqual((transformer.hits, transformer.misses), (0, 1))
+
+        transformer = CachingTransformer(
+            self.transformer, self.directory, name="other", version="1"
+        )
+        transformer(code)
+        self.assertEqual((transformer.hits, transformer.misses), (0, 1))
+        self.assertEqual(self.calls, 3)
+
+    def test_code_without_source(self):
+        code = compile("z = x", "<string>", "exec")
+        transformer = CachingTransformer(self.transformer, self.directory, name=NAME)
+        transformer(code)
+        self.assertEqual(self.run_module(transformer(code)), 2)
+        self.assertEqual((transformer.hits, transformer.misses), (1, 1))
+
+        # Code objects defined on the same line are not confused
+        first, second = (
+            const
+            for const in compile(
+                "a = (lambda: x, lambda: x + 1)", "<string>", "exec"
+            ).co_consts
+            if isinstance(const, types.CodeType)
+        )
+        self.assertNotEqual(transformer.get_path(first), transformer.get_path(second))
+
+    def test_default_name(self):
+        transformer = CachingTransformer(rename_names, self.directory)
+        self.assertEqual(transformer.name, "%s.rename_names" % __name__)
+
+        # Transformers which are not identified by their qualified name
+        for func in (
+            functools.partial(rename_names),
+            lambda code: code,
+            self.transformer,
+            rename_names.__call__,
+        ):
+            with self.subTest(func=func):
+                with self.assertRaisesRegex(ValueError, "name is required"):
+                    CachingTransformer(func, self.directory)
+                CachingTransformer(func, self.directory, name="transformer")
+
+    def test_corrupted_entry(self):
+        code = self.compile_module("z = x")
+        transformer = CachingTransformer(self.transformer, self.directory, name=NAME)
+        path = transformer.get_path(code)
+        os.makedirs(self.directory)
+        for data in (b"", b"corrupted"):
+            with open(path, "wb") as f:
+                f.write(data)
+            self.assertEqual(self.run_module(transformer(code)), 2)
+            self.assertEqual(transformer.hits, 0)
+
+        self.assertEqual(self.run_module(transformer(code)), 2)
+        self.assertEqual((transformer.hits, transformer.misses), (1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()  # pragma: no cover
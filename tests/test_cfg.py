@@ -14,15 +14,17 @@ from bytecode import (
     Bytecode,
     Compare,
     ControlFlowGraph,
+    ControlFlowGraphView,
     Instr,
     Label,
     SetLineno,
     dump_bytecode,
 )
 from bytecode.concrete import OFFSET_AS_INSTRUCTION
+from bytecode.instr import UNSET, TryBegin
 from bytecode.utils import PY311, PY313
 
-from . import TestCase, disassemble as _disassemble
+from . import TestCase, assemble_code, disassemble as _disassemble
 
 
 def disassemble(
@@ -727,11 +729,47 @@ class CFGStacksizeComputationTests(TestCase):
         as_code = cfg.to_code(check_pre_and_post=False)
         self.assertCodeObjectEqual(code, as_code)
         self.assertEqual(code.co_stacksize, cfg.compute_stacksize())
+        self.assertEqual(code.co_stacksize, cfg.compute_stacksize(use_worklist=True))
+        view = ControlFlowGraphView(bytecode)
+        self.assertEqual(code.co_stacksize, view.compute_stacksize())
+        self.assertEqual(code.co_stacksize, view.compute_stacksize(use_worklist=True))
 
     def test_empty_code(self):
         cfg = ControlFlowGraph()
         del cfg[0]
         self.assertEqual(cfg.compute_stacksize(), 0)
+        self.assertEqual(cfg.compute_stack_depths(), (0, []))
+
+    def test_compute_stack_depths(self):
+        blocks = ControlFlowGraph()
+        blocks.add_block()
+        blocks.add_block()
+        blocks.add_block()
+        blocks[0].extend(
+            [
+                Instr("LOAD_NAME", "x"),
+                Instr("LOAD_NAME", "test"),
+                Instr(
+                    "POP_JUMP_FORWARD_IF_FALSE"
+                    if (3, 12) > sys.version_info >= (3, 11)
+                    else "POP_JUMP_IF_FALSE",
+                    blocks[2],
+                ),
+            ]
+        )
+        blocks[1].extend([Instr("LOAD_NAME", "y"), Instr("POP_TOP")])
+        blocks[2].append(Instr("RETURN_VALUE"))
+        blocks[3].extend([Instr("LOAD_CONST", None), Instr("RETURN_VALUE")])
+        blocks[0].next_block = blocks[1]
+        blocks[1].next_block = blocks[2]
+
+        self.assertEqual(blocks.compute_stack_depths(), (2, [0, 1, 1, None]))
+
+    def test_invalid_stacksize_worklist(self):
+        cfg = ControlFlowGraph()
+        cfg[0].append(Instr("STORE_NAME", "x"))
+        with self.assertRaises(RuntimeError):
+            cfg.compute_stacksize(use_worklist=True)
 
     def test_handling_of_set_lineno(self):
         code = Bytecode()
@@ -865,6 +903,7 @@ class CFGStacksizeComputationTests(TestCase):
 
         self.check_stack_size(test)
 
+    @assemble_code()
     def test_stack_size_computation_nested_try_except_else_finally(self):
         def test(*args, **kwargs):
             try:
@@ -900,6 +939,7 @@ class CFGStacksizeComputationTests(TestCase):
             self.assertEqual(test([], name=None), -1)
             self.assertEqual(stdout.getvalue(), "second finally\nfirst finally\n")
 
+    @assemble_code()
     def test_stack_size_with_dead_code(self):
         # Simply demonstrate more directly the previously mentioned issue.
         def test(*args):  # pragma: no cover
@@ -964,7 +1004,65 @@ class CFGStacksizeComputationTests(TestCase):
         bytecode.compute_stacksize()
 
 
+class CFGViewTests(TestCase):
+    def test_blocks(self):
+        label = Label()
+        code = Bytecode(
+            [
+                Instr("LOAD_NAME", "test"),
+                Instr(
+                    "POP_JUMP_FORWARD_IF_FALSE"
+                    if (3, 12) > sys.version_info >= (3, 11)
+                    else "POP_JUMP_IF_FALSE",
+                    label,
+                ),
+                Instr("LOAD_CONST", 5),
+                Instr("STORE_NAME", "x"),
+                label,
+                Instr("LOAD_CONST", None),
+                Instr("RETURN_VALUE"),
+                Instr("LOAD_CONST", 7),
+                Instr("RETURN_VALUE"),
+            ]
+        )
+        view = ControlFlowGraphView(code)
+        self.assertEqual(len(view), 4)
+        self.assertEqual(
+            [(block.start, block.end) for block in view],
+            [(0, 2), (2, 4), (4, 7), (7, 9)],
+        )
+        self.assertEqual(list(view[2]), list(code)[5:7])
+        self.assertIs(view[0].next_block, view[1])
+        self.assertIs(view[1].next_block, view[2])
+        self.assertIsNone(view[2].next_block)
+        self.assertIs(view[0].get_jump(), view[2])
+        self.assertIsNone(view[1].get_jump())
+        self.assertEqual(view.get_dead_blocks(), [view[1], view[3]])
+
+        # Instructions are not copied
+        self.assertIs(next(iter(view[0])), code[0])
+
+        cfg = ControlFlowGraph.from_bytecode(code)
+        self.assertEqual(view.compute_stacksize(), cfg.compute_stacksize())
+
+    def test_try_begin_not_modified(self):
+        def test():  # pragma: no cover
+            try:
+                x = 1
+            except Exception:
+                x = 2
+            return x
+
+        code = Bytecode.from_code(test.__code__)
+        view = ControlFlowGraphView(code)
+        self.assertEqual(view.compute_stacksize(), test.__code__.co_stacksize)
+        try_begins = [i for i in code if isinstance(i, TryBegin)]
+        self.assertEqual(bool(try_begins), PY311)
+        self.assertTrue(all(tb.stack_depth is UNSET for tb in try_begins))
+
+
 class CFGRoundTripTests(TestCase):
+    @assemble_code()
     def test_roundtrip_exception_handling(self):
         from . import exception_handling_cases as ehc
 
@@ -993,6 +1091,7 @@ class CFGRoundTripTests(TestCase):
                 else:
                     f()
 
+    @assemble_code()
     def test_cellvar_freevar_roundtrip(self):
         from . import cell_free_vars_cases as cfc
 
@@ -1014,6 +1113,32 @@ class CFGRoundTripTests(TestCase):
                 while callable(f := f()):
                     pass
 
+    def test_to_code_unmodified(self):
+        def f(x):
+            if x:
+                x = 2
+            return x
+
+        code = f.__code__
+        cfg = ControlFlowGraph.from_bytecode(Bytecode.from_code(code))
+        self.assertIs(cfg.to_code(), code)
+        # The stack depths computed by compute_stacksize are not modifications
+        cfg.compute_stacksize()
+        self.assertIs(cfg.to_code(), code)
+        # Conversions of an unmodified CFG are also tied to the code object
+        self.assertIs(cfg.to_bytecode().to_code(), code)
+
+        cfg.split_block(cfg[0], 1)
+        self.assertIsNot(cfg.to_code(), code)
+
+        cfg = ControlFlowGraph.from_bytecode(Bytecode.from_code(code))
+        cfg[0].next_block = None
+        self.assertIsNot(cfg.to_code(), code)
+
+        cfg = ControlFlowGraph.from_bytecode(Bytecode.from_code(code))
+        cfg.add_block()
+        self.assertIsNot(cfg.to_code(), code)
+
 
 if __name__ == "__main__":
     unittest.main()  # pragma: no cover
@@ -2,7 +2,7 @@ import unittest
 
 from bytecode import Bytecode, ConcreteBytecode, ControlFlowGraph
 
-from . import TestCase, get_code
+from . import TestCase, assemble_code, get_code
 
 
 class CodeTests(TestCase):
@@ -11,16 +11,24 @@ class CodeTests(TestCase):
     def check(self, source, function=False):
         ref_code = get_code(source, function=function)
 
-        code = ConcreteBytecode.from_code(ref_code).to_code()
-        self.assertCodeObjectEqual(ref_code, code)
+        with assemble_code():
+            code = ConcreteBytecode.from_code(ref_code).to_code()
+            self.assertCodeObjectEqual(ref_code, code)
 
-        code = Bytecode.from_code(ref_code).to_code()
-        self.assertCodeObjectEqual(ref_code, code)
+            code = Bytecode.from_code(ref_code).to_code()
+            self.assertCodeObjectEqual(ref_code, code)
 
-        bytecode = Bytecode.from_code(ref_code)
-        blocks = ControlFlowGraph.from_bytecode(bytecode)
-        code = blocks.to_bytecode().to_code()
-        self.assertCodeObjectEqual(ref_code, code)
+            bytecode = Bytecode.from_code(ref_code)
+            blocks = ControlFlowGraph.from_bytecode(bytecode)
+            code = blocks.to_bytecode().to_code()
+            self.assertCodeObjectEqual(ref_code, code)
+
+        # Unmodified bytecode objects return the code they were created from
+        self.assertIs(ConcreteBytecode.from_code(ref_code).to_code(), ref_code)
+        self.assertIs(Bytecode.from_code(ref_code).to_code(), ref_code)
+        blocks = ControlFlowGraph.from_bytecode(Bytecode.from_code(ref_code))
+        self.assertIs(blocks.to_code(), ref_code)
+        self.assertIs(blocks.to_bytecode().to_code(), ref_code)
 
     def test_loop(self):
         self.check(
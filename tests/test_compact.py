@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import unittest
+
+from bytecode import (
+    UNSET,
+    CompactConcreteBytecode,
+    ConcreteBytecode,
+    ConcreteInstr,
+    SetLineno,
+)
+from bytecode.instr import InstrLocation
+from bytecode.utils import PY311
+
+from . import TestCase, get_code
+
+
+class CompactConcreteBytecodeTests(TestCase):
+    def check_conversion(self, code):
+        concrete = ConcreteBytecode.from_code(code)
+        compact = CompactConcreteBytecode.from_code(code)
+        self.assertEqual(len(compact), len(concrete))
+        self.assertEqual([i.to_instr() for i in compact], list(concrete))
+        self.assertEqual(compact.to_concrete_bytecode(), concrete)
+        self.assertEqual(
+            CompactConcreteBytecode.from_concrete_bytecode(concrete), compact
+        )
+        return compact
+
+    def test_from_code(self):
+        def f(x, y):
+            return x / y
+
+        compact = self.check_conversion(f.__code__)
+        self.assertEqual(compact.name, "f")
+        self.assertEqual(compact.argcount, 2)
+        self.assertEqual(compact.varnames, ["x", "y"])
+
+        instr = compact[-1]
+        self.assertEqual(instr.name, "RETURN_VALUE")
+        self.assertIs(instr.arg, UNSET)
+        self.assertTrue(instr.is_final())
+        self.assertEqual(instr.lineno, f.__code__.co_firstlineno + 1)
+        with self.assertRaises(IndexError):
+            compact[len(compact)]
+
+    def test_exception_table(self):
+        def f(x, y):
+            try:
+                return x / y
+            except ZeroDivisionError:
+                return None
+
+        compact = self.check_conversion(f.__code__)
+        concrete = compact.to_concrete_bytecode()
+        self.assertEqual(
+            [repr(entry) for entry in compact.exception_table],
+            [
+                repr(entry)
+                for entry in ConcreteBytecode.from_code(f.__code__).exception_table
+            ],
+        )
+        if PY311:
+            self.assertEqual(
+                concrete._assemble_exception_table(), f.__code__.co_exceptiontable
+            )
+
+    def test_extended_args(self):
+        code = get_code("\n".join(f"x{i} = {i}" for i in range(300)))
+        compact = self.check_conversion(code)
+        extended = [i for i in compact if i.extended_args]
+        self.assertTrue(extended)
+        for instr in extended:
+            self.assertEqual(instr.size, 4)
+            self.assertEqual(instr.size, instr.to_instr().size)
+
+        compact = CompactConcreteBytecode.from_code(code, extended_arg=True)
+        self.assertEqual(
+            [i.to_instr() for i in compact],
+            list(ConcreteBytecode.from_code(code, extended_arg=True)),
+        )
+
+    def test_location(self):
+        concrete = ConcreteBytecode(
+            [
+                ConcreteInstr("LOAD_CONST", 0, location=InstrLocation(2, 2, 4, 8)),
+                ConcreteInstr("RETURN_VALUE", lineno=3),
+                ConcreteInstr("NOP"),
+            ],
+            consts=[None],
+        )
+        compact = CompactConcreteBytecode.from_concrete_bytecode(concrete)
+        self.assertEqual(
+            [i.location for i in compact],
+            [
+                InstrLocation(2, 2, 4, 8),
+                InstrLocation(3, None, None, None),
+                None,
+            ],
+        )
+        self.assertEqual([i.lineno for i in compact], [2, 3, UNSET])
+
+    def test_set_lineno(self):
+        concrete = ConcreteBytecode(
+            [
+                SetLineno(3),
+                ConcreteInstr("LOAD_CONST", 0),
+                ConcreteInstr("RETURN_VALUE"),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            CompactConcreteBytecode.from_concrete_bytecode(concrete)
+
+    def test_to_code(self):
+        code = get_code("x = 1\nif x:\n    y = 2")
+        compact = CompactConcreteBytecode.from_code(code)
+        self.assertIs(compact.to_code(), code)
+
+        compact.filename = "other.py"
+        new_code = compact.to_code()
+        self.assertIsNot(new_code, code)
+        self.assertEqual(new_code.co_code, code.co_code)
+        self.assertEqual(new_code.co_filename, "other.py")
+
+
+if __name__ == "__main__":
+    unittest.main()  # pragma: no cover
@@ -10,6 +10,7 @@ import unittest
 
 from bytecode import (
     UNSET,
+    BinaryOp,
     Bytecode,
     CellVar,
     CompilerFlags,
@@ -21,9 +22,10 @@ from bytecode import (
     SetLineno,
 )
 from bytecode.concrete import OFFSET_AS_INSTRUCTION, ExceptionTableEntry
+from bytecode.instr import MIN_INSTRUMENTED_OPCODE, opcode_has_argument
 from bytecode.utils import PY313
 
-from . import TestCase, get_code
+from . import TestCase, assemble_code, get_code
 
 
 class ConcreteInstrTests(TestCase):
@@ -129,6 +131,13 @@ class ConcreteInstrTests(TestCase):
         self.assertEqual(ConcreteInstr("LOAD_CONST", 3).size, 2)
         self.assertEqual(ConcreteInstr("LOAD_CONST", 0x1234ABCD).size, 8)
 
+    def test_unchecked(self):
+        for arg in (3, 0x1234ABCD):
+            instr = ConcreteInstr.unchecked("LOAD_CONST", arg, lineno=1)
+            self.assertEqual(instr, ConcreteInstr("LOAD_CONST", arg, lineno=1))
+            self.assertEqual(instr.size, ConcreteInstr("LOAD_CONST", arg).size)
+        self.assertEqual(ConcreteInstr.unchecked("NOP").size, 2)
+
     def test_disassemble(self):
         code = bytes((opcode.opmap["NOP"], 0, opcode.opmap["LOAD_CONST"], 3))
         instr = ConcreteInstr.disassemble(1, code, 0)
@@ -183,6 +192,20 @@ class ConcreteInstrTests(TestCase):
             bytes((opcode.EXTENDED_ARG, 0, instr.opcode, 3)),
         )
 
+    def test_use_cache_opcodes(self):
+        for name, op in opcode.opmap.items():
+            if op >= MIN_INSTRUMENTED_OPCODE:
+                continue
+            if sys.version_info >= (3, 13):
+                expected = dis._inline_cache_entries.get(name, 0)
+            elif sys.version_info >= (3, 11):
+                expected = dis._inline_cache_entries[op]
+            else:
+                expected = 0
+            with self.subTest(name):
+                instr = ConcreteInstr(name, 0 if opcode_has_argument(op) else UNSET)
+                self.assertEqual(instr.use_cache_opcodes(), expected)
+
     def test_get_jump_target(self):
         if sys.version_info < (3, 11):
             jump_abs = ConcreteInstr("JUMP_ABSOLUTE", 3)
@@ -376,6 +399,27 @@ class ConcreteBytecodeTests(TestCase):
             self.skipTest("lnotab is deprecated in Python 3.12+")
         self.assertEqual(code.co_lnotab, b"\x04\xfd")
 
+    def test_assemble_code(self):
+        # The assembled code must match the concatenation of the assembled
+        # instructions, including the EXTENDED_ARG padding.
+        code = ConcreteBytecode(
+            [
+                ConcreteInstr("NOP", extended_args=2),
+                ConcreteInstr("LOAD_CONST", 0x12345, extended_args=1),
+                ConcreteInstr("LOAD_CONST", 0x1, extended_args=3),
+                ConcreteInstr("LOAD_CONST", 0x1234567),
+                ConcreteInstr("LOAD_CONST", 0xFF, lineno=2),
+                ConcreteInstr("RETURN_VALUE"),
+            ]
+        )
+        code_str, linenos = code._assemble_code()
+        self.assertEqual(code_str, b"".join(instr.assemble() for instr in code))
+        offsets = [offset for offset, _, _, _ in linenos]
+        sizes = [size for _, size, _, _ in linenos]
+        self.assertEqual(offsets, [0, 6, 10, 18, 26, 28])
+        self.assertEqual(sizes, [6, 4, 8, 8, 2, 2])
+        self.assertEqual([lineno for _, _, lineno, _ in linenos], [1, 1, 1, 1, 2, 2])
+
     def test_extended_lnotab(self):
         # x = 7
         # 200 blank lines
@@ -726,6 +770,110 @@ class ConcreteBytecodeTests(TestCase):
         )
         self.assertInstructionListEqual(concrete, concrete.copy())
 
+    def test_patch(self):
+        def f(x):
+            return x + 1
+
+        concrete = ConcreteBytecode.from_code(f.__code__)
+        index = next(
+            i for i, instr in enumerate(concrete) if instr.name == "LOAD_CONST"
+        )
+        concrete.consts.append(2)
+        location = concrete[index].location
+        concrete.patch(index, [ConcreteInstr("LOAD_CONST", len(concrete.consts) - 1)])
+        self.assertEqual(concrete[index].location, location)
+
+        code = concrete.to_code(stacksize=f.__code__.co_stacksize, mode="fast")
+        self.assertEqual(len(code.co_code), len(f.__code__.co_code))
+        self.assertEqual(types.FunctionType(code, {})(1), 3)
+
+    def test_patch_resize(self):
+        def f(n):
+            total = 0
+            for i in range(n):
+                try:
+                    total += 10 // (i - 2)
+                except ZeroDivisionError:
+                    total += 1000
+            return total
+
+        concrete = ConcreteBytecode.from_code(f.__code__)
+        original = concrete.copy()
+        index = next(
+            i
+            for i, instr in enumerate(concrete)
+            if instr.name == "LOAD_CONST" and concrete.consts[instr.arg] == 1000
+        )
+        # Large enough for the jumps around the handler to need EXTENDED_ARG
+        nops = [ConcreteInstr("NOP") for _ in range(300)]
+        concrete.patch(index, [concrete[index], *nops])
+        self.assertEqual(len(concrete), len(original) + 300)
+
+        code = concrete.to_code(stacksize=f.__code__.co_stacksize, mode="fast")
+        self.assertGreater(len(code.co_code), 600)
+        self.assertEqual(types.FunctionType(code, globals())(6), f(6))
+        # The instructions shared with the copy are left unchanged
+        self.assertEqual(original.to_code().co_code, f.__code__.co_code)
+
+        # Remove the NOPs: the jumps keep their EXTENDED_ARG
+        concrete.patch(index + 1, [], count=300)
+        code = concrete.to_code(stacksize=f.__code__.co_stacksize, mode="fast")
+        self.assertEqual(types.FunctionType(code, globals())(6), f(6))
+
+    def test_patch_errors(self):
+        label = Label()
+        concrete = Bytecode(
+            [
+                Instr("LOAD_NAME", "x"),
+                Instr("JUMP_FORWARD", label),
+                Instr("LOAD_CONST", 1),
+                label,
+                Instr("STORE_NAME", "y"),
+                Instr("LOAD_CONST", None),
+                Instr("RETURN_VALUE"),
+            ]
+        ).to_concrete_bytecode()
+        # The jump targets the second replaced instruction
+        with self.assertRaisesRegex(ValueError, "replaced"):
+            concrete.patch(2, [ConcreteInstr("NOP")], count=2)
+        with self.assertRaises(IndexError):
+            concrete.patch(len(concrete) + 1, [])
+        with self.assertRaises(IndexError):
+            concrete.patch(len(concrete) - 1, [], count=2)
+
+    def test_patch_extended_arg(self):
+        lines = ["def f(x):", "    t = 0"]
+        lines.extend(f"    if x == {i}: t += {i}" for i in range(300))
+        code = get_code("\n".join(lines) + "\n    return t", function=True)
+        concrete = ConcreteBytecode.from_code(code, extended_arg=True)
+        self.assertIn("EXTENDED_ARG", [instr.name for instr in concrete])
+        with self.assertRaisesRegex(ValueError, "EXTENDED_ARG"):
+            concrete.patch(len(concrete), [ConcreteInstr("NOP")] * 50, count=0)
+
+        concrete = ConcreteBytecode.from_code(code)
+        with self.assertRaisesRegex(ValueError, "EXTENDED_ARG"):
+            concrete.patch(len(concrete), [ConcreteInstr("EXTENDED_ARG", 1)], count=0)
+
+    @unittest.skipIf(sys.version_info < (3, 11), "requires Python 3.11+")
+    def test_patch_caches(self):
+        def f(x):
+            return x - 1
+
+        concrete = ConcreteBytecode.from_code(f.__code__)
+        index = next(i for i, instr in enumerate(concrete) if instr.name == "BINARY_OP")
+        caches = concrete[index].use_cache_opcodes()
+        self.assertEqual(concrete[index + caches].name, "CACHE")
+        with self.assertRaises(ValueError):
+            concrete.patch(index + 1, [])
+
+        concrete.patch(index, [ConcreteInstr("BINARY_OP", BinaryOp.ADD.value)])
+        self.assertEqual(
+            [instr.name for instr in concrete[index : index + caches + 2]],
+            ["BINARY_OP", *["CACHE"] * caches, "RETURN_VALUE"],
+        )
+        code = concrete.to_code(stacksize=f.__code__.co_stacksize, mode="fast")
+        self.assertEqual(types.FunctionType(code, {})(1), 2)
+
     def test_encode_varint(self):
         self.assertListEqual(list(ConcreteBytecode._encode_varint(0)), [0])
         self.assertListEqual(list(ConcreteBytecode._encode_varint(0, True)), [128])
@@ -906,6 +1054,7 @@ class ConcreteFromCodeTests(TestCase):
 
     # Ensure that concrete._remove_extended_args can handle extended_arg NOPs that get
     # passed in from other to_code/from_code methods.
+    @assemble_code()
     def test_extended_arg_nop(self):
         constants = [None] * (0x000129 + 1)
         constants[0x000129] = "Arbitrary String"
@@ -969,6 +1118,7 @@ class ConcreteFromCodeTests(TestCase):
     # The next three tests ensure we can round trip ConcreteBytecode generated
     # with extended_args=True
 
+    @assemble_code()
     def test_extended_arg_unpack_ex(self):
         def test():
             p = [1, 2, 3, 4, 5, 6]
@@ -982,6 +1132,7 @@ class ConcreteFromCodeTests(TestCase):
         self.assertEqual(test.__code__.co_stacksize, cpython_stacksize)
         self.assertEqual(test(), (1, 2, [3, 4, 5], 6))
 
+    @assemble_code()
     def test_expected_arg_with_many_consts(self):
         def test():
             var = 0
@@ -1253,6 +1404,7 @@ class ConcreteFromCodeTests(TestCase):
         self.assertEqual(test.__code__.co_stacksize, 1)
         self.assertEqual(test(), 259)
 
+    @assemble_code()
     def test_fail_extended_arg_jump(self):
         def test():
             var = None
@@ -1336,6 +1488,65 @@ class ConcreteFromCodeTests(TestCase):
 
     # XXX add tests for linenumbers which are None
 
+    def test_to_code_unmodified(self):
+        def f(x):
+            try:
+                return x + 1
+            except ValueError:
+                return 0
+
+        code = f.__code__
+        self.assertIs(ConcreteBytecode.from_code(code).to_code(), code)
+
+        # Constants are compared by identity
+        concrete = ConcreteBytecode.from_code(code)
+        concrete.consts[:] = list(concrete.consts)
+        self.assertIs(concrete.to_code(), code)
+        concrete.consts[concrete.consts.index(1)] = True
+        self.assertIsNot(concrete.to_code(), code)
+
+        concrete = ConcreteBytecode.from_code(code)
+        concrete.names.append("name")
+        self.assertIsNot(concrete.to_code(), code)
+
+        concrete = ConcreteBytecode.from_code(code)
+        concrete.insert(len(concrete), ConcreteInstr("NOP"))
+        self.assertIsNot(concrete.to_code(), code)
+
+        if sys.version_info >= (3, 11):
+            concrete = ConcreteBytecode.from_code(code)
+            concrete.exception_table[0].push_lasti = True
+            self.assertIsNot(concrete.to_code(), code)
+
+    def test_to_code_fast_mode(self):
+        def f(x):
+            try:
+                return x + 1
+            except ValueError:
+                return 0
+
+        code = f.__code__
+        as_code = ConcreteBytecode.from_code(code).copy().to_code(mode="fast")
+        self.assertCodeObjectEqual(code, as_code)
+        self.assertEqual(as_code.co_code, code.co_code)
+        self.assertEqual(as_code.co_consts, code.co_consts)
+
+    def test_to_code_unmodified_extended_arg(self):
+        lines = ["def f(x):"]
+        lines.extend(f"    if x == {i}: return {i}" for i in range(300))
+        code = get_code("\n".join(lines), function=True)
+
+        concrete = ConcreteBytecode.from_code(code, extended_arg=True)
+        self.assertIn("EXTENDED_ARG", [instr.name for instr in concrete])
+        self.assertIs(concrete.to_code(), code)
+        self.assertIs(concrete.to_bytecode().to_code(), code)
+
+        # Assembling gives back an equivalent code object
+        with assemble_code():
+            self.assertIsNot(concrete.to_code(), code)
+            self.assertCodeObjectEqual(code, concrete.to_code())
+
+    @assemble_code()
     def test_packing_lines(self):
         import dis
 
@@ -1389,6 +1600,36 @@ class ConcreteFromCodeTests(TestCase):
                 while callable(f := f()):
                     pass
 
+    @unittest.skipIf(sys.version_info < (3, 11), "requires Python 3.11+")
+    def test_decoder_matches_dis(self):
+        from . import cell_free_vars_cases as cfc, exception_handling_cases as ehc
+        from .long_lines_example import long_lines
+
+        codes = [
+            long_lines.__code__,
+            get_code(
+                """
+                x = 1
+                for i in range(10):
+                    x = x.real + i
+                """
+            ),
+        ]
+        codes.extend(f.__code__ for f in ehc.TEST_CASES + cfc.TEST_CASES)
+        for code in codes:
+            with self.subTest(code.co_name):
+                for extended_arg in (False, True):
+                    self.assertEqual(
+                        list(
+                            ConcreteBytecode.from_code(code, extended_arg=extended_arg)
+                        ),
+                        list(
+                            ConcreteBytecode.from_code(
+                                code, extended_arg=extended_arg, use_dis=True
+                            )
+                        ),
+                    )
+
 
 class BytecodeToConcreteTests(TestCase):
     def test_label(self):
@@ -1459,6 +1700,7 @@ class BytecodeToConcreteTests(TestCase):
         self.assertListEqual(concrete.names, ["test", "x"])
         self.assertListEqual(concrete.varnames, [])
 
+    @assemble_code()
     def test_label3(self):
         """
         CPython generates useless EXTENDED_ARG 0 in some cases. We need to
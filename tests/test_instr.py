@@ -8,6 +8,7 @@ from bytecode import (
     BasicBlock,
     CellVar,
     Compare,
+    ConcreteBytecode,
     FreeVar,
     Instr,
     Label,
@@ -19,14 +20,17 @@ from bytecode.instr import (
     DUAL_ARG_OPCODES,
     INTRINSIC_1OP,
     INTRINSIC_2OP,
+    MIN_INSTRUMENTED_OPCODE,
     InstrLocation,
     Intrinsic1Op,
     Intrinsic2Op,
+    const_key,
     opcode_has_argument,
+    opcode_pre_and_post_stack_effect,
 )
 from bytecode.utils import PY311, PY313
 
-from . import TestCase
+from . import TestCase, get_code
 
 # XXX  tests for location and lineno setter
 
@@ -110,6 +114,23 @@ class InstrLocationTests(TestCase):
                 else:
                     InstrLocation(*args)
 
+    def test_unchecked(self):
+        location = InstrLocation.unchecked(1, 2, 3, 4)
+        self.assertEqual(location, InstrLocation(1, 2, 3, 4))
+        self.assertEqual(
+            InstrLocation.unchecked(None, None, None, None),
+            InstrLocation(None, None, None, None),
+        )
+
+    @unittest.skipIf(not PY311, "Positions are only available on 3.11+")
+    def test_shared_locations(self):
+        code = get_code("x = 1; y = x")
+        locations = {}
+        for instr in ConcreteBytecode.from_code(code):
+            if instr.location is not None:
+                locations.setdefault(instr.location, instr.location)
+                self.assertIs(locations[instr.location], instr.location)
+
 
 class InstrTests(TestCase):
     def test_constructor(self):
@@ -125,6 +146,29 @@ class InstrTests(TestCase):
         with self.assertRaises(ValueError):
             Instr("xxx")
 
+    def test_unchecked(self):
+        instr = Instr.unchecked("LOAD_FAST", "x", lineno=3)
+        self.assertEqual(instr, Instr("LOAD_FAST", "x", lineno=3))
+        self.assertEqual(instr.opcode, opcode.opmap["LOAD_FAST"])
+
+        location = InstrLocation(4, 4, 1, 2)
+        instr = Instr.unchecked("NOP", location=location)
+        self.assertEqual(instr, Instr("NOP", location=location))
+
+        # The argument is not validated
+        instr = Instr.unchecked("LOAD_FAST", 1)
+        self.assertEqual(instr.arg, 1)
+
+        # Copies skip the validation too
+        self.assertEqual(instr.copy().arg, 1)
+
+        # Opcodes without properties are still rejected
+        for name, op in opcode.opmap.items():
+            if op >= MIN_INSTRUMENTED_OPCODE:
+                with self.subTest(name=name):
+                    with self.assertRaises(ValueError):
+                        Instr.unchecked(name)
+
     def test_repr(self):
         # No arg
         r = repr(Instr("NOP", lineno=10))
@@ -373,6 +417,21 @@ class InstrTests(TestCase):
             Instr("LOAD_CONST", frozenset({0})), Instr("LOAD_CONST", frozenset({0.0}))
         )
 
+    def test_const_key_memoized(self):
+        table = tuple(range(1000))
+        instr = Instr("LOAD_CONST", table)
+        self.assertEqual(instr, Instr("LOAD_CONST", table))
+        self.assertEqual(instr, Instr("LOAD_CONST", tuple(range(1000))))
+        self.assertNotEqual(instr, Instr("LOAD_CONST", tuple(range(999))))
+
+        # Tuples containing mutable objects are not memoized
+        items = [1]
+        mutable = (items,)
+        key = const_key(mutable)
+        self.assertEqual(const_key(mutable), key)
+        items.append(2)
+        self.assertNotEqual(const_key(mutable), key)
+
     def test_stack_effects(self):
         # Verify all opcodes are handled and that "jump=None" really returns
         # the max of the other cases.
@@ -426,6 +485,31 @@ class InstrTests(TestCase):
         for arg in 2**31, 2**32, 2**63, 2**64, -1:
             self.assertEqual(Instr("LOAD_CONST", arg).stack_effect(), 1)
 
+    def test_opcode_pre_and_post_stack_effect(self):
+        self.assertEqual(
+            opcode_pre_and_post_stack_effect(opcode.opmap["BUILD_TUPLE"], 3), (-3, 1)
+        )
+        self.assertEqual(
+            opcode_pre_and_post_stack_effect(opcode.opmap["UNPACK_SEQUENCE"], 4),
+            (-1, 4),
+        )
+
+        # The instruction arguments are converted to the oparg used by
+        # dis.stack_effect
+        for instr, oparg in (
+            (Instr("LOAD_CONST", 2**64), 0),
+            (Instr("BUILD_LIST", 2), 2),
+            (Instr("FOR_ITER", Label()), 0),
+            (Instr("LOAD_GLOBAL", (True, "x") if PY311 else "x"), 1 if PY311 else 0),
+            (Instr("POP_TOP"), None),
+        ):
+            for jump in (None, True, False):
+                with self.subTest(instr=instr, jump=jump):
+                    self.assertEqual(
+                        instr.pre_and_post_stack_effect(jump),
+                        opcode_pre_and_post_stack_effect(instr.opcode, oparg, jump),
+                    )
+
     def test_code_object_containing_mutable_data(self):
         from types import CodeType
 
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+import contextlib
+import importlib.util
+import io
+import json
+import marshal
+import os
+import py_compile
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from bytecode import Bytecode, Instr
+from bytecode.pyc import MANIFEST_NAME, main
+
+from . import TestCase
+
+TRANSFORMER = "tests.test_pyc:increment"
+
+
+def increment(code):
+    # Increment integer constants: applying it twice changes the result
+    bytecode = Bytecode.from_code(code)
+    for instr in bytecode:
+        if (
+            isinstance(instr, Instr)
+            and instr.name in ("LOAD_CONST", "RETURN_CONST")
+            and type(instr.arg) is int
+        ):
+            instr.arg += 1
+    return bytecode.to_code()
+
+
+def fail_in_f(code):
+    if code.co_name == "f":
+        raise ZeroDivisionError("cannot transform f")
+    return increment(code)
+
+
+class RewriteTests(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.directory = tmp_dir.name
+        self.write_source("a.py", "x = 1")
+        self.write_source("sub/b.py", "def f():\n    return 1\n\ny = f()")
+
+    def write_source(self, name, source):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(textwrap.dedent(source))
+
+    def rewrite(self, *args, transformer=TRANSFORMER):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            status = main(["rewrite", transformer, "-j", "1", *args])
+        return status, stdout.getvalue().splitlines()[-1]
+
+    def load(self, name):
+        path = importlib.util.cache_from_source(os.path.join(self.directory, name))
+        with open(path, "rb") as f:
+            data = f.read()
+        self.assertEqual(data[:4], importlib.util.MAGIC_NUMBER)
+        namespace = {}
+        exec(marshal.loads(data[16:]), namespace)
+        return namespace
+
+    def test_rewrite(self):
+        status, summary = self.rewrite("--compile", self.directory)
+        self.assertEqual(status, 0)
+        self.assertEqual(
+            summary, "2 files rewritten, 0 unchanged files skipped, 0 failures"
+        )
+        self.assertEqual(self.load("a.py")["x"], 2)
+        self.assertEqual(self.load("sub/b.py")["y"], 2)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, MANIFEST_NAME)))
+
+        # Unchanged sources are neither recompiled nor rewritten
+        status, summary = self.rewrite("--compile", self.directory)
+        self.assertEqual(
+            summary, "0 files rewritten, 2 unchanged files skipped, 0 failures"
+        )
+        self.assertEqual(self.load("a.py")["x"], 2)
+
+        # Modified sources are recompiled and rewritten (compileall only
+        # compares the mtime of the sources, in seconds)
+        self.write_source("a.py", "x = 1\nz = 3")
+        path = os.path.join(self.directory, "a.py")
+        mtime = os.stat(path).st_mtime + 10
+        os.utime(path, (mtime, mtime))
+        status, summary = self.rewrite("--compile", self.directory)
+        self.assertEqual(
+            summary, "1 files rewritten, 1 unchanged files skipped, 0 failures"
+        )
+        self.assertEqual(self.load("a.py")["z"], 4)
+
+        # Rewritten files are transformed again from their source
+        status, summary = self.rewrite("--force", self.directory)
+        self.assertEqual(
+            summary, "2 files rewritten, 0 unchanged files skipped, 0 failures"
+        )
+        self.assertEqual(self.load("a.py")["x"], 2)
+        self.assertEqual(self.load("sub/b.py")["y"], 2)
+
+        # Files given individually are recorded in their directory
+        path = os.path.join(self.directory, "a.py")
+        status, summary = self.rewrite(path)
+        self.assertEqual(
+            summary, "1 files rewritten, 0 unchanged files skipped, 0 failures"
+        )
+        self.assertEqual(self.load("a.py")["x"], 2)
+        manifest_path = os.path.join(
+            os.path.dirname(importlib.util.cache_from_source(path)), MANIFEST_NAME
+        )
+        self.assertTrue(os.path.exists(manifest_path))
+
+        status, summary = self.rewrite(path)
+        self.assertEqual(
+            summary, "0 files rewritten, 1 unchanged files skipped, 0 failures"
+        )
+
+        # Other files of the directory are added to its manifest
+        self.write_source("c.py", "w = 5")
+        status, summary = self.rewrite(
+            "--compile", os.path.join(self.directory, "c.py")
+        )
+        self.assertEqual(
+            summary, "1 files rewritten, 0 unchanged files skipped, 0 failures"
+        )
+        status, summary = self.rewrite(path, os.path.join(self.directory, "c.py"))
+        self.assertEqual(
+            summary, "0 files rewritten, 2 unchanged files skipped, 0 failures"
+        )
+        self.assertEqual(self.load("c.py")["w"], 6)
+
+    def test_transformer_version(self):
+        status, summary = self.rewrite("--compile", self.directory)
+        self.assertEqual(
+            summary, "2 files rewritten, 0 unchanged files skipped, 0 failures"
+        )
+
+        # A new version of the transformer rewrites all the files
+        status, summary = self.rewrite("--transformer-version", "2", self.directory)
+        self.assertEqual(status, 0)
+        self.assertEqual(
+            summary, "2 files rewritten, 0 unchanged files skipped, 0 failures"
+        )
+        self.assertEqual(self.load("a.py")["x"], 2)
+        status, summary = self.rewrite("--transformer-version", "2", self.directory)
+        self.assertEqual(
+            summary, "0 files rewritten, 2 unchanged files skipped, 0 failures"
+        )
+
+    def test_transformer_module_changed(self):
+        # Transformer defined in a module outside of the rewritten directory
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        module_name = "bytecode_test_transformer"
+        module_path = os.path.join(tmp_dir.name, module_name + ".py")
+        with open(module_path, "w", encoding="utf-8") as f:
+            f.write("from tests.test_pyc import increment\n")
+        sys.path.insert(0, tmp_dir.name)
+        self.addCleanup(sys.path.remove, tmp_dir.name)
+        self.addCleanup(sys.modules.pop, module_name, None)
+
+        transformer = "%s:increment" % module_name
+        status, summary = self.rewrite(
+            "--compile", self.directory, transformer=transformer
+        )
+        self.assertEqual(
+            summary, "2 files rewritten, 0 unchanged files skipped, 0 failures"
+        )
+        status, summary = self.rewrite(self.directory, transformer=transformer)
+        self.assertEqual(
+            summary, "0 files rewritten, 2 unchanged files skipped, 0 failures"
+        )
+
+        # The implementation of the transformer changed
+        with open(module_path, "a", encoding="utf-8") as f:
+            f.write("\n# modified\n")
+        del sys.modules[module_name]
+        importlib.invalidate_caches()
+        status, summary = self.rewrite(self.directory, transformer=transformer)
+        self.assertEqual(status, 0)
+        self.assertEqual(
+            summary, "2 files rewritten, 0 unchanged files skipped, 0 failures"
+        )
+        self.assertEqual(self.load("a.py")["x"], 2)
+
+    def test_rewrite_sourceless(self):
+        # Legacy .pyc file without source
+        source_path = os.path.join(self.directory, "a.py")
+        py_compile.compile(source_path, source_path + "c", doraise=True)
+        os.unlink(source_path)
+        path = source_path + "c"
+
+        status, summary = self.rewrite(path)
+        self.assertEqual(
+            summary, "1 files rewritten, 0 unchanged files skipped, 0 failures"
+        )
+        # The rewritten file cannot be transformed twice
+        status, summary = self.rewrite(path)
+        self.assertEqual(status, 0)
+        self.assertEqual(
+            summary, "0 files rewritten, 1 unchanged files skipped, 0 failures"
+        )
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            status, summary = self.rewrite(path, transformer="tests.test_pyc:fail_in_f")
+        self.assertEqual(status, 1)
+        self.assertIn("already rewritten by %s" % TRANSFORMER, stderr.getvalue())
+
+        with open(path, "rb") as f:
+            data = f.read()
+        namespace = {}
+        exec(marshal.loads(data[16:]), namespace)
+        self.assertEqual(namespace["x"], 2)
+
+    def test_transformer_error(self):
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            status, summary = self.rewrite(
+                "--compile", self.directory, transformer="tests.test_pyc:fail_in_f"
+            )
+        self.assertEqual(status, 1)
+        self.assertEqual(
+            summary, "1 files rewritten, 0 unchanged files skipped, 1 failures"
+        )
+        self.assertIn("ZeroDivisionError: cannot transform f", stderr.getvalue())
+        self.assertEqual(self.load("a.py")["x"], 2)
+        path = os.path.join(self.directory, "a.py")
+
+        # The rewritten file is recorded in the manifest
+        with open(os.path.join(self.directory, MANIFEST_NAME), encoding="utf-8") as f:
+            files = json.load(f)["files"]
+        self.assertEqual(
+            list(files),
+            [os.path.relpath(importlib.util.cache_from_source(path), self.directory)],
+        )
+
+    def test_bad_magic(self):
+        path = os.path.join(self.directory, "c.pyc")
+        with open(path, "wb") as f:
+            f.write(b"\0" * 32)
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            status, summary = self.rewrite(self.directory)
+        self.assertEqual(status, 1)
+        self.assertEqual(
+            summary, "0 files rewritten, 0 unchanged files skipped, 1 failures"
+        )
+        self.assertIn("bad magic number", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()  # pragma: no cover
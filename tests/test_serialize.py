@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+import pickle
+import unittest
+
+from bytecode import (
+    UNSET,
+    BasicBlock,
+    Bytecode,
+    CellVar,
+    Compare,
+    ControlFlowGraph,
+    FreeVar,
+    Instr,
+    Label,
+    SetLineno,
+    TryBegin,
+    TryEnd,
+)
+from bytecode.instr import InstrLocation
+from bytecode.utils import PY311
+
+from . import TestCase, get_code
+
+
+def dumps_loads(obj):
+    return type(obj).from_bytes(obj.to_bytes())
+
+
+def pickle_loads(obj):
+    return pickle.loads(pickle.dumps(obj))
+
+
+class BytecodeSerializationTests(TestCase):
+    def check_bytecode(self, bytecode, loads):
+        new_bytecode = loads(bytecode)
+        self.assertIsNot(new_bytecode, bytecode)
+        self.assertEqual(new_bytecode, bytecode)
+        self.assertEqual(new_bytecode.argnames, bytecode.argnames)
+        self.assertEqual(new_bytecode.docstring, bytecode.docstring)
+        return new_bytecode
+
+    def test_labels(self):
+        label = Label()
+        bytecode = Bytecode(
+            [
+                SetLineno(3),
+                Instr("LOAD_NAME", "x"),
+                Instr("JUMP_FORWARD", label),
+                Instr("LOAD_CONST", (1, "a", None)),
+                Instr("STORE_NAME", "y", location=InstrLocation(4, 4, 2, 8)),
+                Instr("JUMP_FORWARD", label),
+                label,
+                Instr("LOAD_CONST", None),
+                Instr("RETURN_VALUE"),
+            ]
+        )
+        bytecode.argnames = ["x"]
+        bytecode.docstring = None
+        for loads in (dumps_loads, pickle_loads):
+            with self.subTest(loads=loads.__name__):
+                new_bytecode = self.check_bytecode(bytecode, loads)
+                self.assertIs(new_bytecode[2].arg, new_bytecode[6])
+                self.assertIs(new_bytecode[5].arg, new_bytecode[6])
+                self.assertEqual(new_bytecode[4].location, InstrLocation(4, 4, 2, 8))
+                self.assertIs(new_bytecode[8].lineno, UNSET)
+
+    def test_arguments(self):
+        bytecode = Bytecode(
+            [
+                Instr("LOAD_DEREF", CellVar("x")),
+                Instr("LOAD_DEREF", FreeVar("y")),
+                Instr("COMPARE_OP", Compare.LT),
+                Instr("RETURN_VALUE"),
+            ]
+        )
+        bytecode.cellvars = ["x"]
+        bytecode.freevars = ["y"]
+        new_bytecode = self.check_bytecode(bytecode, dumps_loads)
+        self.assertEqual(
+            [type(instr.arg) for instr in new_bytecode],
+            [CellVar, FreeVar, Compare, type(UNSET)],
+        )
+
+    def test_code(self):
+        code = get_code(
+            """
+            def f(x, *, y=1):
+                "docstring"
+                def g():
+                    return x
+                try:
+                    return g() < y
+                except Exception:
+                    return None
+            """
+        )
+        bytecode = Bytecode.from_code(code)
+        for loads in (dumps_loads, pickle_loads):
+            with self.subTest(loads=loads.__name__):
+                new_code = loads(bytecode).to_code()
+                namespace = {}
+                exec(new_code, namespace)
+                self.assertIs(namespace["f"](1), False)
+                self.assertIs(namespace["f"](1, y=2), True)
+                self.assertEqual(namespace["f"].__doc__, "docstring")
+
+    @unittest.skipIf(not PY311, "requires Python 3.11+")
+    def test_try_blocks(self):
+        code = get_code(
+            """
+            try:
+                x = 1
+            except Exception:
+                x = 2
+            """
+        )
+        bytecode = Bytecode.from_code(code, conserve_exception_block_stackdepth=True)
+        for loads in (dumps_loads, pickle_loads):
+            with self.subTest(loads=loads.__name__):
+                new_bytecode = self.check_bytecode(bytecode, loads)
+                try_begins = [i for i in new_bytecode if isinstance(i, TryBegin)]
+                self.assertTrue(try_begins)
+                for instr in new_bytecode:
+                    if isinstance(instr, TryBegin):
+                        self.assertIn(instr.target, new_bytecode)
+                    elif isinstance(instr, TryEnd):
+                        self.assertTrue(any(instr.entry is tb for tb in try_begins))
+                self.assertEqual(
+                    [tb.stack_depth for tb in try_begins],
+                    [i.stack_depth for i in bytecode if isinstance(i, TryBegin)],
+                )
+
+    def test_errors(self):
+        data = Bytecode([Instr("LOAD_CONST", None), Instr("RETURN_VALUE")]).to_bytes()
+        with self.assertRaisesRegex(ValueError, "another type"):
+            ControlFlowGraph.from_bytes(data)
+        with self.assertRaisesRegex(ValueError, "another Python version"):
+            Bytecode.from_bytes(data[:5] + b"\0\0\0\0" + data[9:])
+        with self.assertRaisesRegex(ValueError, "not a serialized bytecode"):
+            Bytecode.from_bytes(b"garbage")
+
+
+class ControlFlowGraphSerializationTests(TestCase):
+    def check_cfg(self, cfg, loads):
+        new_cfg = loads(cfg)
+        self.assertIsNot(new_cfg, cfg)
+        self.assertEqual(new_cfg, cfg)
+        for index, (block, new_block) in enumerate(zip(cfg, new_cfg)):
+            self.assertEqual(new_cfg.get_block_index(new_block), index)
+            jump = new_block.get_jump()
+            if jump is not None:
+                self.assertEqual(
+                    new_cfg.get_block_index(jump),
+                    cfg.get_block_index(block.get_jump()),
+                )
+            if block.next_block is None:
+                self.assertIsNone(new_block.next_block)
+            else:
+                self.assertIs(
+                    new_block.next_block,
+                    new_cfg[cfg.get_block_index(block.next_block)],
+                )
+            for instr in new_block:
+                if isinstance(instr, TryBegin):
+                    self.assertIsInstance(instr.target, BasicBlock)
+                    new_cfg.get_block_index(instr.target)
+        return new_cfg
+
+    def test_code(self):
+        code = get_code(
+            """
+            for x in range(3):
+                try:
+                    y = x
+                except Exception:
+                    y = 2
+                else:
+                    y = 3
+            """
+        )
+        cfg = ControlFlowGraph.from_bytecode(Bytecode.from_code(code))
+        for loads in (dumps_loads, pickle_loads):
+            with self.subTest(loads=loads.__name__):
+                new_cfg = self.check_cfg(cfg, loads)
+                namespace = {}
+                exec(new_cfg.to_code(), namespace)
+                self.assertEqual(namespace["y"], 3)
+
+    def test_empty_block(self):
+        cfg = ControlFlowGraph()
+        block = cfg.add_block([Instr("LOAD_CONST", None), Instr("RETURN_VALUE")])
+        cfg[0].next_block = block
+        new_cfg = self.check_cfg(cfg, dumps_loads)
+        self.assertEqual(len(new_cfg), 2)
+        self.assertEqual(len(new_cfg[0]), 0)
+
+    def test_foreign_block(self):
+        cfg = ControlFlowGraph()
+        cfg[0].append(Instr("JUMP_FORWARD", BasicBlock()))
+        with self.assertRaises(ValueError):
+            cfg.to_bytes()
+
+
+if __name__ == "__main__":
+    unittest.main()  # pragma: no cover
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import types
+import unittest
+
+from bytecode import BulkTransformer, Bytecode, Instr, transform_code_tree
+from bytecode.utils import PY312
+
+from . import TestCase, get_code
+
+# Instructions loading a constant
+CONST_OPCODES = ("LOAD_CONST", "RETURN_CONST")
+
+
+def nested_codes(code):
+    return [const for const in code.co_consts if isinstance(const, types.CodeType)]
+
+
+def replace_one(code):
+    # Replace the constant 1 by 2
+    bytecode = Bytecode.from_code(code)
+    for instr in bytecode:
+        if isinstance(instr, Instr) and instr.name in CONST_OPCODES and instr.arg == 1:
+            instr.arg = 2
+    return bytecode.to_code()
+
+
+def fail_in_f(code):
+    if code.co_name == "f":
+        raise ZeroDivisionError("cannot transform f")
+    return replace_one(code)
+
+
+class TransformCodeTreeTests(TestCase):
+    def test_bottom_up(self):
+        code = get_code(
+            """
+            def f():
+                def g():
+                    return 1
+                return g
+
+            class A:
+                x = [i for i in range(3)]
+            """
+        )
+        seen = []
+
+        def transformer(code):
+            # Nested code objects are transformed first
+            for nested in nested_codes(code):
+                self.assertIn(nested, seen)
+            seen.append(code)
+            return code
+
+        self.assertIs(transform_code_tree(code, transformer), code)
+        self.assertIs(seen[-1], code)
+        self.assertEqual(
+            sorted(code.co_name for code in seen),
+            sorted(["<module>", "f", "g", "A"] + ([] if PY312 else ["<listcomp>"])),
+        )
+
+    def test_transform_nested(self):
+        code = get_code(
+            """
+            def f():
+                def g():
+                    return 1
+                return g()
+
+            x = f()
+            """
+        )
+
+        def transformer(code):
+            if code.co_name != "g":
+                return code
+            bytecode = Bytecode.from_code(code)
+            for instr in bytecode:
+                # Python 3.12+ returns constants with RETURN_CONST
+                if isinstance(instr, Instr) and instr.name in CONST_OPCODES:
+                    if instr.arg == 1:
+                        instr.arg = 2
+            return bytecode.to_code()
+
+        new_code = transform_code_tree(code, transformer)
+        self.assertIsNot(new_code, code)
+        self.assertEqual(new_code.co_code, code.co_code)
+        namespace = {}
+        exec(new_code, namespace)
+        self.assertEqual(namespace["x"], 2)
+
+    def test_equal_code_objects(self):
+        code = get_code("def f(): return 1")
+        f_code = nested_codes(code)[0]
+        # Two distinct but equal nested code objects
+        code = code.replace(co_consts=(*code.co_consts, f_code.replace()))
+        calls = []
+
+        def transformer(code):
+            calls.append(code.co_name)
+            return code.replace(co_name=code.co_name + "_")
+
+        new_code = transform_code_tree(code, transformer)
+        self.assertEqual(calls, ["f", "<module>"])
+        first, second = nested_codes(new_code)
+        self.assertIs(first, second)
+        self.assertEqual(first.co_name, "f_")
+
+
+class BulkTransformerTests(TestCase):
+    def test_transform(self):
+        codes = [
+            get_code(
+                f"""
+                def f():
+                    def g():
+                        return 1
+                    return g() + {i + 10}
+
+                x = f()
+                """,
+                filename=f"module{i}.py",
+            )
+            for i in range(10)
+        ]
+        transformer = BulkTransformer(replace_one, max_workers=2)
+        new_codes = transformer.transform(codes)
+
+        self.assertEqual(len(new_codes), len(codes))
+        for i, new_code in enumerate(new_codes):
+            self.assertEqual(new_code.co_filename, f"module{i}.py")
+            namespace = {}
+            exec(new_code, namespace)
+            self.assertEqual(namespace["x"], 12 + i)
+
+        self.assertLessEqual(len(transformer.workers), 2)
+        self.assertEqual(
+            sum(stats.code_objects for stats in transformer.workers.values()), 30
+        )
+        for stats in transformer.workers.values():
+            self.assertGreater(stats.throughput, 0)
+
+    def test_return_exceptions(self):
+        codes = [get_code("x = 1"), get_code("def f(): pass")]
+        transformer = BulkTransformer(fail_in_f, max_workers=1)
+        new_code, error = transformer.transform(codes, return_exceptions=True)
+        self.assertEqual(new_code.co_consts, (2, None))
+        self.assertIsInstance(error, ZeroDivisionError)
+
+        with self.assertRaises(ZeroDivisionError):
+            transformer.transform(codes)
+
+
+if __name__ == "__main__":
+    unittest.main()  # pragma: no cover